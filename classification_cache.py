@@ -0,0 +1,269 @@
+"""Persistent cache of count classifications.
+
+Clinics screen the same handful of charges over and over, and each one costs
+an embedding call plus up to four rerank generations. Outcomes are stored in a
+small SQLite database keyed by the normalized count text, together with a
+content hash of the statute files that produced them. When a statute list or
+the matrices or weights it is scored with change, the stored hash no longer matches and the old answer
+is treated as a miss and overwritten.
+
+Two kinds of entry share the table:
+
+  scope = "<statute name>"  whether the count matched that one list
+  scope = "class"           the final classify_count outcome
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from legal_statutes.backends import matrix_files
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CLASS_SCOPE = "class"
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, ".cache", "classifications.sqlite3")
+DEFAULT_MAX_ENTRIES = 20_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    scope TEXT NOT NULL,
+    text TEXT NOT NULL,
+    corpus_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (scope, text)
+);
+CREATE INDEX IF NOT EXISTS classifications_accessed ON classifications (accessed);
+"""
+
+
+def normalize_count(text: str) -> str:
+    """Fold case and whitespace so trivially different entries share a key."""
+    text = re.sub(r"\s+", " ", str(text)).strip().casefold()
+    return text.rstrip(".;,")
+
+
+_HASHES: dict[tuple, str] = {}
+_HASHES_LOCK = threading.Lock()
+
+
+def _file_hash(path: str) -> str:
+    """SHA-256 of *path*, remembered until its size or mtime changes."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "-"
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _HASHES_LOCK:
+        cached = _HASHES.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    with _HASHES_LOCK:
+        _HASHES[key] = digest.hexdigest()
+    return _HASHES[key]
+
+
+def statute_hash(filename: str, salt: str = "", backend: str | None = None) -> str:
+    """Content hash of a statute list and every file *backend* (default: the
+    active one) scores it with: matrix, row index, IVF index, IDF weights.
+
+    *salt* folds in anything else the answer depends on, such as the
+    backend and the scoring settings.
+    """
+    path = os.path.join(BASE_DIR, filename) if not os.path.isabs(filename) else filename
+    parts = [_file_hash(p) for p in (path, *matrix_files(path, backend))]
+    if salt:
+        parts.append(salt)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def corpus_hash(filenames: list[str], salt: str = "", backend: str | None = None) -> str:
+    """Combined hash of several statute lists, for whole-count outcomes.
+
+    *salt* folds in anything else the outcome depends on.
+    """
+    hashes = [statute_hash(filename, backend=backend) for filename in filenames]
+    joined = "|".join(hashes + ([salt] if salt else []))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def statute_scope(filename: str) -> str:
+    return os.path.basename(filename)[:-4]
+
+
+class ClassificationCache:
+    """SQLite-backed LRU cache with optional TTL and hit/miss counters.
+
+    One connection is shared by every server thread behind a lock; SQLite
+    lookups by primary key take microseconds, which is all a repeat charge
+    costs once it is cached.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "invalidated": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+    # -- lookups ---------------------------------------------------------
+
+    def get(self, scope: str, text: str, corpus: str) -> str | None:
+        """Return the cached value, or None on a miss."""
+        key = normalize_count(text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT corpus_hash, value, created FROM classifications WHERE scope = ? AND text = ?",
+                (scope, key),
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            stored_corpus, value, created = row
+            if stored_corpus != corpus:
+                self._counters["invalidated"] += 1
+                self._counters["misses"] += 1
+                self._delete(scope, key)
+                return None
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                self._delete(scope, key)
+                return None
+            self._conn.execute(
+                "UPDATE classifications SET accessed = ? WHERE scope = ? AND text = ?",
+                (now, scope, key),
+            )
+            self._conn.commit()
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, scope: str, text: str, corpus: str, value: str) -> None:
+        key = normalize_count(text)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, key, corpus, value, now, now),
+            )
+            self._counters["writes"] += 1
+            self._evict()
+            self._conn.commit()
+
+    # -- typed helpers used by the classifier ----------------------------
+
+    def get_match(self, filename: str, text: str, corpus: str) -> bool | None:
+        value = self.get(statute_scope(filename), text, corpus)
+        return None if value is None else value == "1"
+
+    def put_match(self, filename: str, text: str, corpus: str, matched: bool) -> None:
+        self.put(statute_scope(filename), text, corpus, "1" if matched else "0")
+
+    def get_class(self, text: str, corpus: str) -> str | None:
+        return self.get(CLASS_SCOPE, text, corpus)
+
+    def put_class(self, text: str, corpus: str, cls: str) -> None:
+        self.put(CLASS_SCOPE, text, corpus, cls)
+
+    # -- housekeeping ----------------------------------------------------
+
+    def _delete(self, scope: str, key: str) -> None:
+        self._conn.execute("DELETE FROM classifications WHERE scope = ? AND text = ?", (scope, key))
+        self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM classifications WHERE rowid IN "
+                "(SELECT rowid FROM classifications ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self._counters["evictions"] += excess
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM classifications")
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_DEFAULT_CACHE: ClassificationCache | None = None
+_DEFAULT_CACHE_LOADED = False
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def default_cache() -> ClassificationCache | None:
+    """Return the process-wide cache, opening it on first use."""
+    global _DEFAULT_CACHE, _DEFAULT_CACHE_LOADED
+    with _DEFAULT_CACHE_LOCK:
+        if not _DEFAULT_CACHE_LOADED:
+            _DEFAULT_CACHE = cache_from_env()
+            _DEFAULT_CACHE_LOADED = True
+        return _DEFAULT_CACHE
+
+
+def cache_from_env() -> ClassificationCache | None:
+    """Build the server's cache from CLASSIFICATION_CACHE_* variables.
+
+    CLASSIFICATION_CACHE_PATH=off disables caching entirely.
+    """
+    path = os.environ.get("CLASSIFICATION_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if path.lower() in ("", "off", "none", "0"):
+        return None
+    ttl = os.environ.get("CLASSIFICATION_CACHE_TTL")
+    return ClassificationCache(
+        path,
+        max_entries=int(os.environ.get("CLASSIFICATION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=float(ttl) if ttl else None,
+    )
@@ -0,0 +1,494 @@
+"""Short-circuit legal-statute classification of criminal counts.
+
+Each count is checked against up to four statute lists. The checks only differ
+in which matrix the query is scored against, so every count in a request is
+embedded up front in one batched call, and the batch is scored against all
+four lists at once with one product against the fused statute matrix. Only
+the LLM rerank of each list's top candidates remains per count.
+
+Given a ``ClassificationCache``, outcomes and per-list matches that were
+computed before against the same statute files are reused, and only the
+counts that still need a network answer are embedded.
+
+Given a ``LocalStatuteIndex``, counts that cite a statute section or use a
+list entry's exact wording are checked against the statute text first. A
+list the text puts the count on is not reranked; every other list still
+goes to Gemini.
+
+Given ``ScoreThresholds``, a list whose best cosine score is decisively high
+or low is settled from the score alone; only scores in the calibrated band
+between the two marks are reranked.
+
+With batched reranking, the counts left for Gemini at each stage are
+resolved with one structured prompt per RERANK_BATCH_SIZE counts instead of
+one prompt per count and list; see ``GeminiBackend.rerank_batch``.
+
+Given an executor, every rerank call a request could need is started at
+once instead of a stage at a time: later lists in the precedence chain are
+evaluated speculatively while earlier ones are still in flight, and the
+answers are then read back in the usual order, so the class is identical to
+the sequential path. All Gemini calls go through the process-wide rate
+limiter in ``legal_statutes.rate_limit``, so speculation cannot exceed quota.
+
+Given a ``SingleFlight``, a count that another request is already
+classifying waits for that answer instead of making the same calls again.
+
+Gemini calls have deadlines, budgeted retries and a circuit breaker (see
+``legal_statutes.resilience``). A count whose class depends on a call that
+failed is returned with ``needs_review`` set instead of blocking the request.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from classification_cache import ClassificationCache, corpus_hash, normalize_count, statute_hash
+from input_manager import BASE_DIR, InputManager
+from legal_statutes import ann_index
+from legal_statutes.backends import RERANK_BATCH_SIZE, active_backend_name
+from legal_statutes.embedding_store import read_statute_lines
+from legal_statutes.local_index import LocalStatuteIndex
+from legal_statutes.quantize import quantization_from_env
+from legal_statutes.score_thresholds import ScoreThresholds
+from single_flight import Flight, SingleFlight
+
+RECLASSIFIED_FILE = "legal_statutes/reclassified.txt"
+SECTION_571_FILE = "legal_statutes/section571.txt"
+SECTION_13_FILE = "legal_statutes/section13.txt"
+SORA_FILE = "legal_statutes/SORA.txt"
+STATUTE_FILES = (RECLASSIFIED_FILE, SECTION_571_FILE, SECTION_13_FILE, SORA_FILE)
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+_LOCAL_INDEX: LocalStatuteIndex | None = None
+_LOCAL_INDEX_LOCK = threading.Lock()
+
+# Classifications in flight anywhere in the process, shared by all sessions.
+IN_FLIGHT = SingleFlight()
+
+
+def classification_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool for Gemini calls (CLASSIFIER_WORKERS threads)."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("CLASSIFIER_WORKERS", "8")),
+                thread_name_prefix="classify",
+            )
+        return _EXECUTOR
+
+
+def batch_rerank_enabled() -> bool:
+    """Whether the server packs reranks into batched prompts (BATCH_RERANK)."""
+    return os.environ.get("BATCH_RERANK", "1").strip().lower() not in ("0", "off", "false", "no")
+
+
+def scoring_settings(batch_rerank: bool) -> str:
+    """The server settings, besides the backend and score marks, that can
+    change a count's answer: matrix precision and width, ANN search, and
+    batched or per-count reranking."""
+    mode, dims = quantization_from_env()
+    rerank = "batch" if batch_rerank else "single"
+    return f"{mode}|{dims}|{ann_index.ANN_MIN_ROWS}|{ann_index.ANN_NPROBE}|{rerank}"
+
+
+def local_statute_index() -> LocalStatuteIndex:
+    """Return the process-wide citation/phrase index over ``STATUTE_FILES``."""
+    global _LOCAL_INDEX
+    with _LOCAL_INDEX_LOCK:
+        if _LOCAL_INDEX is None:
+            _LOCAL_INDEX = LocalStatuteIndex(
+                {
+                    filename: read_statute_lines(os.path.join(BASE_DIR, filename))
+                    for filename in STATUTE_FILES
+                },
+                cited=(SECTION_571_FILE, SECTION_13_FILE, SORA_FILE),
+            )
+        return _LOCAL_INDEX
+
+
+def resolve_class(matches: Callable[[str], bool]) -> str:
+    """Apply the precedence chain given ``matches(statute file) -> bool``.
+
+    Order of precedence:
+      reclassified → none → 571 → 13-sora / sora → 571 (violent but not 13/SORA)
+    """
+    if matches(RECLASSIFIED_FILE):
+        return "reclassified"
+    if not matches(SECTION_571_FILE):
+        return "none"
+    # Violent under 571 — check the two worst-case lists
+    if matches(SECTION_13_FILE) or matches(SORA_FILE):
+        return "13-sora"
+    return "571"
+
+
+def resolve_known(known: dict[str, bool]) -> str | None:
+    """``resolve_class`` over partial answers; None if it needs a missing one."""
+    try:
+        return resolve_class(known.__getitem__)
+    except KeyError:
+        return None
+
+
+class _ClassificationRun:
+    """State for classifying one batch of counts."""
+
+    def __init__(
+        self,
+        input_manager: InputManager,
+        counts: list[str],
+        query_embeddings: Any,
+        cache: ClassificationCache | None,
+        local_index: LocalStatuteIndex | None = None,
+        thresholds: ScoreThresholds | None = None,
+        batch_rerank: bool = False,
+    ) -> None:
+        self.input_manager = input_manager
+        self.counts = counts
+        self.cache = cache
+        self.thresholds = thresholds
+        self.batch_rerank = batch_rerank
+        self.classes: list[str | None] = [None] * len(counts)
+        self.embeddings: dict[int, Any] = {}
+        if query_embeddings is not None:
+            self.embeddings = {i: query_embeddings[i] for i in range(len(counts))}
+        # Counts whose answer depends on a failed Gemini call; never cached.
+        self.unsure: set[int] = set()
+        self._candidates: dict[str, dict[int, list]] | None = None
+        self._candidates_failed = False
+        # Per-list answers settled by the statute text itself.
+        self.local: dict[int, dict[str, bool]] = {}
+
+        if local_index is not None:
+            for i, count in enumerate(counts):
+                answers = local_index.lookup(count)
+                self.classes[i] = resolve_known(answers)
+                local_index.record(resolved=self.classes[i] is not None, answered=bool(answers))
+                if self.classes[i] is None and answers:
+                    self.local[i] = answers
+        # Answers depend on the embedding backend, the scoring settings and
+        # the score marks too, so changing any of them starts afresh.
+        backend = active_backend_name()
+        backend_salt = f"{backend}|{scoring_settings(batch_rerank)}"
+        marks = thresholds.fingerprint if thresholds is not None else ""
+        self.flight_salt = f"{backend_salt}|{marks}|{int(local_index is not None)}"
+        if cache is not None:
+            self.hashes = {
+                filename: statute_hash(filename, salt=backend_salt, backend=backend)
+                for filename in STATUTE_FILES
+            }
+            self.corpus = corpus_hash(list(STATUTE_FILES), salt=backend_salt + marks, backend=backend)
+            for i, count in enumerate(counts):
+                if self.classes[i] is None:
+                    self.classes[i] = cache.get_class(count, self.corpus)
+        self.pending = [i for i, cls in enumerate(self.classes) if cls is None]
+
+    # -- coalescing ------------------------------------------------------
+
+    def join_flights(self, single_flight: SingleFlight) -> tuple[dict[int, Flight], dict[int, Flight]]:
+        """Join a flight for every pending count; returns ``(led, waiting)``.
+
+        Counts another request is already classifying leave ``pending``;
+        their answers are read from the flight once this run is done.
+        """
+        led: dict[int, Flight] = {}
+        waiting: dict[int, Flight] = {}
+        for i in self.pending:
+            text = normalize_count(self.counts[i])
+            flight, leader = single_flight.join(f"{self.flight_salt}|{text}", text)
+            (led if leader else waiting)[i] = flight
+        self.pending = [i for i in self.pending if i in led]
+        return led, waiting
+
+    # -- building blocks -------------------------------------------------
+
+    def pending_vectors(self) -> list | None:
+        """Embed every pending count that has no vector yet, in one call.
+
+        Returns the pending counts' vectors, or None if any are missing.
+        """
+        missing = [i for i in self.pending if i not in self.embeddings]
+        if missing:
+            vectors = self.input_manager.embed_queries([self.counts[i] for i in missing])
+            for row, i in enumerate(missing):
+                self.embeddings[i] = None if vectors is None else vectors[row]
+        vectors = [self.embeddings[i] for i in self.pending]
+        return None if any(v is None for v in vectors) else vectors
+
+    def candidates(self, filename: str, i: int) -> list | None:
+        """Top-k statute candidates of count *i* in *filename*, or None if
+        the count could not be embedded.
+
+        The first call scores every pending count against every list in
+        one fused matrix product; later calls are lookups.
+        """
+        if self._candidates is None and not self._candidates_failed:
+            texts = [self.counts[j] for j in self.pending]
+            found = self.input_manager.statute_top_k_all(
+                STATUTE_FILES, texts, self.pending_vectors()
+            )
+            if found is None:
+                self._candidates_failed = True
+            else:
+                self._candidates = {
+                    fn: dict(zip(self.pending, per_count)) for fn, per_count in found.items()
+                }
+        if self._candidates is None:
+            return None
+        return self._candidates[filename][i]
+
+    def decided(self, filename: str, top_k: list | None) -> bool | None:
+        """The answer the best cosine score settles on its own, if any."""
+        if self.thresholds is None or not top_k:
+            return None
+        return self.thresholds.decide(filename, top_k[0][1])
+
+    def cached_matches(self, filename: str, indices: list[int]) -> tuple[dict[int, bool], list[int]]:
+        """Split *indices* into known answers and the ones left to query."""
+        known: dict[int, bool] = {}
+        to_query: list[int] = []
+        for i in indices:
+            cached = self.local.get(i, {}).get(filename)
+            if cached is None and self.cache is not None:
+                cached = self.cache.get_match(filename, self.counts[i], self.hashes[filename])
+            if cached is None:
+                to_query.append(i)
+            else:
+                known[i] = cached
+        return known, to_query
+
+    def record(self, filename: str, i: int, hit: bool | None) -> None:
+        if hit is None:
+            self.unsure.add(i)
+        elif self.cache is not None:
+            self.cache.put_match(filename, self.counts[i], self.hashes[filename], hit)
+
+    # -- strategies ------------------------------------------------------
+
+    def check(self, filename: str, indices: list[int]) -> set[int]:
+        """Return the subset of *indices* whose count matches *filename*."""
+        known, to_query = self.cached_matches(filename, indices)
+        hits = {i for i, hit in known.items() if hit}
+        asks = []
+        for i in to_query:
+            top_k = self.candidates(filename, i)
+            hit = self.decided(filename, top_k)
+            if hit is None and top_k is not None:
+                asks.append((filename, i, top_k))
+                continue
+            if top_k is None:
+                self.record(filename, i, None)
+            if hit:
+                hits.add(i)
+        for (_, i, _), hit in zip(asks, self.rerank_all(asks)):
+            self.record(filename, i, hit)
+            if hit:
+                hits.add(i)
+        return hits
+
+    def rerank_all(self, asks: list[tuple[str, int, list]]) -> list[bool | None]:
+        """Rerank ``(filename, count index, top_k)`` triples, batched if enabled."""
+        if not self.batch_rerank:
+            return [self.input_manager.rerank(f, self.counts[i], top_k) for f, i, top_k in asks]
+        answers: list[bool | None] = []
+        for chunk in self.chunks(asks):
+            answers.extend(self.input_manager.rerank_batch(chunk))
+        return answers
+
+    def chunks(self, asks: list[tuple[str, int, list]]) -> list[list[tuple[str, str, list]]]:
+        """Split *asks* into ``rerank_batch`` calls of at most RERANK_BATCH_SIZE."""
+        triples = [(f, self.counts[i], top_k) for f, i, top_k in asks]
+        size = max(1, RERANK_BATCH_SIZE)
+        return [triples[start:start + size] for start in range(0, len(triples), size)]
+
+    def run_staged(self) -> None:
+        """Walk the chain in ``resolve_class`` a stage at a time.
+
+        No rerank call is made that the chain does not need.
+        """
+        undecided = list(self.pending)
+        for i in self.check(RECLASSIFIED_FILE, undecided):
+            self.classes[i] = "reclassified"
+
+        undecided = [i for i in undecided if self.classes[i] is None]
+        violent = self.check(SECTION_571_FILE, undecided)
+        for i in undecided:
+            if i not in violent:
+                self.classes[i] = "none"
+
+        undecided = sorted(violent)
+        for i in self.check(SECTION_13_FILE, undecided):
+            self.classes[i] = "13-sora"
+        undecided = [i for i in undecided if self.classes[i] is None]
+        for i in self.check(SORA_FILE, undecided):
+            self.classes[i] = "13-sora"
+        for i in undecided:
+            if self.classes[i] is None:
+                self.classes[i] = "571"
+
+    def run_speculative(self, executor: Executor) -> None:
+        """Start every rerank a pending count could need, then resolve in order.
+
+        With batching on, all of them go out in as few prompts as the batch
+        size allows, each prompt on its own pool thread.
+        """
+        outcomes: dict[tuple[str, int], Any] = {}
+        asks: list[tuple[str, int, list]] = []
+        for filename in STATUTE_FILES:
+            known, to_query = self.cached_matches(filename, self.pending)
+            for i, hit in known.items():
+                outcomes[(filename, i)] = hit
+            for i in to_query:
+                # Candidates are computed here, on the calling thread, so
+                # only the network-bound rerank runs on the pool.
+                top_k = self.candidates(filename, i)
+                outcomes[(filename, i)] = self.decided(filename, top_k)
+                if outcomes[(filename, i)] is None and top_k is not None:
+                    asks.append((filename, i, top_k))
+
+        if self.batch_rerank:
+            start = 0
+            for chunk in self.chunks(asks):
+                future = executor.submit(self.input_manager.rerank_batch, chunk)
+                for position, (filename, i, _) in enumerate(asks[start:start + len(chunk)]):
+                    outcomes[(filename, i)] = (future, position)
+                start += len(chunk)
+        else:
+            for filename, i, top_k in asks:
+                outcomes[(filename, i)] = executor.submit(
+                    self.input_manager.rerank, filename, self.counts[i], top_k
+                )
+
+        for i in self.pending:
+            def matches(filename: str) -> bool:
+                value = outcomes[(filename, i)]
+                if isinstance(value, tuple):
+                    future, position = value
+                    value = future.result()[position]
+                    self.record(filename, i, value)
+                elif isinstance(value, Future):
+                    value = value.result()
+                    self.record(filename, i, value)
+                elif value is None:
+                    self.unsure.add(i)
+                return bool(value)
+
+            self.classes[i] = resolve_class(matches)
+            # Drop speculative calls this count turned out not to need.
+            for filename in STATUTE_FILES:
+                value = outcomes[(filename, i)]
+                if isinstance(value, Future):
+                    value.cancel()
+
+    # -- result ----------------------------------------------------------
+
+    def results(self) -> list[dict[str, Any]]:
+        if self.cache is not None:
+            for i in self.pending:
+                if i not in self.unsure:
+                    self.cache.put_class(self.counts[i], self.corpus, self.classes[i])
+        return [
+            {"class": cls, "embedding": self.embeddings.get(i), "needs_review": i in self.unsure}
+            for i, cls in enumerate(self.classes)
+        ]
+
+
+def classify_counts(
+    input_manager: InputManager,
+    counts: list[str],
+    *,
+    query_embeddings: Any = None,
+    cache: ClassificationCache | None = None,
+    executor: Executor | None = None,
+    local_index: LocalStatuteIndex | None = None,
+    thresholds: ScoreThresholds | None = None,
+    batch_rerank: bool = False,
+    single_flight: SingleFlight | None = None,
+) -> list[dict[str, Any]]:
+    """Classify every count in *counts*, returning one result dict per count.
+
+    Each result is ``{"class": ..., "embedding": ..., "needs_review": ...}``.
+    The embedding is returned so callers can reuse it; pass a stack of them
+    back in as *query_embeddings* to classify the same text without another
+    API call. It is None when the embedding request failed or was never
+    needed because the answer came from *local_index* or *cache*.
+    ``needs_review`` is True when a Gemini call the class depends on failed
+    (timed out, ran out of retries, or was refused by the open circuit
+    breaker); the class then assumes no match and must be checked by an
+    attorney.
+
+    With an *executor* the rerank calls run concurrently and speculatively;
+    see the module docstring. With *batch_rerank* the reranks are packed into
+    one generation call per RERANK_BATCH_SIZE counts. With *single_flight*
+    a count already being classified by another request takes that
+    request's answer, and is only classified here if that request fails.
+    """
+    counts = [str(count) for count in counts]
+    if not counts:
+        return []
+    run = _ClassificationRun(
+        input_manager, counts, query_embeddings, cache, local_index, thresholds, batch_rerank
+    )
+    led: dict[int, Flight] = {}
+    waiting: dict[int, Flight] = {}
+    if single_flight is not None and run.pending:
+        led, waiting = run.join_flights(single_flight)
+    results = None
+    try:
+        if run.pending:
+            if executor is not None:
+                run.run_speculative(executor)
+            else:
+                run.run_staged()
+        results = run.results()
+    finally:
+        # Waiters must hear back even if this run failed; None sends them
+        # off to classify the count themselves.
+        for i, flight in led.items():
+            single_flight.land(flight, results[i] if results is not None else None)
+
+    retry = []
+    for i, flight in waiting.items():
+        shared = single_flight.wait(flight)
+        if shared is None:
+            retry.append(i)
+        else:
+            results[i] = dict(shared)
+    if retry:
+        redone = classify_counts(
+            input_manager,
+            [counts[i] for i in retry],
+            cache=cache,
+            executor=executor,
+            local_index=local_index,
+            thresholds=thresholds,
+            batch_rerank=batch_rerank,
+        )
+        for i, result in zip(retry, redone):
+            results[i] = result
+    return results
+
+
+def classify_count_detailed(
+    input_manager: InputManager,
+    count: str,
+    *,
+    query_embedding: Any = None,
+    local_index: LocalStatuteIndex | None = None,
+) -> dict[str, Any]:
+    """Classify a single count; see ``classify_counts`` for the result shape."""
+    query_embeddings = None if query_embedding is None else [query_embedding]
+    return classify_counts(
+        input_manager, [count], query_embeddings=query_embeddings, local_index=local_index
+    )[0]
+
+
+def classify_count(input_manager: InputManager, count: str) -> str:
+    """Run the short-circuit legal-statute classification for a single charge,
+    consulting the process-wide ``local_statute_index`` first."""
+    return classify_count_detailed(input_manager, count, local_index=local_statute_index())["class"]
@@ -0,0 +1,298 @@
+"""Latency, model-call and accuracy benchmark for ``classify_counts``.
+
+Every charge in ``legal_statutes/labeled_charges.jsonl`` is classified the
+way the server does it (citation fast path, score thresholds, batched and
+speculative reranks) once per embedding backend and cache mode:
+
+  off    no classification cache
+  cold   a fresh in-memory cache for every pass, so every count is a miss
+  warm   a cache filled by one untimed pass, so settled counts are hits
+
+For each run the report gives the p50/p95 latency of a one-count request,
+the embedding and rerank calls made per count, the throughput of
+``--workers`` concurrent one-count requests, and the accuracy with a
+confusion matrix of expected against predicted class. A separate confusion
+matrix covers the counts the citation fast path resolves without any model
+call; every one of those must be right. The ``local``
+backend needs no network or API key and stands in for Gemini; ``gemini`` is
+only run when GEMINI_API_KEY is set.
+
+    python -m classifier_benchmark [--backend local] [--cache off warm]
+        [--workers 8] [--passes 3] [--json report.json] [--baseline old.json]
+
+With ``--baseline`` the runs are compared to an earlier ``--json`` report
+and the exit status is 1 if any got less accurate, made more model calls
+per count, resolved more counts wrongly from the statute text, or slowed down
+at p95 by more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+
+from classification_cache import ClassificationCache
+from classifier import (
+    classification_executor,
+    classify_counts,
+    local_statute_index,
+    resolve_class,
+    resolve_known,
+)
+from input_manager import InputManager
+from legal_statutes.backends import BACKENDS
+from legal_statutes.calibrate_thresholds import load_labeled
+from legal_statutes.embedding_store import STATUTE_DIR
+from legal_statutes.score_thresholds import ScoreThresholds, list_name, thresholds_path
+
+LABELED_CHARGES = os.path.join(STATUTE_DIR, "labeled_charges.jsonl")
+CLASSES = ("reclassified", "none", "571", "13-sora")
+CACHE_MODES = ("off", "cold", "warm")
+DEFAULT_TOLERANCE = 0.25
+
+
+class CountingInputManager(InputManager):
+    """InputManager that counts the model calls classification makes."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self.calls = {"embed": 0, "rerank": 0, "rerank_batch": 0}
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+
+    def embed_queries(self, queries):
+        self._count("embed")
+        return super().embed_queries(queries)
+
+    def rerank(self, filename, query, top_k):
+        self._count("rerank")
+        return super().rerank(filename, query, top_k)
+
+    def rerank_batch(self, items):
+        # A batch of one is answered by a plain rerank, counted there.
+        if len(items) > 1:
+            self._count("rerank_batch")
+        return super().rerank_batch(items)
+
+
+def expected_class(matches: set[str]) -> str:
+    """The class a charge matching the lists named in *matches* should get."""
+    return resolve_class(lambda filename: list_name(filename) in matches)
+
+
+def load_corpus(path: str = LABELED_CHARGES) -> list[tuple[str, str]]:
+    """Return ``(count, expected class)`` pairs from a labeled charge file."""
+    return [(count, expected_class(matches)) for count, matches in load_labeled(path)]
+
+
+def available_backends() -> list[str]:
+    """Backends that can run here: ``gemini`` needs GEMINI_API_KEY."""
+    return [name for name in BACKENDS if name != "gemini" or os.environ.get("GEMINI_API_KEY")]
+
+
+@contextmanager
+def active_backend(name: str) -> Iterator[None]:
+    previous = os.environ.get("EMBEDDING_BACKEND")
+    os.environ["EMBEDDING_BACKEND"] = name
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("EMBEDDING_BACKEND", None)
+        else:
+            os.environ["EMBEDDING_BACKEND"] = previous
+
+
+def confusion_matrix(expected: list[str], predicted: list[str]) -> dict[str, dict[str, int]]:
+    """``{expected class: {predicted class: count}}`` over ``CLASSES``."""
+    matrix = {row: {column: 0 for column in CLASSES} for row in CLASSES}
+    for want, got in zip(expected, predicted):
+        matrix.setdefault(want, {}).setdefault(got, 0)
+        matrix[want][got] += 1
+    return matrix
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    return round(float(np.percentile(samples, q)) * 1000, 3) if samples else 0.0
+
+
+def run_benchmark(
+    corpus: list[tuple[str, str]],
+    backend: str,
+    cache_mode: str,
+    *,
+    workers: int = 8,
+    passes: int = 1,
+) -> dict[str, Any]:
+    """Benchmark one backend and cache mode over *corpus*; returns the report."""
+    counts = [count for count, _ in corpus]
+    expected = [cls for _, cls in corpus]
+    with active_backend(backend):
+        thresholds = ScoreThresholds.load(thresholds_path(backend))
+        options = {
+            "executor": classification_executor(),
+            "local_index": local_statute_index(),
+            "thresholds": thresholds if thresholds.bands else None,
+            "batch_rerank": True,
+        }
+        cache = ClassificationCache(":memory:") if cache_mode == "warm" else None
+
+        def new_pass() -> ClassificationCache | None:
+            return ClassificationCache(":memory:") if cache_mode == "cold" else cache
+
+        if cache_mode == "warm":
+            classify_counts(InputManager(), counts, cache=cache, **options)
+
+        # Latency and calls: one count per request, one request at a time.
+        manager = CountingInputManager()
+        pass_cache = new_pass()
+        latencies, predicted = [], []
+        for count in counts:
+            started = time.perf_counter()
+            result = classify_counts(manager, [count], cache=pass_cache, **options)[0]
+            latencies.append(time.perf_counter() - started)
+            predicted.append(result["class"])
+
+        # Throughput: one-count requests from *workers* concurrent sessions.
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in range(passes):
+                pass_cache = new_pass()
+                list(pool.map(
+                    lambda count: classify_counts(InputManager(), [count], cache=pass_cache, **options),
+                    counts,
+                ))
+        elapsed = time.perf_counter() - started
+
+    # Counts the statute text settles with no Gemini call must be right:
+    # nothing downstream (the model, an attorney's review flag) sees them.
+    local = [resolve_known(options["local_index"].lookup(count)) for count in counts]
+    local_expected = [want for want, got in zip(expected, local) if got is not None]
+    local_predicted = [got for got in local if got is not None]
+
+    correct = sum(want == got for want, got in zip(expected, predicted))
+    return {
+        "backend": backend,
+        "cache": cache_mode,
+        "counts": len(counts),
+        "accuracy": round(correct / len(counts), 4) if counts else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "embed_calls_per_count": round(manager.calls["embed"] / len(counts), 4) if counts else 0.0,
+        "rerank_calls_per_count": round(
+            (manager.calls["rerank"] + manager.calls["rerank_batch"]) / len(counts), 4
+        ) if counts else 0.0,
+        "throughput_per_s": round(len(counts) * passes / elapsed, 2) if elapsed else 0.0,
+        "workers": workers,
+        "confusion": confusion_matrix(expected, predicted),
+        "misclassified": [
+            {"count": count, "expected": want, "predicted": got}
+            for count, want, got in zip(counts, expected, predicted)
+            if want != got
+        ],
+        "local_resolved": len(local_predicted),
+        "local_confusion": confusion_matrix(local_expected, local_predicted),
+        "local_misclassified": [
+            {"count": count, "expected": want, "predicted": got}
+            for count, want, got in zip(counts, expected, local)
+            if got is not None and want != got
+        ],
+    }
+
+
+def compare(
+    reports: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Describe every way *reports* regressed against *baseline*."""
+    previous = {(report["backend"], report["cache"]): report for report in baseline}
+    regressions = []
+    for report in reports:
+        before = previous.get((report["backend"], report["cache"]))
+        if before is None:
+            continue
+        label = f"{report['backend']}/{report['cache']}"
+        if report["accuracy"] < before["accuracy"]:
+            regressions.append(f"{label}: accuracy {before['accuracy']} -> {report['accuracy']}")
+        wrong, wrong_before = len(report["local_misclassified"]), len(before.get("local_misclassified", []))
+        if wrong > wrong_before:
+            regressions.append(f"{label}: counts misclassified locally {wrong_before} -> {wrong}")
+        for key in ("embed_calls_per_count", "rerank_calls_per_count"):
+            if report[key] > before[key] + 1e-9:
+                regressions.append(f"{label}: {key} {before[key]} -> {report[key]}")
+        if report["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']}ms -> {report['p95_ms']}ms")
+    return regressions
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"{report['backend']}/{report['cache']}: accuracy {report['accuracy']:.1%}, "
+        f"p50 {report['p50_ms']:.2f}ms, p95 {report['p95_ms']:.2f}ms, "
+        f"{report['embed_calls_per_count']:.2f} embed + "
+        f"{report['rerank_calls_per_count']:.2f} rerank calls/count, "
+        f"{report['throughput_per_s']:.1f} counts/s with {report['workers']} workers"
+    )
+    print("  expected \\ predicted" + "".join(cls.rjust(14) for cls in CLASSES))
+    for want in CLASSES:
+        row = report["confusion"][want]
+        print("  " + want.ljust(20) + "".join(str(row[got]).rjust(14) for got in CLASSES))
+    for miss in report["misclassified"]:
+        print(f"  ! {miss['count']!r}: expected {miss['expected']}, got {miss['predicted']}")
+    print(f"  {report['local_resolved']} counts resolved from the statute text alone")
+    for miss in report["local_misclassified"]:
+        print(f"  !! {miss['count']!r}: expected {miss['expected']}, resolved locally as {miss['predicted']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=LABELED_CHARGES)
+    parser.add_argument("--backend", nargs="+", choices=sorted(BACKENDS), default=None,
+                        help="default: every backend that can run here")
+    parser.add_argument("--cache", nargs="+", choices=CACHE_MODES, default=list(CACHE_MODES))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--passes", type=int, default=3, help="corpus passes for throughput")
+    parser.add_argument("--json", default=None, help="write the reports to this file")
+    parser.add_argument("--baseline", default=None, help="earlier --json report to compare to")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    backends = args.backend or available_backends()
+    if "gemini" not in backends and args.backend is None:
+        print("GEMINI_API_KEY is not set; benchmarking the offline backends only")
+    reports = []
+    for backend in backends:
+        for cache_mode in args.cache:
+            report = run_benchmark(corpus, backend, cache_mode, workers=args.workers, passes=args.passes)
+            print_report(report)
+            reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(reports, file, indent=2)
+            file.write("\n")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(reports, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
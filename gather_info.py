@@ -1,65 +1,167 @@
+from datetime import datetime
+
 from input_manager import InputManager
 from output_manager import OutputManager
 from case_classes.misdemeanor import Misdemeanor
 from case_classes.arrest import Arrest
 from case_classes.felony import Felony
 
+PRELIM_QUESTIONS = ["questions/prelim_questions.json"]
+CASE_TYPE_QUESTIONS = ["questions/case_questions.json"]
+FELONY, MISDEMEANOR, ARREST = 0, 1, 2
+CASE_QUESTIONS = {
+    FELONY: ["questions/shared_questions.json", "questions/felony_questions.json"],
+    MISDEMEANOR: ["questions/shared_questions.json", "questions/misdo_questions.json"],
+    ARREST: ["questions/arrest_questions.json"],
+}
+# Answers to CASE_QUESTIONS, in order, as the case classes' keyword arguments.
+SHARED_FIELDS = ("case_name", "arresting_agency", "arrest_date", "addl_arrests", "court", "resolved",
+                 "convic_dismiss_defer_drug", "treatment", "sentencing_date", "fines_paid", "expir_no_risk")
+CASE_FIELDS = {
+    FELONY: SHARED_FIELDS + ("counts",),
+    MISDEMEANOR: SHARED_FIELDS + ("fine_amount", "imprisoned"),
+    ARREST: ("case_name", "arresting_agency", "arrest_date", "expir_no_risk"),
+}
+
+EARLY_EXIT_MESSAGES = {
+    "pending": "While some records may be eligible for expungement, such as pardoned cases, many records will not be eligible due to the pending charges or unexpired deferred sentence.  Generally, it is recommended that the person wait until the pending charges are resolved or the deferred sentence has expired.",
+    "out_of_state": "While there is a process for pardon of federal crimes, there is no process for expungement. This tool is also not appropriate to analyze expungement eligibility for cases in other states. While some Oklahoma records may be expungeable, such as pardoned cases, out-of-state or federal records can complicate the expungement analysis, so this person’s record are not suitable to be analyzed by this tool.",
+    "serving": "While some records may be eligible for expungement, such as pardoned cases, many records will not be eligible due to the current sentence being served.  Generally, it is recommended that the person wait until completing their sentence for all cases before applying for expungement.",
+}
+
+
+def check_ans(answer):
+    if isinstance(answer, bool):
+        return answer
+    return 'y' in str(answer).lower()
+
+
+class GatherState():
+    """The information-gathering flow as a state machine (mirrors engine.js).
+
+    ``filenames()`` names the question files to ask next and ``advance()``
+    takes their decoded answers, so no thread has to wait for the user in
+    between. Phases run prelim -> case-type -> case-details -> case-type ...
+    -> done. ``to_dict()`` is plain JSON and ``from_dict()`` revives it.
+    """
+
+    def __init__(self):
+        self.phase = "prelim"
+        self.num_cases = 0
+        self.case_index = 0
+        self.case_type = None
+        self.messages = []
+        # [case type, decoded answers] per case gathered so far.
+        self.cases = []
+
+    @property
+    def done(self):
+        return self.phase == "done"
+
+    def filenames(self):
+        """The question files to ask next, or None once gathering is done."""
+        if self.phase == "prelim":
+            return PRELIM_QUESTIONS
+        if self.phase == "case-type":
+            return CASE_TYPE_QUESTIONS
+        if self.phase == "case-details":
+            return CASE_QUESTIONS[self.case_type]
+        return None
+
+    def advance(self, answers):
+        """Record the decoded *answers* to ``filenames()`` and move on."""
+        answers = list(answers)
+        if self.phase == "prelim":
+            pending, out_of_state, serving, num_cases = answers
+            for flag, key in ((pending, "pending"), (out_of_state, "out_of_state"), (serving, "serving")):
+                if check_ans(flag):
+                    self.messages.append(EARLY_EXIT_MESSAGES[key])
+            if self.messages:
+                self.phase = "done"
+                return
+            self.num_cases = int(num_cases)
+            self._next_case()
+        elif self.phase == "case-type":
+            self.case_type = answers[0]
+            if self.case_type in CASE_QUESTIONS:
+                self.phase = "case-details"
+            else:
+                self.case_index += 1
+                self._next_case()
+        elif self.phase == "case-details":
+            self.cases.append([self.case_type, answers])
+            self.case_index += 1
+            self._next_case()
+        else:
+            raise ValueError(f"No questions are pending in phase {self.phase!r}")
+
+    def _next_case(self):
+        self.case_type = None
+        self.phase = "case-type" if self.case_index < self.num_cases else "done"
+
+    def build_cases(self):
+        """Return ``(misdos, felons, arrests)`` for the cases gathered."""
+        built = {FELONY: [], MISDEMEANOR: [], ARREST: []}
+        for case_type, answers in self.cases:
+            fields = dict(zip(CASE_FIELDS[case_type], answers))
+            if case_type == FELONY:
+                built[FELONY].append(Felony(**fields))
+            elif case_type == MISDEMEANOR:
+                built[MISDEMEANOR].append(Misdemeanor(**fields))
+            else:
+                built[ARREST].append(Arrest(resolved=True, **fields))
+        return built[MISDEMEANOR], built[FELONY], built[ARREST]
+
+    def to_dict(self):
+        return {
+            "phase": self.phase,
+            "num_cases": self.num_cases,
+            "case_index": self.case_index,
+            "case_type": self.case_type,
+            "messages": list(self.messages),
+            "cases": [[case_type, _encode(answers)] for case_type, answers in self.cases],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.phase = data["phase"]
+        state.num_cases = data["num_cases"]
+        state.case_index = data["case_index"]
+        state.case_type = data["case_type"]
+        state.messages = list(data["messages"])
+        state.cases = [[case_type, _decode(answers)] for case_type, answers in data["cases"]]
+        return state
+
+
+def _encode(value):
+    """Decoded answers as JSON: dates become ``{"date": iso}``, tuples lists."""
+    if isinstance(value, datetime):
+        return {"date": value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and set(value) == {"date"}:
+        return datetime.fromisoformat(value["date"])
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
 class InformationGatherer():
     def __init__(self, input_manager=None, output_manager=None):
         self.inputManager = input_manager if input_manager is not None else InputManager()
         self.outputManager = output_manager if output_manager is not None else OutputManager()
-        self.num_cases = -1
-
-    def prelim_questions(self):
-        pending, out_of_state, serving, num_cases = self.inputManager.ask_questions("questions/prelim_questions.json")
-        
-        if self.inputManager.check_ans(pending) or self.inputManager.check_ans(out_of_state) or  self.inputManager.check_ans(serving):
-            if self.inputManager.check_ans(pending):
-                self.outputManager.print_out("While some records may be eligible for expungement, such as pardoned cases, many records will not be eligible due to the pending charges or unexpired deferred sentence.  Generally, it is recommended that the person wait until the pending charges are resolved or the deferred sentence has expired.")         
-            if self.inputManager.check_ans(out_of_state): 
-                self.outputManager.print_out("While there is a process for pardon of federal crimes, there is no process for expungement. This tool is also not appropriate to analyze expungement eligibility for cases in other states. While some Oklahoma records may be expungeable, such as pardoned cases, out-of-state or federal records can complicate the expungement analysis, so this person’s record are not suitable to be analyzed by this tool.")
-            if self.inputManager.check_ans(serving):
-                self.outputManager.print_out("While some records may be eligible for expungement, such as pardoned cases, many records will not be eligible due to the current sentence being served.  Generally, it is recommended that the person wait until completing their sentence for all cases before applying for expungement.")
-            return
-        self.num_cases = num_cases
-
-
-    def get_misdo(self):
-        case_name, arresting_agency, arrest_date, addl_arrests, court, resolved, convic_dismiss_defer_drug, treatment, \
-            sentencing_date, fines_paid, expir_no_risk, fine_amount, imprisoned \
-                = self.inputManager.ask_questions(["questions/shared_questions.json","questions/misdo_questions.json"])
-        return Misdemeanor(resolved=resolved, convic_dismiss_defer_drug=convic_dismiss_defer_drug, treatment=treatment,
-                           arresting_agency=arresting_agency, court=court,
-                           sentencing_date=sentencing_date, fines_paid=fines_paid, expir_no_risk=expir_no_risk, 
-                           case_name=case_name, fine_amount=fine_amount, imprisoned=imprisoned,
-                           arrest_date=arrest_date, addl_arrests=addl_arrests)
-
-    def get_felony(self):
-        case_name, arresting_agency, arrest_date, addl_arrests, court, resolved, convic_dismiss_defer_drug, treatment, \
-            sentencing_date, fines_paid, expir_no_risk, counts \
-                = self.inputManager.ask_questions(["questions/shared_questions.json", "questions/felony_questions.json"])
-        return Felony(resolved=resolved, convic_dismiss_defer_drug=convic_dismiss_defer_drug, sentencing_date=sentencing_date, 
-                        fines_paid=fines_paid, counts=counts, expir_no_risk=expir_no_risk, 
-                        case_name=case_name, treatment=treatment, arresting_agency=arresting_agency, court=court,
-                        arrest_date=arrest_date, addl_arrests=addl_arrests)
-
-    def get_arrest(self):
-        case_name, arresting_agency, arrest_date, expir_no_risk = self.inputManager.ask_questions(["questions/arrest_questions.json"])
-        return Arrest(case_name=case_name, arresting_agency=arresting_agency, expir_no_risk=expir_no_risk, arrest_date=arrest_date, resolved=True)
 
     def gatherInfo(self):
-        self.prelim_questions()
-        misdos = []
-        felons = []
-        arrests = []
-
-        for i in range(self.num_cases):
-            ty = self.inputManager.ask_questions(["questions/case_questions.json"])
-            if ty == 0:
-                felons.append(self.get_felony())
-            elif ty == 1:
-                misdos.append(self.get_misdo())
-            elif ty == 2:
-                arrests.append(self.get_arrest())
-        
-        return misdos, felons, arrests
\ No newline at end of file
+        """Drive a GatherState by asking each batch through the input manager."""
+        state = GatherState()
+        while not state.done:
+            answers = self.inputManager.ask_questions(state.filenames())
+            state.advance(answers if isinstance(answers, tuple) else (answers,))
+        for message in state.messages:
+            self.outputManager.print_out(message)
+        return state.build_cases()
@@ -6,11 +6,33 @@ from datetime import datetime
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+def load_questions(filenames):
+    """Read question JSON file(s) into one list, in the order they are asked.
+
+    A question's ``dependancy`` names another question by key within its
+    file; it is rewritten to that question's index in the combined list.
+    """
+    questions = []
+    for fn in filenames:
+        filepath = os.path.join(BASE_DIR, fn) if not os.path.isabs(fn) else fn
+        offset = len(questions)
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+            keys = sorted(data.keys(), key=lambda k: int(k[1:]))
+            key_to_idx = {k: offset + i for i, k in enumerate(keys)}
+            for key in keys:
+                q = dict(data[key])
+                if "dependancy" in q:
+                    dep_key, dep_val = [s.strip() for s in q["dependancy"].split(",")]
+                    q["dependancy"] = f"{key_to_idx[dep_key]},{dep_val}"
+                questions.append(q)
+    return questions
+
+
 class InputManager():
     def __init__(self):
         self._question_queue = queue.Queue()
         self._answer_queue = queue.Queue()
-        self.files = {}
 
     def check_ans(self, answer):
         if isinstance(answer, bool):
@@ -19,46 +41,85 @@ class InputManager():
             return True
         return False
 
-    def check_file_contents(self, filename, query):
-        # Classification is the only feature that needs the Gemini SDK. Keep
-        # that dependency out of application startup so the standalone
-        # petition generator and non-classification pages can run independently.
-        from legal_statutes.embeddings import GetCosineSimilarity
+    def statute_top_k_all(self, filenames, queries, query_embeddings=None, k=5):
+        """Score every query against several statute lists in one matrix product.
+
+        Returns ``{filename: [candidate list per query]}``, or None if the
+        queries had to be embedded here and that call failed.
+        """
+        from legal_statutes.statute_index import STATUTE_REGISTRY
+
+        paths = [os.path.join(BASE_DIR, fn) if not os.path.isabs(fn) else fn for fn in filenames]
+        if query_embeddings is None:
+            query_embeddings = self.embed_queries(queries)
+            if query_embeddings is None:
+                return None
+        fused = STATUTE_REGISTRY.fused(paths)
+        by_name = fused.top_k_batch(query_embeddings, k)
+        return {fn: by_name[name] for fn, name in zip(filenames, fused.names)}
+
+    def rerank(self, filename, query, top_k):
+        """Ask Gemini whether *query* matches one of its *top_k* candidates.
+
+        Returns True or False, or None when Gemini failed and the answer is
+        unknown. None is falsy, so it still reads as "no match" in the
+        precedence chain, but callers must not remember it as a real answer.
+        """
+        from legal_statutes.embeddings import get_similarity_engine
 
         filepath = os.path.join(BASE_DIR, filename) if not os.path.isabs(filename) else filename
-        if filepath not in self.files:
-            similarity_engine = GetCosineSimilarity()
-            similarity_engine.embed_file(filepath)
-            self.files[filepath] = similarity_engine
-        cosine_checker = self.files[filepath]
-        match = None
         try:
-            match = cosine_checker.get_matching_crime(query)
+            match = get_similarity_engine(filepath).get_best_from_top_k(top_k, query)
         except Exception as e:
             print(f"Error when getting querying gemini, {e}. Defaulting to None, will need attorney review")
-        print (match)
+            return None
         return match != None
 
+    def rerank_batch(self, items):
+        """Rerank many ``(filename, query, top_k)`` triples in one generation call.
+
+        Returns True/False/None per triple like ``rerank``. Triples the batched
+        answer does not cover are reranked on their own instead, unless the
+        Gemini circuit breaker is open, when every answer is None at once.
+        """
+        from legal_statutes.backends import UNANSWERED
+        from legal_statutes.embeddings import get_similarity_engine
+        from legal_statutes.resilience import CircuitOpenError
+
+        try:
+            backend = get_similarity_engine().backend
+            matches = backend.rerank_batch([(query, top_k) for _, query, top_k in items])
+        except CircuitOpenError as e:
+            print(f"{e}. {len(items)} checks will need attorney review")
+            return [None] * len(items)
+        except Exception as e:
+            print(f"Error when batch reranking with gemini, {e}. Falling back to one call per count")
+            matches = [UNANSWERED] * len(items)
+        return [
+            self.rerank(filename, query, top_k) if match is UNANSWERED else match != None
+            for (filename, query, top_k), match in zip(items, matches)
+        ]
+
+    def embed_queries(self, queries):
+        """Embed every query in as few API calls as possible.
+
+        Returns a row-per-query matrix, or None if the embedding call fails.
+        """
+        from legal_statutes.embeddings import get_similarity_engine
+
+        try:
+            return get_similarity_engine().embed_text(list(queries))
+        except Exception as e:
+            print(f"Error when embedding queries with gemini, {e}")
+            return None
+
     def ask_questions(self, filenames):
         """Read question JSON file(s), enqueue for the web frontend, block until
         decoded answers arrive, and return them as a tuple (or single value)."""
         if isinstance(filenames, str):
             filenames = [filenames]
 
-        questions = []
-        for fn in filenames:
-            filepath = os.path.join(BASE_DIR, fn) if not os.path.isabs(fn) else fn
-            offset = len(questions)
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-                keys = sorted(data.keys(), key=lambda k: int(k[1:]))
-                key_to_idx = {k: offset + i for i, k in enumerate(keys)}
-                for key in keys:
-                    q = dict(data[key])
-                    if "dependancy" in q:
-                        dep_key, dep_val = [s.strip() for s in q["dependancy"].split(",")]
-                        q["dependancy"] = f"{key_to_idx[dep_key]},{dep_val}"
-                    questions.append(q)
+        questions = load_questions(filenames)
 
         # Enqueue questions with source filenames for the web server
         self._question_queue.put({"filenames": filenames, "questions": questions})
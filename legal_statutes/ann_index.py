@@ -0,0 +1,248 @@
+"""Inverted-file (IVF) approximate nearest-neighbor index for large statute lists.
+
+Exact search scores a query against every row of a list, which is fine for
+the four short lists shipped today but grows linearly with a full title of
+statutes or a charge-code table. An IVF index clusters the rows with
+spherical k-means into about ``sqrt(rows)`` lists. A query is scored
+against the centroids first, and then exactly against the rows of its
+``n_probe`` closest clusters only. That costs about ``sqrt(rows)``
+products instead of ``rows``. Raising ``n_probe`` trades latency for
+recall; probing every cluster gives exact results.
+
+The index is built by ``python -m legal_statutes.build_embeddings`` for
+every list of at least ``ANN_MIN_ROWS`` rows and saved next to the matrix as
+``<name><suffix>.ivf.npz``, together with a digest of the matrix it was built
+from. A stale index is ignored and the list is searched exactly.
+
+  ANN_MIN_ROWS   lists smaller than this are always searched exactly (default 5000)
+  ANN_NPROBE     clusters scanned per query (default 8)
+
+``python -m legal_statutes.ann_index`` benchmarks recall and latency
+against exact search on a synthetic corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from legal_statutes.embedding_store import EMBED_DTYPE
+
+ANN_MIN_ROWS = int(os.environ.get("ANN_MIN_ROWS", "5000"))
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+KMEANS_ITERATIONS = 20
+# Rows k-means is trained on; the rest are only assigned to a cluster.
+KMEANS_SAMPLE = 50_000
+
+
+def ann_path(file_path: str, suffix: str) -> str:
+    return f"{file_path[:-4]}{suffix}.ivf.npz"
+
+
+def matrix_digest(matrix: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(matrix).tobytes()).hexdigest()
+
+
+def default_n_lists(rows: int) -> int:
+    return max(1, int(round(np.sqrt(rows))))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(EMBED_DTYPE)
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Closest centroid of every row, in chunks to bound the score matrix."""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], chunk):
+        labels[start:start + chunk] = np.argmax(matrix[start:start + chunk] @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(
+    matrix: np.ndarray, n_lists: int, *, iterations: int = KMEANS_ITERATIONS, seed: int = 0
+) -> np.ndarray:
+    """Unit-norm centroids that maximize the rows' cosine to their centroid."""
+    rng = np.random.default_rng(seed)
+    sample = matrix
+    if matrix.shape[0] > KMEANS_SAMPLE:
+        sample = matrix[np.sort(rng.choice(matrix.shape[0], KMEANS_SAMPLE, replace=False))]
+    sample = np.asarray(sample, dtype=EMBED_DTYPE)
+    centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            # Reseed empty clusters with random rows rather than lose them.
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+        updated = _normalize(sums)
+        if np.allclose(updated, centroids, atol=1e-6):
+            break
+        centroids = updated
+    return centroids
+
+
+class IVFIndex:
+    """Cluster centroids plus, per cluster, the ids of its rows.
+
+    ``order`` holds every row id grouped by cluster and
+    ``offsets[c]:offsets[c + 1]`` is cluster ``c``'s slice of it.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, digest: str) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=EMBED_DTYPE)
+        self.order = order.astype(np.int32, copy=False)
+        self.offsets = offsets.astype(np.int64, copy=False)
+        self.digest = digest
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def rows(self) -> int:
+        return int(self.order.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: int | None = None, *, seed: int = 0) -> "IVFIndex":
+        n_lists = min(n_lists or default_n_lists(matrix.shape[0]), matrix.shape[0])
+        centroids = spherical_kmeans(matrix, n_lists, seed=seed)
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+        return cls(centroids, order, offsets, matrix_digest(matrix))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, centroids=self.centroids, order=self.order,
+                     offsets=self.offsets, digest=np.array(self.digest))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, matrix: np.ndarray | None = None) -> "IVFIndex | None":
+        """Read *path*; None if it is missing or was built from another matrix."""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                index = cls(saved["centroids"], saved["order"], saved["offsets"], str(saved["digest"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read ANN index {path}: {e}. Searching exactly.")
+            return None
+        if matrix is not None and (
+            index.rows != matrix.shape[0]
+            or index.centroids.shape[1] != matrix.shape[1]
+            or index.digest != matrix_digest(matrix)
+        ):
+            print(f"ANN index {path} is stale; searching exactly until it is rebuilt.")
+            return None
+        return index
+
+    def candidates(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        """Row ids in the *n_probe* clusters closest to *query*."""
+        n_probe = min(max(1, n_probe), self.n_lists)
+        coarse = self.centroids @ query
+        if n_probe < self.n_lists:
+            probed = np.argpartition(-coarse, n_probe - 1)[:n_probe]
+        else:
+            probed = np.arange(self.n_lists)
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probed])
+
+    def search(
+        self, matrix: np.ndarray, queries: np.ndarray, k: int, n_probe: int = ANN_NPROBE
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Approximate top-*k* ``(row ids, scores)`` per query, best first."""
+        queries = np.asarray(queries, dtype=EMBED_DTYPE).reshape(-1, matrix.shape[1])
+        results = []
+        for query in queries:
+            rows = self.candidates(query, n_probe)
+            scores = matrix[rows] @ query
+            top = min(k, rows.shape[0])
+            if top < rows.shape[0]:
+                best = np.argpartition(-scores, top - 1)[:top]
+            else:
+                best = np.arange(rows.shape[0])
+            best = best[np.argsort(-scores[best], kind="stable")]
+            results.append((rows[best], scores[best]))
+        return results
+
+
+# -- benchmark -----------------------------------------------------------
+
+
+def synthetic_corpus(rows: int, dims: int, *, topics: int | None = None, seed: int = 0) -> np.ndarray:
+    """Unit rows scattered around random topics, like statute families."""
+    rng = np.random.default_rng(seed)
+    topics = topics or max(1, rows // 50)
+    centers = rng.standard_normal((topics, dims)).astype(EMBED_DTYPE)
+    rows_matrix = centers[rng.integers(0, topics, rows)] + 0.6 * rng.standard_normal((rows, dims)).astype(EMBED_DTYPE)
+    return _normalize(rows_matrix)
+
+
+def benchmark(
+    matrix: np.ndarray, queries: np.ndarray, *, k: int = 5, probes=(1, 2, 4, 8, 16, 32)
+) -> list[dict[str, Any]]:
+    """Recall@k and per-query latency of exact search and IVF at each n_probe."""
+    started = time.perf_counter()
+    exact_top = np.argpartition(-(queries @ matrix.T), k - 1, axis=1)[:, :k]
+    exact = [set(row) for row in exact_top]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    started = time.perf_counter()
+    index = IVFIndex.build(matrix)
+    build_seconds = time.perf_counter() - started
+
+    report = [{"search": "exact", "n_probe": None, "recall": 1.0, "ms_per_query": round(exact_ms, 3)}]
+    for n_probe in probes:
+        if n_probe > index.n_lists:
+            break
+        started = time.perf_counter()
+        found = index.search(matrix, queries, k, n_probe)
+        ms = (time.perf_counter() - started) * 1000 / len(queries)
+        recall = np.mean([len(set(rows) & truth) / k for (rows, _), truth in zip(found, exact)])
+        report.append({
+            "search": "ivf", "n_probe": n_probe, "recall": round(float(recall), 4),
+            "ms_per_query": round(ms, 3), "n_lists": index.n_lists,
+            "build_seconds": round(build_seconds, 2),
+        })
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark IVF search against exact search.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[2_000, 20_000, 100_000])
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        matrix = synthetic_corpus(rows, args.dims)
+        rng = np.random.default_rng(1)
+        # Queries are perturbed corpus rows: a charge worded a little differently.
+        picks = rng.integers(0, rows, args.queries)
+        noise = rng.standard_normal((args.queries, args.dims)).astype(EMBED_DTYPE)
+        queries = _normalize(matrix[picks] + noise * (0.5 / np.sqrt(args.dims)))
+        print(f"{rows} rows x {args.dims} dims, {args.queries} queries, top-{args.k}")
+        for row in benchmark(matrix, queries, k=args.k):
+            probe = "-" if row["n_probe"] is None else row["n_probe"]
+            print(f"  {row['search']:>5} n_probe={probe!s:>3}  recall {row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
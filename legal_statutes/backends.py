@@ -0,0 +1,394 @@
+"""Embedding and rerank backends.
+
+Classification needs two things from a model: vectors for statute lines and
+charges (``embed``), and a final yes/no on a charge's closest statutes
+(``rerank``). A backend supplies both, and each statute list keeps one
+precomputed matrix per backend next to its text:
+
+  gemini   gemini-embedding-001 vectors and a gemini-2.5-flash rerank;
+           matrices in ``<name>_embed.npy`` (the default)
+  local    hashed character n-gram TF-IDF vectors and a score cut-off
+           rerank; CPU only, no network or API key; matrices in
+           ``<name>_local.npy``
+
+The backend is chosen per deployment with ``EMBEDDING_BACKEND``. The local
+matrices and their IDF weights are rebuilt with
+``python -m legal_statutes.backends local``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import zlib
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from legal_statutes.ann_index import ann_path
+from legal_statutes.embedding_store import (
+    EMBED_DIMS,
+    EMBED_DTYPE,
+    GEMINI_SUFFIX,
+    STATUTE_DIR,
+    STATUTE_LISTS,
+    binary_paths,
+    read_statute_lines,
+    statute_path,
+    write_binary,
+)
+from legal_statutes.resilience import CircuitOpenError, guarded_call
+
+DEFAULT_BACKEND = "gemini"
+
+# batchEmbedContents accepts at most 100 contents per request.
+EMBED_BATCH_SIZE = 100
+
+# Charges packed into one batched rerank prompt.
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "20"))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(EMBED_DTYPE)
+
+
+class EmbeddingBackend(ABC):
+    """Interface every backend implements.
+
+    ``suffix`` names the backend's matrix files (``<name><suffix>.npy``) and
+    ``dims`` their width; query vectors from ``embed`` must match both. A
+    backend missing ``embed`` or ``rerank`` cannot be created.
+    """
+
+    name = ""
+    suffix = ""
+    dims = 0
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return one L2-normalized float32 row per text."""
+
+    @abstractmethod
+    def rerank(self, query: str, top_k: list[tuple[str, float]]) -> str | None:
+        """Return the statute in *top_k* that *query* matches, or None."""
+
+    def rerank_batch(self, items: list[tuple[str, list[tuple[str, float]]]]) -> list:
+        """``rerank`` for many ``(query, top_k)`` pairs; one answer per pair.
+
+        An answer may be ``UNANSWERED``, in which case the caller reranks
+        that pair on its own.
+        """
+        return [self.rerank(query, top_k) for query, top_k in items]
+
+
+class GeminiBackend(EmbeddingBackend):
+    """Gemini embeddings plus an LLM rerank.
+
+    Every request goes through ``guarded_call``: the shared rate limiter, a
+    per-attempt timeout, budgeted retries and the circuit breaker.
+    """
+
+    name = "gemini"
+    suffix = GEMINI_SUFFIX
+    dims = EMBED_DIMS
+
+    def __init__(self, client=None) -> None:
+        # The SDK is only needed by this backend, so it is imported here.
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        self._genai = genai
+        self.client = client if client is not None else genai.GenerativeModel(
+            'gemini-2.5-flash')
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            result = guarded_call(lambda timeout: self._genai.embed_content(
+                model="models/gemini-embedding-001",
+                content=batch,
+                request_options={"timeout": timeout},
+            ))
+            vectors.extend(result['embedding'])
+        return _normalize(np.array(vectors, dtype=EMBED_DTYPE))
+
+    def _generate(self, prompt: str):
+        from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+        return guarded_call(lambda timeout: self.client.generate_content(
+            prompt,
+            request_options={"timeout": timeout},
+            safety_settings={
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT:
+                HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_HARASSMENT:
+                HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH:
+                HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT:
+                HarmBlockThreshold.BLOCK_NONE,
+            }))
+
+    def rerank(self, query: str, top_k: list[tuple[str, float]]) -> str | None:
+        crime_string = ""
+        for crime, score in top_k:
+            crime_string += f"{crime}\n "
+        crime_string = crime_string[:-2]
+        completion = self._generate(
+            f"I have a list of newline separated legal statute descriptions {crime_string}.\
+                    I have a legal statute description {query}. Of the counts provided, does this statute match any of them? \
+                    The language may be different, but if the meaning is the same, please return that count. Otherwise, return 0. Do not return anything else.")
+        if completion.text == "0":
+            return None
+        print(completion.text)
+        return completion.text
+
+    def rerank_batch(self, items: list[tuple[str, list[tuple[str, float]]]]) -> list:
+        """Rerank every pair with one generation call, asking for JSON back.
+
+        Pairs the answer does not cover, or all of them if the call fails or
+        its answer cannot be parsed, come back ``UNANSWERED``. While the
+        circuit breaker is open ``CircuitOpenError`` is raised instead, as
+        one call per pair would be refused too.
+        """
+        if len(items) < 2:
+            return [UNANSWERED] * len(items)
+        try:
+            completion = self._generate(batch_rerank_prompt(items))
+            return parse_batch_answer(completion.text, items)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Batched rerank failed, {e}. Reranking one charge at a time")
+            return [UNANSWERED] * len(items)
+
+
+# A batched rerank answer that did not cover this pair.
+UNANSWERED = object()
+
+
+def batch_rerank_prompt(items: list[tuple[str, list[tuple[str, float]]]]) -> str:
+    """One prompt covering every ``(charge, candidates)`` pair in *items*."""
+    parts = [
+        "For each numbered charge below, decide whether it matches one of its numbered "
+        "candidate legal statute descriptions. The language may be different, but the "
+        "meaning must be the same.",
+        'Answer with only a JSON array holding one object per charge, like '
+        '[{"charge": 1, "match": 2}], where "match" is the number of the matching '
+        "candidate, or 0 if none of them match. Do not return anything else.",
+    ]
+    for number, (query, top_k) in enumerate(items, 1):
+        candidates = "\n".join(f"  {n}. {crime}" for n, (crime, _score) in enumerate(top_k, 1))
+        parts.append(f"Charge {number}: {query}\n{candidates}")
+    return "\n\n".join(parts)
+
+
+def parse_batch_answer(text: str, items: list[tuple[str, list[tuple[str, float]]]]) -> list:
+    """Map a batched rerank answer back to one choice per item.
+
+    Each choice is the matched statute, None for no match, or
+    ``UNANSWERED`` when the answer is missing or malformed for that item.
+    """
+    choices: list = [UNANSWERED] * len(items)
+    body = (text or "").strip()
+    if body.startswith("```"):
+        body = body.strip("`")
+        body = body[body.index("\n") + 1:] if "\n" in body else ""
+    try:
+        answers = json.loads(body)
+    except ValueError:
+        print(f"Could not parse batched rerank answer: {text!r}")
+        return choices
+    if not isinstance(answers, list):
+        return choices
+    for answer in answers:
+        if not isinstance(answer, dict):
+            continue
+        number, match = answer.get("charge"), answer.get("match")
+        if not isinstance(number, int) or not isinstance(match, int) or isinstance(match, bool):
+            continue
+        if not 1 <= number <= len(items):
+            continue
+        top_k = items[number - 1][1]
+        if match == 0:
+            choices[number - 1] = None
+        elif 1 <= match <= len(top_k):
+            choices[number - 1] = top_k[match - 1][0]
+    return choices
+
+
+# Citation text shared by most statute lines; it carries no meaning for
+# matching and would otherwise dominate the n-gram vectors.
+_BOILERPLATE = re.compile(
+    r"\b(?:as\s+(?:provided|defined)\s+(?:for\s+)?(?:in|by)|pursuant\s+to)\b.*?"
+    r"(?:of\s+(?:this\s+title|title\s+\w+(?:\s+of\s+the\s+oklahoma\s+statutes)?))"
+    r"|\b\d+\s*o\.?\s*s\.?\s*§*\s*[\d.\-a-z]*"
+    r"|\(if the offense involved[^)]*\)",
+    re.IGNORECASE,
+)
+
+LOCAL_DIMS = 4096
+LOCAL_NGRAMS = (3, 5)
+LOCAL_IDF_PATH = os.path.join(STATUTE_DIR, "local_idf.npy")
+# Best score at or above which the local rerank reports a match.
+LOCAL_MATCH_SCORE = float(os.environ.get("LOCAL_MATCH_SCORE", "0.6"))
+
+
+class HashedNgramBackend(EmbeddingBackend):
+    """TF-IDF over character n-grams hashed into a fixed number of buckets.
+
+    Character n-grams tolerate the abbreviations, plurals and typos common in
+    docket text. IDF weights come from the statute lists themselves; the
+    rerank accepts the best candidate when its score reaches *match_score*.
+    """
+
+    name = "local"
+    suffix = "_local"
+
+    def __init__(
+        self,
+        idf: np.ndarray | None = None,
+        *,
+        dims: int = LOCAL_DIMS,
+        ngrams: tuple[int, int] = LOCAL_NGRAMS,
+        match_score: float = LOCAL_MATCH_SCORE,
+    ) -> None:
+        self.dims = dims
+        self.ngrams = ngrams
+        self.match_score = match_score
+        self.idf = np.ones(dims, dtype=EMBED_DTYPE) if idf is None else np.asarray(idf, dtype=EMBED_DTYPE)
+        if self.idf.shape != (dims,):
+            raise ValueError(f"IDF has shape {self.idf.shape}, expected ({dims},)")
+
+    def buckets(self, text: str) -> dict[int, int]:
+        """Hashed n-gram counts of *text*."""
+        text = _BOILERPLATE.sub(" ", text.lower())
+        padded = " " + " ".join(re.sub(r"[^a-z0-9]+", " ", text).split()) + " "
+        counts: dict[int, int] = {}
+        low, high = self.ngrams
+        for n in range(low, high + 1):
+            for start in range(len(padded) - n + 1):
+                bucket = zlib.crc32(padded[start:start + n].encode("utf-8")) % self.dims
+                counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def fit_idf(self, documents: list[str]) -> np.ndarray:
+        """Smoothed IDF of every bucket over *documents*; sets and returns it."""
+        frequency = np.zeros(self.dims, dtype=np.float64)
+        for document in documents:
+            frequency[list(self.buckets(document))] += 1
+        self.idf = (np.log((1 + len(documents)) / (1 + frequency)) + 1).astype(EMBED_DTYPE)
+        return self.idf
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dims), dtype=EMBED_DTYPE)
+        for row, text in enumerate(texts):
+            for bucket, count in self.buckets(text).items():
+                matrix[row, bucket] = 1 + math.log(count)
+        return _normalize(matrix * self.idf)
+
+    def rerank(self, query: str, top_k: list[tuple[str, float]]) -> str | None:
+        if top_k and top_k[0][1] >= self.match_score:
+            return top_k[0][0]
+        return None
+
+    @classmethod
+    def load(cls, path: str = LOCAL_IDF_PATH) -> "HashedNgramBackend":
+        """Backend with the IDF weights saved by ``build_local``.
+
+        Without them the weights are fitted on the statute lists in place.
+        """
+        if os.path.exists(path):
+            return cls(np.load(path, allow_pickle=False))
+        print(f"{path} missing; fitting IDF weights. Run python -m legal_statutes.backends local")
+        backend = cls()
+        backend.fit_idf(_corpus_lines())
+        return backend
+
+
+def _corpus_lines(names=STATUTE_LISTS) -> list[str]:
+    return [line for name in names for line in read_statute_lines(statute_path(name))]
+
+
+def build_local(names=STATUTE_LISTS, idf_path: str = LOCAL_IDF_PATH) -> HashedNgramBackend:
+    """Write the matrix of every list in *names*.
+
+    The IDF weights are always fitted on all of ``STATUTE_LISTS``, so queries
+    score the same against a list whichever lists were rebuilt.
+    """
+    backend = HashedNgramBackend()
+    np.save(idf_path, backend.fit_idf(_corpus_lines()), allow_pickle=False)
+    for name in names:
+        path = statute_path(name)
+        lines = read_statute_lines(path)
+        write_binary(path, backend.embed(lines), lines, suffix=backend.suffix)
+    return backend
+
+
+BACKENDS = {"gemini": GeminiBackend, "local": HashedNgramBackend.load}
+
+
+def active_backend_name() -> str:
+    """The backend this deployment uses (``EMBEDDING_BACKEND``, default gemini)."""
+    name = os.environ.get("EMBEDDING_BACKEND", DEFAULT_BACKEND).strip().lower() or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}; choose one of {sorted(BACKENDS)}")
+    return name
+
+
+# Suffix and dimensions of each backend's matrices, known without building
+# the backend (which for Gemini needs an API key).
+MATRIX_FORMATS = {
+    "gemini": (GeminiBackend.suffix, GeminiBackend.dims),
+    "local": (HashedNgramBackend.suffix, LOCAL_DIMS),
+}
+
+
+
+def matrix_files(file_path: str, name: str | None = None) -> list[str]:
+    """Every file backend *name* reads to score queries against *file_path*."""
+    name = name or active_backend_name()
+    suffix, _ = MATRIX_FORMATS[name]
+    files = [*binary_paths(file_path, suffix), ann_path(file_path, suffix)]
+    if suffix == GEMINI_SUFFIX:
+        # Read when the list has not been converted to the binary format.
+        files.append(f"{file_path[:-4]}_embed.txt")
+    if name == "local":
+        files.append(LOCAL_IDF_PATH)
+    return files
+
+
+_BACKENDS: dict[str, EmbeddingBackend] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def get_backend(name: str | None = None) -> EmbeddingBackend:
+    """Return the process-wide backend called *name* (default: the active one)."""
+    name = name or active_backend_name()
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(name)
+        if backend is None:
+            backend = BACKENDS[name]()
+            _BACKENDS[name] = backend
+        return backend
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = argv if argv is not None else sys.argv[1:]
+    if args[:1] != ["local"]:
+        print("usage: python -m legal_statutes.backends local [list names...]")
+        return
+    names = tuple(args[1:]) or STATUTE_LISTS
+    backend = build_local(names)
+    print(f"local: wrote {len(names)} matrices of {backend.dims} dims and {LOCAL_IDF_PATH}")
+
+
+if __name__ == "__main__":
+    main()
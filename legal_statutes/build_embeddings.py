@@ -0,0 +1,261 @@
+"""Incremental, resumable builder for the statute embedding matrices.
+
+Every statute line is identified by a hash of its text. A build reuses the
+vector of every line already present in the list's current matrix and only
+embeds lines that are new or were edited, in ``EMBED_BATCH_SIZE`` batches
+that each wait on the Gemini rate limiter. After every batch the vectors
+embedded so far are checkpointed next to the list, so an interrupted run
+picks up where it stopped instead of paying for the same calls again.
+
+The result is written in the binary format ``load_embeddings`` reads (plus
+``<name>_embed.txt`` and its int8 twin ``<name>_embed.q8.bin`` for the
+browser client when building Gemini vectors),
+and ``embeddings_manifest.json`` records, per backend and list, the line
+hashes and a digest of the matrix that was built::
+
+    python -m legal_statutes.build_embeddings [list names...] [--backend gemini]
+
+The local n-gram backend is rebuilt in full, since its IDF weights depend on
+every line; that takes well under a second and no API calls.
+
+Lists of at least ``ANN_MIN_ROWS`` rows also get an IVF index
+(``<name><suffix>.ivf.npz``, see ``legal_statutes.ann_index``) rebuilt from
+the new matrix; smaller lists have any old one removed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from legal_statutes import ann_index
+from legal_statutes.ann_index import IVFIndex, ann_path
+from legal_statutes.backends import (
+    EMBED_BATCH_SIZE,
+    EmbeddingBackend,
+    active_backend_name,
+    build_local,
+    get_backend,
+)
+from legal_statutes.embedding_store import (
+    EMBED_DTYPE,
+    GEMINI_SUFFIX,
+    STATUTE_DIR,
+    STATUTE_LISTS,
+    binary_paths,
+    read_statute_lines,
+    statute_path,
+    write_binary,
+)
+from legal_statutes.quantize import write_browser_file
+
+MANIFEST_PATH = os.path.join(STATUTE_DIR, "embeddings_manifest.json")
+
+
+def line_hash(line: str) -> str:
+    return hashlib.sha256(line.encode("utf-8")).hexdigest()[:16]
+
+
+def checkpoint_path(file_path: str, suffix: str) -> str:
+    return f"{file_path[:-4]}{suffix}.partial.npz"
+
+
+def _existing_vectors(
+    file_path: str, backend: EmbeddingBackend
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """Vectors already built for *file_path*, by line hash.
+
+    Returns the rows of the current matrix (aligned through its ``.idx``)
+    and, separately, those an interrupted build left in its checkpoint.
+    """
+    built: dict[str, np.ndarray] = {}
+    npy_path, idx_path = binary_paths(file_path, backend.suffix)
+    if os.path.exists(npy_path) and os.path.exists(idx_path):
+        matrix = np.load(npy_path, allow_pickle=False)
+        lines = read_statute_lines(idx_path)
+        if matrix.ndim == 2 and matrix.shape == (len(lines), backend.dims):
+            built.update((line_hash(line), row) for line, row in zip(lines, matrix))
+        else:
+            print(f"{npy_path} does not match its index or backend; re-embedding every line")
+    resumed: dict[str, np.ndarray] = {}
+    checkpoint = checkpoint_path(file_path, backend.suffix)
+    if os.path.exists(checkpoint):
+        with np.load(checkpoint, allow_pickle=False) as saved:
+            if saved["vectors"].ndim == 2 and saved["vectors"].shape[1] == backend.dims:
+                resumed.update(zip(saved["hashes"].tolist(), saved["vectors"]))
+    return built, resumed
+
+
+def _save_checkpoint(path: str, embedded: dict[str, np.ndarray]) -> None:
+    hashes = list(embedded)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        np.savez(file, hashes=np.array(hashes), vectors=np.stack([embedded[h] for h in hashes]))
+    os.replace(tmp_path, path)
+
+
+def write_ann(file_path: str, suffix: str, matrix: np.ndarray, min_rows: int | None = None) -> int | None:
+    """Rebuild the IVF index of a list big enough to need one.
+
+    Returns its number of clusters, or None when the list is searched
+    exactly (and any index left from a longer version is removed).
+    """
+    min_rows = ann_index.ANN_MIN_ROWS if min_rows is None else min_rows
+    path = ann_path(file_path, suffix)
+    if matrix.shape[0] < max(1, min_rows):
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    index = IVFIndex.build(matrix)
+    index.save(path)
+    return index.n_lists
+
+
+def build_list(
+    file_path: str,
+    backend: EmbeddingBackend,
+    *,
+    batch_size: int = EMBED_BATCH_SIZE,
+    write_text: bool | None = None,
+    ann_min_rows: int | None = None,
+) -> dict[str, Any]:
+    """Bring one list's matrix up to date; returns what was done.
+
+    *write_text* also writes ``<name>_embed.txt`` and ``<name>_embed.q8.bin``;
+    by default only for the
+    Gemini backend, whose text file the browser reads, and only when the
+    matrix changed.
+    """
+    lines = read_statute_lines(file_path)
+    hashes = [line_hash(line) for line in lines]
+    built, resumed = _existing_vectors(file_path, backend)
+    known = {**built, **resumed}
+    missing = list(dict.fromkeys(h for h in hashes if h not in known))
+    text_by_hash = dict(zip(hashes, lines))
+    checkpoint = checkpoint_path(file_path, backend.suffix)
+
+    # Everything embedded since the last finished build, kept in the
+    # checkpoint until the matrix is written.
+    embedded: dict[str, np.ndarray] = dict(resumed)
+    calls = 0
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        vectors = backend.embed([text_by_hash[h] for h in batch])
+        calls += 1
+        embedded.update(zip(batch, vectors))
+        known.update(zip(batch, vectors))
+        _save_checkpoint(checkpoint, embedded)
+
+    matrix = np.vstack([known[h] for h in hashes]).astype(EMBED_DTYPE) if lines else (
+        np.zeros((0, backend.dims), dtype=EMBED_DTYPE)
+    )
+    write_binary(file_path, matrix, lines, suffix=backend.suffix)
+    text_path = f"{file_path[:-4]}_embed.txt"
+    if write_text is None:
+        changed = bool(embedded) or list(built) != list(dict.fromkeys(hashes))
+        write_text = backend.suffix == GEMINI_SUFFIX and (changed or not os.path.exists(text_path))
+    if write_text:
+        np.savetxt(f"{text_path}.tmp", matrix)
+        os.replace(f"{text_path}.tmp", text_path)
+        write_browser_file(file_path, matrix)
+    ann_lists = write_ann(file_path, backend.suffix, matrix, ann_min_rows)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return {
+        "rows": len(lines),
+        "reused": sum(1 for h in hashes if h in built and h not in embedded),
+        "resumed": sum(1 for h in hashes if h in resumed),
+        "embedded": len(missing),
+        "calls": calls,
+        "dims": backend.dims,
+        "ann_lists": ann_lists,
+        "line_hashes": hashes,
+        "matrix_sha256": hashlib.sha256(matrix.tobytes()).hexdigest(),
+    }
+
+
+def update_manifest(backend_name: str, reports: dict[str, dict[str, Any]], path: str = MANIFEST_PATH) -> None:
+    """Record the lists just built under *backend_name* in the manifest."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {}
+    entries = manifest.setdefault(backend_name, {})
+    built_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    for name, report in reports.items():
+        entries[name] = {
+            "rows": report["rows"],
+            "dims": report["dims"],
+            "ann_lists": report.get("ann_lists"),
+            "line_hashes": report["line_hashes"],
+            "matrix_sha256": report["matrix_sha256"],
+            "built_at": built_at,
+        }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+        file.write("\n")
+    os.replace(tmp_path, path)
+
+
+def build(
+    names=STATUTE_LISTS,
+    backend_name: str | None = None,
+    *,
+    batch_size: int = EMBED_BATCH_SIZE,
+    manifest_path: str = MANIFEST_PATH,
+    ann_min_rows: int | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Build every list in *names* for one backend and update the manifest."""
+    backend_name = backend_name or active_backend_name()
+    if backend_name == "local":
+        # New IDF weights change every vector, so every list is rebuilt.
+        names = STATUTE_LISTS
+        backend = build_local(names)
+        reports = {}
+        for name in names:
+            lines = read_statute_lines(statute_path(name))
+            matrix = np.load(binary_paths(statute_path(name), backend.suffix)[0], allow_pickle=False)
+            reports[name] = {
+                "rows": len(lines), "reused": 0, "resumed": 0, "embedded": len(lines), "calls": 0,
+                "dims": backend.dims, "line_hashes": [line_hash(line) for line in lines],
+                "ann_lists": write_ann(statute_path(name), backend.suffix, matrix, ann_min_rows),
+                "matrix_sha256": hashlib.sha256(matrix.tobytes()).hexdigest(),
+            }
+    else:
+        backend = get_backend(backend_name)
+        reports = {
+            name: build_list(statute_path(name), backend, batch_size=batch_size, ann_min_rows=ann_min_rows)
+            for name in names
+        }
+    update_manifest(backend_name, reports, manifest_path)
+    return reports
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild statute embeddings incrementally.")
+    parser.add_argument("names", nargs="*", default=list(STATUTE_LISTS))
+    parser.add_argument("--backend", default=None, help="default: EMBEDDING_BACKEND")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--ann-min-rows", type=int, default=None,
+                        help="build an IVF index for lists this long (default: ANN_MIN_ROWS)")
+    args = parser.parse_args(argv)
+
+    reports = build(args.names, args.backend, batch_size=args.batch_size, ann_min_rows=args.ann_min_rows)
+    for name, report in reports.items():
+        print(
+            f"{name}: {report['rows']} rows, {report['reused']} reused, "
+            f"{report['embedded']} embedded in {report['calls']} calls"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Fit the score thresholds in ``score_thresholds.json`` on labeled charges.
+
+The labeled set is JSON Lines, one charge per line, naming every statute
+list the charge belongs to (an empty list means none)::
+
+    {"count": "Robbery with a dangerous weapon", "matches": ["section571", "section13"]}
+
+Each charge is embedded and scored against every list (one batched embedding
+call, no reranks), the marks are fitted per list for the target precision,
+and a precision/recall table is printed for a sweep of targets so the
+tradeoff can be judged before the file is written::
+
+    python -m legal_statutes.calibrate_thresholds labeled.jsonl [--precision 0.98]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any
+
+import numpy as np
+
+from legal_statutes.backends import active_backend_name
+from legal_statutes.embedding_store import STATUTE_LISTS, statute_path
+from legal_statutes.score_thresholds import (
+    DEFAULT_MIN_SUPPORT,
+    DEFAULT_TARGET_PRECISION,
+    ScoreThresholds,
+    evaluate_band,
+    fit_band,
+    thresholds_path,
+)
+
+SWEEP = (0.9, 0.95, 0.98, 0.99, 1.0)
+
+
+def load_labeled(path: str) -> list[tuple[str, set[str]]]:
+    """Return ``(count, lists it matches)`` pairs from a JSON Lines file."""
+    examples = []
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            unknown = set(record["matches"]) - set(STATUTE_LISTS)
+            if unknown:
+                raise ValueError(f"{path}:{number}: unknown statute lists {sorted(unknown)}")
+            examples.append((record["count"], set(record["matches"])))
+    return examples
+
+
+def best_scores(input_manager, counts: list[str], names=STATUTE_LISTS) -> dict[str, np.ndarray]:
+    """Best cosine score of every count against each list, without reranks."""
+    paths = {name: statute_path(name) for name in names}
+    found = input_manager.statute_top_k_all(list(paths.values()), counts, k=1)
+    if found is None:
+        raise RuntimeError("Could not embed the labeled charges")
+    return {
+        name: np.array([top[0][1] if top else 0.0 for top in found[path]])
+        for name, path in paths.items()
+    }
+
+
+def calibrate(
+    scores: dict[str, np.ndarray],
+    examples: list[tuple[str, set[str]]],
+    *,
+    target_precision: float = DEFAULT_TARGET_PRECISION,
+    min_support: int = DEFAULT_MIN_SUPPORT,
+) -> tuple[ScoreThresholds, dict[str, dict[str, Any]]]:
+    """Fit marks for every list; returns the thresholds and their evaluation."""
+    bands: dict[str, dict[str, float | None]] = {}
+    report: dict[str, dict[str, Any]] = {}
+    for name, list_scores in scores.items():
+        labels = [name in matches for _, matches in examples]
+        accept, reject = fit_band(
+            list_scores, labels, target_precision=target_precision, min_support=min_support
+        )
+        bands[name] = {"accept": accept, "reject": reject}
+        report[name] = evaluate_band(list_scores, labels, accept, reject)
+    return ScoreThresholds(bands), report
+
+
+def _format(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def print_report(report: dict[str, dict[str, Any]], target_precision: float) -> None:
+    columns = ("accept", "reject", "accept_precision", "accept_recall",
+               "reject_precision", "missed", "reranks_avoided")
+    print(f"target precision {target_precision}")
+    print("  " + "list".ljust(14) + "".join(column.rjust(18) for column in columns))
+    for name, row in report.items():
+        print("  " + name.ljust(14) + "".join(_format(row[column]).rjust(18) for column in columns))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("labeled", help="JSON Lines file of labeled charges")
+    parser.add_argument("--precision", type=float, default=DEFAULT_TARGET_PRECISION)
+    parser.add_argument("--min-support", type=int, default=DEFAULT_MIN_SUPPORT)
+    parser.add_argument("--output", default=None, help="default: the active backend's file")
+    parser.add_argument("--dry-run", action="store_true", help="print the report only")
+    args = parser.parse_args(argv)
+
+    from input_manager import InputManager
+
+    examples = load_labeled(args.labeled)
+    scores = best_scores(InputManager(), [count for count, _ in examples])
+    for target in sorted(set(SWEEP) | {args.precision}):
+        _, report = calibrate(scores, examples, target_precision=target, min_support=args.min_support)
+        print_report(report, target)
+
+    thresholds, _ = calibrate(
+        scores, examples, target_precision=args.precision, min_support=args.min_support
+    )
+    if args.dry_run:
+        return
+    output = args.output or thresholds_path(active_backend_name())
+    thresholds.save(output)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Binary, memory-mapped storage for the precomputed statute embeddings.
+
+The browser client parses the ``*_embed.txt`` files itself, so those stay in
+the repository. Parsing them with ``np.loadtxt`` on the server costs seconds of
+CPU on every cold start, so ``python -m legal_statutes.embedding_store``
+converts each one into two files next to it:
+
+  <name>_embed.npy   float32 row matrix, opened with ``mmap_mode="r"``
+  <name>_embed.idx   the statute line each row was embedded from, one per line
+
+The index is what makes row alignment checkable. A statute list edited without
+re-running the converter no longer matches its index, and the loader refuses
+it instead of silently returning the wrong statute for a match.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+
+STATUTE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Every list classify_count consults, in its order of precedence.
+STATUTE_LISTS = ("reclassified", "section571", "section13", "SORA")
+
+# gemini-embedding-001 output size; query vectors must come from the same model.
+EMBED_DIMS = 3072
+EMBED_DTYPE = np.float32
+
+# File suffix of the Gemini matrices; other backends use their own.
+GEMINI_SUFFIX = "_embed"
+
+
+class EmbeddingStoreError(ValueError):
+    """Raised when a statute list and its embeddings do not line up."""
+
+
+def statute_path(name: str) -> str:
+    return os.path.join(STATUTE_DIR, f"{name}.txt")
+
+
+def binary_paths(file_path: str, suffix: str = GEMINI_SUFFIX) -> tuple[str, str]:
+    """Return the ``(.npy, .idx)`` paths for a statute ``.txt`` file.
+
+    *suffix* selects the embedding backend the matrix was built with.
+    """
+    stem = file_path[:-4]
+    return f"{stem}{suffix}.npy", f"{stem}{suffix}.idx"
+
+
+def read_statute_lines(file_path: str) -> list[str]:
+    """Return the statute descriptions in *file_path*, one per embedding row."""
+    with open(file_path, "r") as file:
+        return [line.rstrip("\n") for line in file.readlines()]
+
+
+def _check_shape(matrix: np.ndarray, lines: list[str], source: str, dims: int | None) -> None:
+    if matrix.ndim != 2:
+        raise EmbeddingStoreError(f"{source} is not a 2-D matrix (shape {matrix.shape})")
+    if dims is not None and matrix.shape[1] != dims:
+        raise EmbeddingStoreError(
+            f"{source} has {matrix.shape[1]}-dim rows, expected {dims}"
+        )
+    if matrix.shape[0] != len(lines):
+        raise EmbeddingStoreError(
+            f"{source} is misaligned: {len(lines)} statutes vs {matrix.shape[0]} embeddings"
+        )
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        write(file)
+    os.replace(tmp_path, path)
+
+
+def write_binary(
+    file_path: str, matrix: np.ndarray, lines: list[str], *, suffix: str = GEMINI_SUFFIX
+) -> None:
+    """Write *matrix* and its row index next to the statute file *file_path*."""
+    npy_path, idx_path = binary_paths(file_path, suffix)
+    matrix = np.ascontiguousarray(matrix, dtype=EMBED_DTYPE)
+    _check_shape(matrix, lines, npy_path, None)
+    _atomic_write(npy_path, lambda f: np.save(f, matrix, allow_pickle=False))
+    _atomic_write(idx_path, lambda f: f.write("".join(f"{line}\n" for line in lines).encode("utf-8")))
+
+
+def convert_text_embeddings(file_path: str, *, dims: int | None = EMBED_DIMS) -> str:
+    """Convert ``<name>_embed.txt`` for *file_path* into the binary format.
+
+    Returns the path of the written ``.npy`` file.
+    """
+    lines = read_statute_lines(file_path)
+    matrix = np.loadtxt(file_path[:-4] + "_embed.txt", ndmin=2)
+    _check_shape(matrix, lines, file_path[:-4] + "_embed.txt", dims)
+    write_binary(file_path, matrix, lines)
+    return binary_paths(file_path)[0]
+
+
+def load_embeddings(
+    file_path: str, *, dims: int | None = EMBED_DIMS, suffix: str = GEMINI_SUFFIX
+) -> tuple[list[str], np.ndarray]:
+    """Return ``(statute lines, embedding matrix)`` for a statute ``.txt`` file.
+
+    The matrix is a read-only float32 memory map, so every process that loads
+    it shares the page cache instead of holding its own copy. A list that has
+    not been converted yet falls back to parsing the text embeddings.
+    """
+    lines = read_statute_lines(file_path)
+    npy_path, idx_path = binary_paths(file_path, suffix)
+    if not os.path.exists(npy_path) and suffix != GEMINI_SUFFIX:
+        raise EmbeddingStoreError(f"{npy_path} missing; build it for this backend first")
+    if not os.path.exists(npy_path):
+        print(f"{npy_path} missing; parsing text embeddings. Run python -m legal_statutes.embedding_store")
+        matrix = np.loadtxt(file_path[:-4] + "_embed.txt", ndmin=2).astype(EMBED_DTYPE)
+        _check_shape(matrix, lines, file_path[:-4] + "_embed.txt", dims)
+        return lines, matrix
+
+    matrix = np.load(npy_path, mmap_mode="r", allow_pickle=False)
+    if matrix.dtype != EMBED_DTYPE:
+        raise EmbeddingStoreError(f"{npy_path} has dtype {matrix.dtype}, expected {np.dtype(EMBED_DTYPE)}")
+    _check_shape(matrix, lines, npy_path, dims)
+    if not os.path.exists(idx_path) or read_statute_lines(idx_path) != lines:
+        raise EmbeddingStoreError(
+            f"{file_path} changed since its embeddings were built; rebuild {npy_path}"
+        )
+    return lines, matrix
+
+
+def main(argv: list[str] | None = None) -> None:
+    names = (argv if argv is not None else sys.argv[1:]) or STATUTE_LISTS
+    for name in names:
+        npy_path = convert_text_embeddings(statute_path(name))
+        print(f"{name}: wrote {npy_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,73 @@
 import os
-import numpy as np
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import threading
 
+from legal_statutes.backends import GeminiBackend, active_backend_name, get_backend
+from legal_statutes.statute_index import get_statute_index
 
-class GetCosineSimilarity():
-
-    def __init__(self, client=None):
 
-        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+class GetCosineSimilarity():
 
-        self.client = client if client is not None else genai.GenerativeModel(
-            'gemini-2.5-flash')
+    def __init__(self, client=None, backend=None):
+        # Embedding and rerank go through the deployment's backend; a client
+        # passed in here is a Gemini model to rerank with.
+        if backend is None:
+            backend = GeminiBackend(client) if client is not None else get_backend()
+        self.backend = backend
+        self.index = None
         self.embeddings = []
         self.crimes = []
 
-    def format_file_embeddings(self, file_path):
-        crimes = []
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            for line in lines:
-                crimes.append(str(line))
-        self.crimes = crimes
-        return crimes
-
     def embed_file(self, file_path):
-        self.format_file_embeddings(file_path)
-        embed_filepath = file_path[:-4] + "_embed.txt"
-        self.embeddings = np.loadtxt(embed_filepath)
+        # The index is shared by every engine in the process; only the
+        # references are stored here.
+        self.index = get_statute_index(file_path, self.backend.name)
+        self.crimes = self.index.crimes
+        self.embeddings = self.index.embeddings
         return self.embeddings
 
     def embed_text(self, text: list[str]):
-        result = genai.embed_content(
-            model="models/gemini-embedding-001",
-            content=text,
-        )
-        embeddings = np.array(result['embedding'])
-        # Normalize embeddings
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-        embeddings = embeddings / norms
-        return embeddings
-
-    def get_k_best_cosine_similarity(self, query, k=5):
-        query_embedding = self.embed_text([query])
-        scores = np.dot(self.embeddings, query_embedding.T).flatten()
-        top_indices = np.argsort(scores)[-k:][::-1]
-
-        results = [(self.crimes[i], scores[i]) for i in top_indices]
-        return results
+        return self.backend.embed(text)
+
+    def embed_query(self, query):
+        return self.embed_text([query])[0]
+
+    def get_k_best_cosine_similarity(self, query, k=5, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        return self.index.top_k(query_embedding, k)
 
     def get_best_from_top_k(self, top_k, query):
+        return self.backend.rerank(query, top_k)
 
-        crime_string = ""
-        for crime, score in top_k:
-            crime_string += f"{crime}\n "
-        crime_string = crime_string[:-2]
-        completion = self.client.generate_content(
-            f"I have a list of newline separated legal statute descriptions {crime_string}.\
-                    I have a legal statute description {query}. Of the counts provided, does this statute match any of them? \
-                    The language may be different, but if the meaning is the same, please return that count. Otherwise, return 0. Do not return anything else.",
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT:
-                HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HARASSMENT:
-                HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH:
-                HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT:
-                HarmBlockThreshold.BLOCK_NONE,
-            })
-        if completion.text == "0":
-            return None
-        print(completion.text)
-        return completion.text
-
-    def get_matching_crime(self, query):
-        best_vals = self.get_k_best_cosine_similarity(query, 5)
+    def get_matching_crime(self, query, query_embedding=None):
+        best_vals = self.get_k_best_cosine_similarity(query, 5, query_embedding)
         return self.get_best_from_top_k(best_vals, query)
+
+    def get_top_k_batch(self, queries, k=5, query_embeddings=None):
+        if query_embeddings is None:
+            query_embeddings = self.embed_text(list(queries))
+        return self.index.top_k_batch(query_embeddings, k)
+
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_similarity_engine(file_path=None):
+    """Return the process-wide engine for one statute list, creating it once.
+
+    Without a *file_path* the engine has no statute list and is only good for
+    embedding queries. Engines are kept per embedding backend, so switching
+    ``EMBEDDING_BACKEND`` in a running process (as the benchmark does) never
+    scores one backend's queries against another's matrix.
+    """
+    file_path = os.path.abspath(file_path) if file_path is not None else None
+    key = (active_backend_name(), file_path)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = GetCosineSimilarity()
+            if file_path is not None:
+                engine.embed_file(file_path)
+            _ENGINES[key] = engine
+        return engine
@@ -0,0 +1,194 @@
+"""Deterministic, network-free statute lookups.
+
+Many counts arrive with a statutory citation ("21 O.S. § 801") or with the
+exact wording of a statute list entry ("Robbery with a dangerous weapon").
+For those, part of the answer needs no embedding or LLM: a list whose own
+entry cites the section, or is named exactly as the count, includes it.
+
+``LocalStatuteIndex.lookup`` only ever answers True, and only for the lists
+the text itself matched. It never answers False: the same offense is cited
+under different sections on different lists (first degree burglary is
+section 1431 on one and 1436 on another), so a section missing from a list
+does not put the offense off it. Anything qualified ("if the offense
+involved ..."), inchoate ("attempted", "conspiracy") or cited across
+sections with different outcomes is left to the Gemini path.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Iterable
+
+# Title assumed by lists that cite "Section N of this title".
+DEFAULT_TITLE = "21"
+
+_SECTION = r"\d+(?:\s*-\s*\d+)?(?:\.\d+)?[a-z]?"
+
+# Citations as written in the statute lists.
+_LIST_SECTIONS = re.compile(
+    rf"\bsections?\s+(?P<sections>{_SECTION}(?:\s*(?:,|and|or)\s*(?:or\s+|and\s+)?{_SECTION})*)"
+    r"(?:\s+et\s+seq\.?)?"
+    r"\s+of\s+(?:this\s+title|title\s+(?P<title>\d+[a-z]?))",
+    re.IGNORECASE,
+)
+# "21 O.S. § 801", "21 OS 801", "21 O.S. Sec. 801" -- both in lists and counts.
+_OS_CITATION = re.compile(
+    rf"\b(?P<title>\d+[a-z]?)\s*o\.?\s*s\.?\s*(?:§+|sec(?:tion)?\.?)?\s*(?P<section>{_SECTION})"
+    r"(?:\.?\s*,?\s*et\s+seq)?",
+    re.IGNORECASE,
+)
+# "Title 21, Section 801" and "Section 801 of Title 21" in counts.
+_TITLE_SECTION = re.compile(
+    rf"\btitle\s+(?P<title>\d+[a-z]?)\s*,?\s*(?:§+|sec(?:tion)?\.?)\s*(?P<section>{_SECTION})",
+    re.IGNORECASE,
+)
+_SECTION_TITLE = re.compile(
+    rf"(?:§+|\bsec(?:tion)?\.?)\s*(?P<section>{_SECTION})\s+of\s+title\s+(?P<title>\d+[a-z]?)",
+    re.IGNORECASE,
+)
+
+# Qualifiers that make a list entry apply to only part of its section.
+_CONDITIONAL = re.compile(r"\(if\b|\bsubsection\b|\(second offense\)|\bwho is\b", re.IGNORECASE)
+# Inchoate and accessory charges are not the listed offense itself.
+_INCHOATE = re.compile(
+    r"\b(?:attempt\w*|conspir\w*|solicit\w*|accessory|aid\w*\s+(?:and|or)\s+abet\w*)\b",
+    re.IGNORECASE,
+)
+# Where a list entry's offense name ends and its citation text begins.
+_NAME_END = re.compile(
+    r",?\s+(?:as\s+(?:provided|defined)|pursuant\s+to)\b|;|,\s*$", re.IGNORECASE
+)
+
+Citation = tuple[str, str]
+
+
+def _section_key(section: str) -> str:
+    return re.sub(r"\s+", "", section).lower().rstrip(".")
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase *text* and reduce it to space-separated words."""
+    return " ".join(re.sub(r"[^a-z0-9$]+", " ", text.lower()).split())
+
+
+def parse_citations(text: str) -> set[Citation]:
+    """Return every (title, section) a count cites, e.g. {("21", "801")}."""
+    found: set[Citation] = set()
+    for pattern in (_OS_CITATION, _TITLE_SECTION, _SECTION_TITLE):
+        for match in pattern.finditer(text):
+            found.add((match.group("title").upper(), _section_key(match.group("section"))))
+    return found
+
+
+def _list_citations(line: str) -> set[Citation]:
+    """Return the sections a list entry cites."""
+    cited: set[Citation] = set()
+    for match in _LIST_SECTIONS.finditer(line):
+        title = (match.group("title") or DEFAULT_TITLE).upper()
+        cited.update(
+            (title, _section_key(section))
+            for section in re.split(r"\s*(?:,|\band\b|\bor\b)\s*", match.group("sections"))
+            if section.strip()
+        )
+    for match in _OS_CITATION.finditer(line):
+        cited.add((match.group("title").upper(), _section_key(match.group("section"))))
+    return cited
+
+
+def _offense_name(line: str) -> str:
+    """The offense wording of a list entry, without its citation text."""
+    text = _OS_CITATION.sub(" ", line)
+    text = re.sub(r"\(.*?\)", " ", text)
+    match = _NAME_END.search(text)
+    if match:
+        text = text[:match.start()]
+    return normalize_phrase(text)
+
+
+class _Entry:
+    __slots__ = ("name", "citations", "conditional")
+
+    def __init__(self, line: str, cited: bool) -> None:
+        self.name = _offense_name(line)
+        self.citations = _list_citations(line) if cited else set()
+        self.conditional = bool(_CONDITIONAL.search(line))
+
+
+class LocalStatuteIndex:
+    """Citation and exact-phrase lookups over a set of statute lists.
+
+    *lists* maps a list name (the statute file path) to its lines. Entries
+    of the lists in *cited* are read for the statute sections they cite;
+    the others are matched by name only.
+    """
+
+    def __init__(self, lists: dict[str, list[str]], *, cited: Iterable[str] = ()) -> None:
+        self.cited = frozenset(cited)
+        self.entries = {
+            name: [_Entry(line, name in self.cited) for line in lines if line.strip()]
+            for name, lines in lists.items()
+        }
+        self._names: dict[str, list[tuple[str, _Entry]]] = {}
+        for name, entries in self.entries.items():
+            for entry in entries:
+                if entry.name:
+                    self._names.setdefault(entry.name, []).append((name, entry))
+
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._short_circuited = 0
+        self._partial = 0
+
+    # -- lookups ---------------------------------------------------------
+
+    def _cites(self, name: str, citation: Citation) -> bool:
+        """True if an unqualified entry of list *name* cites *citation*."""
+        return any(
+            citation in entry.citations and not entry.conditional
+            for entry in self.entries.get(name, [])
+        )
+
+    def match_phrase(self, text: str) -> list[tuple[str, _Entry]]:
+        """List entries whose offense name is exactly *text*."""
+        return list(self._names.get(normalize_phrase(text), ()))
+
+    def lookup(self, text: str) -> dict[str, bool]:
+        """Return the lists *text* is certainly on, each mapped to True.
+
+        A list is answered only when one of its own unqualified entries
+        cites every section the count cites, or is named exactly as the
+        count. Lists missing from the result need the Gemini path.
+        """
+        if _INCHOATE.search(text):
+            return {}
+        citations = parse_citations(text)
+        if citations:
+            return {
+                name: True
+                for name in self.cited
+                if all(self._cites(name, citation) for citation in citations)
+            }
+        return {name: True for name, entry in self.match_phrase(text) if not entry.conditional}
+
+    # -- accounting ------------------------------------------------------
+
+    def record(self, *, resolved: bool, answered: bool) -> None:
+        """Count one looked-up count: fully *resolved* locally, or with
+        some lists *answered*."""
+        with self._lock:
+            self._lookups += 1
+            if resolved:
+                self._short_circuited += 1
+            elif answered:
+                self._partial += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._lookups
+            return {
+                "lookups": lookups,
+                "short_circuited": self._short_circuited,
+                "partial": self._partial,
+                "short_circuit_rate": round(self._short_circuited / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,285 @@
+"""Reduced-precision and truncated statute embedding matrices.
+
+The Gemini vectors are 3072 float32 values per statute line. Two knobs
+shrink them:
+
+  precision   ``float16`` halves the matrix; ``int8`` quarters it, storing
+              each row as signed bytes times one float32 scale per row
+              (``row ~= scale * q`` with ``q`` in [-127, 127])
+  dims        keep only the first *dims* components and renormalize.
+              gemini-embedding-001 is trained so that prefixes of its
+              vectors are embeddings in their own right, and the dot
+              product cost falls in proportion.
+
+The server's fused statute matrix is stored as ``EMBED_QUANTIZATION``
+(``float32``, ``float16`` or ``int8``; default ``float32``) and truncated to
+``EMBED_TRUNCATE_DIMS`` when that is set. NumPy has no int8 or float16 BLAS,
+so reduced-precision rows are widened to float32 a block at a time for the
+product. Those modes save memory but not arithmetic; truncation saves both.
+
+The browser downloads ``<name>_embed.q8.bin`` (int8 rows plus scales,
+about 1/25 the size of ``<name>_embed.txt``) only when ``static_assets``
+was built with ``EMBED_QUANTIZATION=int8``, so it scores as the server does.
+
+Measure what a mode costs in ranking quality before turning it on::
+
+    python -m legal_statutes.quantize [--dims 3072 1536 768] [--queries q.npy]
+
+which reports, per mode, the share of queries whose top-1 and top-k
+statutes agree with the full-precision search, the largest score error,
+the matrix size and the scoring time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from legal_statutes.embedding_store import (
+    EMBED_DTYPE,
+    STATUTE_LISTS,
+    load_embeddings,
+    read_statute_lines,
+    statute_path,
+)
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+INT8_MAX = 127
+# Rows widened to float32 at a time when scoring reduced-precision matrices.
+SCORE_BLOCK_ROWS = 4096
+
+BROWSER_MAGIC = b"Q8E1"
+
+
+class QuantizedMatrix:
+    """A statute matrix in one of ``QUANTIZATIONS``, ready to be scored.
+
+    ``data`` holds the (possibly truncated) rows; ``scales`` holds one
+    float32 per row for ``int8`` and is None otherwise.
+    """
+
+    __slots__ = ("mode", "data", "scales", "dims")
+
+    def __init__(self, mode: str, data: np.ndarray, scales: np.ndarray | None = None) -> None:
+        if mode not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {mode!r}; expected one of {QUANTIZATIONS}")
+        self.mode = mode
+        self.data = data
+        self.scales = scales
+        self.dims = int(data.shape[1])
+        data.flags.writeable = False
+
+    @property
+    def rows(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def prepare_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Truncate and renormalize full-size query vectors to ``dims``."""
+        queries = np.asarray(queries, dtype=EMBED_DTYPE)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if queries.shape[1] == self.dims:
+            return queries
+        return truncate(queries, self.dims)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine scores of every query against every row, float32."""
+        queries = self.prepare_queries(queries)
+        if self.mode == "float32":
+            return np.dot(queries, self.data.T)
+        scores = np.empty((queries.shape[0], self.rows), dtype=EMBED_DTYPE)
+        for start in range(0, self.rows, SCORE_BLOCK_ROWS):
+            block = self.data[start:start + SCORE_BLOCK_ROWS].astype(EMBED_DTYPE)
+            scores[:, start:start + block.shape[0]] = np.dot(queries, block.T)
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def dequantize(self) -> np.ndarray:
+        matrix = self.data.astype(EMBED_DTYPE)
+        if self.scales is not None:
+            matrix *= self.scales[:, None]
+        return matrix
+
+
+def truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    """The first *dims* components of every row, renormalized to unit length."""
+    prefix = np.asarray(matrix, dtype=EMBED_DTYPE)[:, :dims]
+    norms = np.linalg.norm(prefix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (prefix / norms).astype(EMBED_DTYPE)
+
+
+def quantize(matrix: np.ndarray, mode: str = "float32", dims: int | None = None) -> QuantizedMatrix:
+    """Store *matrix* as *mode*, first truncated to *dims* if given."""
+    matrix = np.asarray(matrix, dtype=EMBED_DTYPE)
+    if dims is not None and dims < matrix.shape[1]:
+        matrix = truncate(matrix, dims)
+    if mode == "float32":
+        return QuantizedMatrix(mode, np.ascontiguousarray(matrix))
+    if mode == "float16":
+        return QuantizedMatrix(mode, matrix.astype(np.float16))
+    if mode == "int8":
+        peaks = np.abs(matrix).max(axis=1)
+        scales = np.where(peaks > 0, peaks / INT8_MAX, 1.0).astype(EMBED_DTYPE)
+        data = np.clip(np.rint(matrix / scales[:, None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+        return QuantizedMatrix(mode, data, scales)
+    raise ValueError(f"Unknown quantization {mode!r}; expected one of {QUANTIZATIONS}")
+
+
+def quantization_from_env() -> tuple[str, int | None]:
+    """``(EMBED_QUANTIZATION, EMBED_TRUNCATE_DIMS)`` for the server's matrices."""
+    mode = os.environ.get("EMBED_QUANTIZATION", "float32").strip().lower() or "float32"
+    if mode not in QUANTIZATIONS:
+        print(f"Unknown EMBED_QUANTIZATION={mode!r}; expected one of {QUANTIZATIONS}. Using float32.")
+        mode = "float32"
+    dims = os.environ.get("EMBED_TRUNCATE_DIMS", "").strip()
+    try:
+        return mode, int(dims) if dims else None
+    except ValueError:
+        print(f"Invalid EMBED_TRUNCATE_DIMS={dims!r}; keeping every dimension.")
+        return mode, None
+
+
+# -- browser download ------------------------------------------------------
+
+
+def browser_path(file_path: str) -> str:
+    return f"{file_path[:-4]}_embed.q8.bin"
+
+
+def write_browser_file(file_path: str, matrix: np.ndarray) -> str:
+    """Write the int8 matrix ``gemini_classify.js`` downloads for a list.
+
+    Layout, little-endian: ``Q8E1``, uint32 rows, uint32 dims, float32
+    scale per row, then the int8 rows.
+    """
+    quantized = quantize(matrix, "int8")
+    path = browser_path(file_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(BROWSER_MAGIC + struct.pack("<II", quantized.rows, quantized.dims))
+        file.write(quantized.scales.astype("<f4").tobytes())
+        file.write(quantized.data.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_browser_file(path: str) -> QuantizedMatrix:
+    with open(path, "rb") as file:
+        raw = file.read()
+    if raw[:4] != BROWSER_MAGIC:
+        raise ValueError(f"{path} is not a quantized embedding file")
+    rows, dims = struct.unpack("<II", raw[4:12])
+    scales = np.frombuffer(raw, dtype="<f4", count=rows, offset=12).astype(EMBED_DTYPE)
+    data = np.frombuffer(raw, dtype=np.int8, count=rows * dims, offset=12 + 4 * rows).reshape(rows, dims)
+    return QuantizedMatrix("int8", data.copy(), scales)
+
+
+# -- evaluation ------------------------------------------------------------
+
+
+def evaluate(
+    matrix: np.ndarray, queries: np.ndarray, *, k: int = 5, dims_options=(None,), modes=QUANTIZATIONS
+) -> list[dict[str, Any]]:
+    """Compare every mode and truncation with full-precision search.
+
+    ``top1`` is the share of queries whose best row is unchanged, ``topk``
+    the mean overlap of the top-*k* sets, ``max_score_error`` the largest
+    change in a score.
+    """
+    matrix = np.asarray(matrix, dtype=EMBED_DTYPE)
+    queries = np.asarray(queries, dtype=EMBED_DTYPE)
+    k = min(k, matrix.shape[0])
+    exact = queries @ matrix.T
+    exact_top = np.argsort(-exact, axis=1, kind="stable")[:, :k]
+    report = []
+    for dims in dims_options:
+        for mode in modes:
+            quantized = quantize(matrix, mode, dims)
+            started = time.perf_counter()
+            scores = quantized.scores(queries)
+            elapsed = time.perf_counter() - started
+            top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+            overlap = [len(set(a) & set(b)) / k for a, b in zip(top, exact_top)]
+            report.append({
+                "mode": mode,
+                "dims": quantized.dims,
+                "bytes": quantized.nbytes,
+                "compression": round(matrix.nbytes / quantized.nbytes, 2),
+                "top1": round(float(np.mean(top[:, 0] == exact_top[:, 0])), 4),
+                "topk": round(float(np.mean(overlap)), 4),
+                "max_score_error": round(float(np.abs(scores - exact).max()), 4),
+                "score_ms": round(elapsed * 1000, 3),
+            })
+    return report
+
+
+def statute_matrix(names=STATUTE_LISTS) -> tuple[np.ndarray, list[str]]:
+    """Every list's Gemini matrix stacked, with the list each row came from."""
+    blocks, owners = [], []
+    for name in names:
+        _, matrix = load_embeddings(statute_path(name))
+        blocks.append(np.asarray(matrix))
+        owners.extend([name] * matrix.shape[0])
+    return np.vstack(blocks), owners
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure the ranking impact of quantized embeddings.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[3072, 1536, 768, 256])
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--queries", default=None,
+                        help=".npy of full-size query vectors (default: each statute line "
+                             "scored against the other lists)")
+    parser.add_argument("--write-browser", action="store_true",
+                        help="write <name>_embed.q8.bin for gemini_classify.js")
+    args = parser.parse_args(argv)
+
+    if args.write_browser:
+        for name in STATUTE_LISTS:
+            lines = read_statute_lines(statute_path(name))
+            _, matrix = load_embeddings(statute_path(name))
+            path = write_browser_file(statute_path(name), np.asarray(matrix))
+            print(f"wrote {path} ({len(lines)} rows, {os.path.getsize(path)} bytes)")
+        return
+
+    matrix, owners = statute_matrix()
+    owners = np.array(owners)
+    print("mode      dims     bytes  ratio   top-1   top-k  max err  score ms")
+    if args.queries:
+        reports = [evaluate(matrix, np.load(args.queries), k=args.k, dims_options=args.dims)]
+    else:
+        # A line of one list makes a realistic query for the others, which
+        # often describe the same crime in other words.
+        reports = [
+            evaluate(matrix[owners != name], matrix[owners == name], k=args.k, dims_options=args.dims)
+            for name in STATUTE_LISTS
+        ]
+    for rows in zip(*reports):
+        merged = dict(rows[0])
+        # Sizes are those of the whole stacked matrix, not of one fold.
+        merged["bytes"] = quantize(matrix, merged["mode"], merged["dims"]).nbytes
+        merged["compression"] = round(matrix.nbytes / merged["bytes"], 2)
+        for key in ("top1", "topk", "score_ms"):
+            merged[key] = round(float(np.mean([row[key] for row in rows])), 4)
+        merged["max_score_error"] = max(row["max_score_error"] for row in rows)
+        print(
+            f"{merged['mode']:<8}{merged['dims']:>6}{merged['bytes']:>10}{merged['compression']:>7.1f}"
+            f"{merged['top1']:>8.3f}{merged['topk']:>8.3f}{merged['max_score_error']:>9.4f}"
+            f"{merged['score_ms']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Process-wide token bucket for Gemini API calls.
+
+Classification now issues embedding and rerank calls from several threads at
+once, and a burst of clinic users can easily exceed the project's Gemini
+quota. Every call acquires a token from one shared bucket first, so the
+process as a whole never sends more than the configured rate no matter how
+many sessions are classifying. Pre-forked worker processes (see ``prefork``)
+each take an equal share of the rate.
+
+  GEMINI_REQUESTS_PER_MINUTE   sustained rate (default 60)
+  GEMINI_BURST                 calls allowed back to back (default 10)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when no token became available before the caller's deadline."""
+
+
+class TokenBucket:
+    """Classic token bucket; ``acquire`` blocks until a token is available."""
+
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("rate_per_second must be positive and burst at least 1")
+        self.rate = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._waited_seconds = 0.0
+        self._acquired = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float | None = None) -> None:
+        """Take one token, sleeping as long as needed (or until *timeout*)."""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._acquired += 1
+                    if waited:
+                        self._waits += 1
+                        self._waited_seconds += now - start
+                    return
+                delay = (1 - self._tokens) / self.rate
+            if timeout is not None and now - start + delay > timeout:
+                raise RateLimitTimeout(f"Gemini rate limit: no capacity within {timeout:.1f}s")
+            waited = True
+            time.sleep(delay)
+
+    def split(self, parts: int) -> None:
+        """Keep 1/*parts* of the rate and burst, for one of *parts* worker
+        processes sharing the project's quota."""
+        with self._lock:
+            self.rate /= parts
+            self.burst = max(1, self.burst // parts)
+            self._tokens = min(self._tokens, float(self.burst))
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_minute": self.rate * 60,
+                "burst": self.burst,
+                "available": round(self._tokens, 2),
+                "acquired": self._acquired,
+                "throttled": self._waits,
+                "throttled_seconds": round(self._waited_seconds, 3),
+            }
+
+
+GEMINI_RATE_LIMITER = TokenBucket(
+    float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60")) / 60.0,
+    int(os.environ.get("GEMINI_BURST", "10")),
+)
@@ -0,0 +1,278 @@
+"""Deadlines, jittered retries and a circuit breaker for Gemini API calls.
+
+Every Gemini call is made through ``guarded_call``. Each attempt gets a
+deadline, and a call as a whole (retries and rate-limit waits included)
+never runs past its budget. Transient failures such as timeouts, 429s and
+5xx errors are retried after a randomized exponential backoff, but only
+while the process-wide retry budget allows, so an outage does not turn
+into a retry storm. Enough consecutive failures open the breaker. While it
+is open, calls fail at once with ``CircuitOpenError`` instead of queueing
+behind a dead service. The classifier then flags the counts it could not
+settle for attorney review. After a cool-down, one trial call is let
+through; its outcome closes the breaker again or keeps it open.
+
+  GEMINI_TIMEOUT            seconds one attempt may take (default 20)
+  GEMINI_CALL_BUDGET        seconds one call may take, retries included (default 45)
+  GEMINI_MAX_ATTEMPTS       attempts per call (default 3)
+  GEMINI_RETRY_RATIO        retries earned per call, process-wide (default 0.2)
+  GEMINI_BREAKER_FAILURES   consecutive failures that open the breaker (default 5)
+  GEMINI_BREAKER_RESET      seconds the breaker stays open (default 30)
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+from legal_statutes.rate_limit import GEMINI_RATE_LIMITER, RateLimitTimeout, TokenBucket
+
+T = TypeVar("T")
+
+# HTTP statuses worth another attempt: the request may well succeed later.
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Gemini while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed -> open after *failure_threshold* consecutive failures; open ->
+    half-open after *reset_seconds*, when a single trial call decides."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._counters = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+        self._last_error = ""
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` unless a call may go out now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            self._counters["rejected"] += 1
+        raise CircuitOpenError("Gemini circuit breaker is open; failing fast")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._counters["successes"] += 1
+            self._failures = 0
+            self._trial_running = False
+            self._state = self.CLOSED
+
+    def record_failure(self, error: BaseException | None = None) -> None:
+        with self._lock:
+            self._counters["failures"] += 1
+            self._failures += 1
+            if error is not None:
+                self._last_error = f"{type(error).__name__}: {error}"[:200]
+            trial = self._trial_running
+            self._trial_running = False
+            if trial or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                if self._state != self.OPEN:
+                    self._counters["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def release_trial(self) -> None:
+        """Give up a half-open trial slot without a verdict (e.g. a 400)."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            reopens_in = 0.0
+            if state == self.OPEN:
+                reopens_in = max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "retry_in_seconds": round(reopens_in, 2),
+                "last_error": self._last_error,
+                **self._counters,
+            }
+
+
+class RetryBudget:
+    """Caps retries at a fraction of calls across the whole process.
+
+    Every call deposits *ratio* of a retry, up to *reserve*; every retry
+    withdraws one. When the service is down, retries stop once the reserve
+    is spent instead of multiplying the load on it.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0) -> None:
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._denied = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1:
+                self._denied += 1
+                return False
+            self._balance -= 1
+            self._retries += 1
+            return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ratio": self.ratio,
+                "balance": round(self._balance, 2),
+                "retries": self._retries,
+                "denied": self._denied,
+            }
+
+
+class RetryPolicy:
+    """Per-call limits: attempt deadline, total budget and attempt count."""
+
+    def __init__(self, timeout: float = 20.0, budget: float = 45.0, attempts: int = 3) -> None:
+        self.timeout = timeout
+        self.budget = budget
+        self.attempts = max(1, attempts)
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            timeout=float(os.environ.get("GEMINI_TIMEOUT", "20")),
+            budget=float(os.environ.get("GEMINI_CALL_BUDGET", "45")),
+            attempts=int(os.environ.get("GEMINI_MAX_ATTEMPTS", "3")),
+        )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether *error* is transient: a timeout, a dropped connection, a 429 or a 5xx."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if callable(code):  # grpc errors expose code() returning a StatusCode
+        return type(error).__name__ in ("DeadlineExceeded", "ServiceUnavailable")
+    try:
+        return int(code) in RETRYABLE_STATUSES
+    except (TypeError, ValueError):
+        return type(error).__name__ in ("DeadlineExceeded", "ServiceUnavailable", "RetryError")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number *attempt* (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def guarded_call(
+    call: Callable[[float], T],
+    *,
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+    budget: RetryBudget | None = None,
+    limiter: TokenBucket | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """Run ``call(timeout)`` under the breaker, rate limiter and retry policy.
+
+    *call* is given the seconds its attempt may take and must pass them on
+    to the client as its request timeout. Raises ``CircuitOpenError`` at
+    once while the breaker is open, and otherwise the last error once
+    attempts, the call's budget or the retry budget run out.
+    """
+    policy = policy or GEMINI_RETRY_POLICY
+    breaker = breaker or GEMINI_BREAKER
+    budget = budget or GEMINI_RETRY_BUDGET
+    limiter = limiter or GEMINI_RATE_LIMITER
+    deadline = time.monotonic() + policy.budget
+    budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            limiter.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        except RateLimitTimeout:
+            breaker.release_trial()
+            raise
+        remaining = deadline - time.monotonic()
+        try:
+            result = call(max(0.1, min(policy.timeout, remaining)))
+        except Exception as e:
+            if not is_retryable(e):
+                # The service answered; the request itself was at fault.
+                breaker.release_trial()
+                raise
+            breaker.record_failure(e)
+            delay = backoff_delay(attempt)
+            if (
+                attempt >= policy.attempts
+                or time.monotonic() + delay >= deadline
+                or not budget.withdraw()
+            ):
+                raise
+            print(f"Gemini call failed ({e}); retrying in {delay:.2f}s")
+            sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+def resilience_stats() -> dict[str, Any]:
+    """Breaker and retry budget state for ``/api/metrics``."""
+    return {
+        "breaker": GEMINI_BREAKER.stats(),
+        "retry_budget": GEMINI_RETRY_BUDGET.stats(),
+        "timeout_seconds": GEMINI_RETRY_POLICY.timeout,
+        "call_budget_seconds": GEMINI_RETRY_POLICY.budget,
+        "max_attempts": GEMINI_RETRY_POLICY.attempts,
+    }
+
+
+GEMINI_RETRY_POLICY = RetryPolicy.from_env()
+GEMINI_BREAKER = CircuitBreaker(
+    int(os.environ.get("GEMINI_BREAKER_FAILURES", "5")),
+    float(os.environ.get("GEMINI_BREAKER_RESET", "30")),
+)
+GEMINI_RETRY_BUDGET = RetryBudget(float(os.environ.get("GEMINI_RETRY_RATIO", "0.2")))
@@ -0,0 +1,210 @@
+"""Calibrated cosine-score thresholds that settle a statute check without
+the LLM rerank.
+
+For each statute list the best cosine score of a count's top-k candidates is
+compared with two marks fitted on labeled charges: at or above ``accept`` the
+count is taken to match, at or below ``reject`` it is taken not to, and only
+scores in between are sent to Gemini for a rerank. A list without fitted
+marks (or with a mark left as null) always reranks, so an uncalibrated
+install behaves exactly as before.
+
+Thresholds live in ``legal_statutes/score_thresholds.json`` (or
+``score_thresholds_<backend>.json`` for a non-default embedding backend,
+whose scores are on a different scale)::
+
+    {"section571": {"accept": 0.91, "reject": 0.58}, ...}
+
+and are written by ``python -m legal_statutes.calibrate_thresholds``.
+
+  SCORE_THRESHOLDS_PATH   alternative file, or "off" to always rerank
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Sequence
+
+import numpy as np
+
+from legal_statutes.backends import DEFAULT_BACKEND, active_backend_name
+from legal_statutes.embedding_store import STATUTE_DIR
+
+DEFAULT_THRESHOLDS_PATH = os.path.join(STATUTE_DIR, "score_thresholds.json")
+DEFAULT_TARGET_PRECISION = 0.98
+DEFAULT_MIN_SUPPORT = 5
+
+
+def thresholds_path(backend: str = DEFAULT_BACKEND) -> str:
+    """Where the marks fitted for *backend*'s scores are kept."""
+    if backend == DEFAULT_BACKEND:
+        return DEFAULT_THRESHOLDS_PATH
+    return os.path.join(STATUTE_DIR, f"score_thresholds_{backend}.json")
+
+
+def list_name(filename: str) -> str:
+    """``legal_statutes/section571.txt`` -> ``section571``."""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+class ScoreThresholds:
+    """Per-list accept/reject marks plus counters of the reranks they saved."""
+
+    def __init__(self, bands: dict[str, dict[str, float | None]] | None = None) -> None:
+        self.bands = {
+            name: {"accept": band.get("accept"), "reject": band.get("reject")}
+            for name, band in (bands or {}).items()
+        }
+        self._lock = threading.Lock()
+        self._counters = {"accepted": 0, "rejected": 0, "reranked": 0}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_THRESHOLDS_PATH) -> "ScoreThresholds":
+        """Read *path*; a missing or unreadable file means no thresholds."""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return cls(json.load(file))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not read score thresholds from {path}: {e}. Every check will be reranked.")
+            return cls()
+
+    def save(self, path: str = DEFAULT_THRESHOLDS_PATH) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.bands, file, indent=2, sort_keys=True)
+            file.write("\n")
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the marks, so cached outcomes are tied to the marks used."""
+        if not self.bands:
+            return ""
+        encoded = json.dumps(self.bands, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def decide(self, filename: str, score: float) -> bool | None:
+        """True/False if *score* is decisive for *filename*'s list, else None."""
+        band = self.bands.get(list_name(filename), {})
+        accept, reject = band.get("accept"), band.get("reject")
+        if accept is not None and score >= accept:
+            outcome, counter = True, "accepted"
+        elif reject is not None and score <= reject:
+            outcome, counter = False, "rejected"
+        else:
+            outcome, counter = None, "reranked"
+        with self._lock:
+            self._counters[counter] += 1
+        return outcome
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        checks = sum(counters.values())
+        avoided = counters["accepted"] + counters["rejected"]
+        return {
+            **counters,
+            "bands": self.bands,
+            "rerank_avoided_rate": round(avoided / checks, 4) if checks else 0.0,
+        }
+
+
+# -- calibration ---------------------------------------------------------
+
+
+def evaluate_band(
+    scores: Sequence[float], labels: Sequence[bool], accept: float | None, reject: float | None
+) -> dict[str, Any]:
+    """Report how the marks would have done on a labeled sample.
+
+    ``accept_precision`` is the share of auto-accepted counts that really
+    match; ``accept_recall`` the share of true matches accepted without a
+    rerank. ``reject_precision`` is the share of auto-rejected counts that
+    really do not match, and ``missed`` the true matches auto-rejected.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    accepted = scores >= accept if accept is not None else np.zeros(len(scores), dtype=bool)
+    rejected = scores <= reject if reject is not None else np.zeros(len(scores), dtype=bool)
+    rejected &= ~accepted
+    positives = int(labels.sum())
+
+    def share(numerator: int, denominator: int) -> float | None:
+        return round(numerator / denominator, 4) if denominator else None
+
+    return {
+        "samples": len(scores),
+        "accept": accept,
+        "reject": reject,
+        "accepted": int(accepted.sum()),
+        "rejected": int(rejected.sum()),
+        "accept_precision": share(int((accepted & labels).sum()), int(accepted.sum())),
+        "accept_recall": share(int((accepted & labels).sum()), positives),
+        "reject_precision": share(int((rejected & ~labels).sum()), int(rejected.sum())),
+        "missed": int((rejected & labels).sum()),
+        "reranks_avoided": share(int((accepted | rejected).sum()), len(scores)),
+    }
+
+
+def fit_band(
+    scores: Sequence[float],
+    labels: Sequence[bool],
+    *,
+    target_precision: float = DEFAULT_TARGET_PRECISION,
+    min_support: int = DEFAULT_MIN_SUPPORT,
+) -> tuple[float | None, float | None]:
+    """Fit ``(accept, reject)`` marks for one list.
+
+    ``accept`` is the lowest score at which every count scoring at least that
+    high matches with precision >= *target_precision*; ``reject`` the highest
+    score at which every count scoring at most that high fails to match with
+    the same precision. A side with fewer than *min_support* decided samples
+    is left as None, i.e. always reranked.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    order = np.argsort(-scores, kind="stable")
+    ranked_scores, ranked_labels = scores[order], labels[order]
+
+    accept = None
+    hits = np.cumsum(ranked_labels)
+    for n in range(len(ranked_scores)):
+        # Only cut between distinct scores, so ties are decided together.
+        if n + 1 < len(ranked_scores) and ranked_scores[n + 1] == ranked_scores[n]:
+            continue
+        if n + 1 >= min_support and hits[n] / (n + 1) >= target_precision:
+            accept = float(ranked_scores[n])
+
+    reject = None
+    misses = np.cumsum(~ranked_labels[::-1])
+    ascending = ranked_scores[::-1]
+    for n in range(len(ascending)):
+        if n + 1 < len(ascending) and ascending[n + 1] == ascending[n]:
+            continue
+        if accept is not None and ascending[n] >= accept:
+            break
+        if n + 1 >= min_support and misses[n] / (n + 1) >= target_precision:
+            reject = float(ascending[n])
+    return accept, reject
+
+
+_DEFAULT: ScoreThresholds | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def thresholds_from_env() -> ScoreThresholds | None:
+    path = os.environ.get("SCORE_THRESHOLDS_PATH") or thresholds_path(active_backend_name())
+    if path.strip().lower() in ("", "off", "none", "0"):
+        return None
+    return ScoreThresholds.load(path)
+
+
+def default_thresholds() -> ScoreThresholds | None:
+    """Return the process-wide thresholds, loading them on first use."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = thresholds_from_env() or ScoreThresholds()
+        return _DEFAULT if _DEFAULT.bands else None
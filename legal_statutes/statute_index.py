@@ -0,0 +1,282 @@
+"""Process-wide, read-only statute embedding indexes.
+
+Every screening session and every ``/api/classify_counts`` request scores
+against the same four statute lists. Loading them per ``InputManager`` meant a
+server with fifty open sessions held fifty copies of each matrix, so the
+registry here loads each list once per process and hands out the same
+immutable ``StatuteIndex`` to every caller.
+
+``FusedStatuteIndex`` stacks several lists into one contiguous matrix with a
+per-row label, so a batch of queries is scored against every list with a
+single matrix product and per-list top-k comes from ``np.argpartition``
+rather than a full sort. That keeps the Python overhead flat as the corpora
+grow toward full titles of statutes.
+
+The fused matrix is kept at the precision and length set by
+``EMBED_QUANTIZATION`` and ``EMBED_TRUNCATE_DIMS`` (see
+``legal_statutes.quantize``); the per-list matrices stay full float32.
+
+A list of at least ``ANN_MIN_ROWS`` rows with an up-to-date IVF index (see
+``legal_statutes.ann_index``) is searched through that index instead, so its
+query cost grows with the square root of its length. Such lists are left out
+of the fused matrix.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import numpy as np
+
+from legal_statutes import ann_index
+from legal_statutes.ann_index import IVFIndex, ann_path
+from legal_statutes.backends import DEFAULT_BACKEND, MATRIX_FORMATS, active_backend_name
+from legal_statutes.embedding_store import (
+    EMBED_DTYPE,
+    STATUTE_LISTS,
+    load_embeddings,
+    statute_path,
+)
+from legal_statutes.quantize import QuantizedMatrix, quantization_from_env, quantize
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the column indices of the *k* largest scores per row, best first.
+
+    ``argpartition`` finds the top *k* in linear time; only those *k* are
+    then sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), (scores.shape[0], k))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class StatuteIndex:
+    """One statute list and its embedding matrix. Never mutated after load."""
+
+    __slots__ = ("name", "path", "crimes", "embeddings", "backend", "ann")
+
+    def __init__(
+        self,
+        path: str,
+        crimes: list[str],
+        embeddings: np.ndarray,
+        backend: str = DEFAULT_BACKEND,
+        ann: IVFIndex | None = None,
+    ) -> None:
+        if embeddings.flags.writeable:
+            embeddings.flags.writeable = False
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "name", os.path.basename(path)[:-4])
+        object.__setattr__(self, "crimes", tuple(crimes))
+        object.__setattr__(self, "embeddings", embeddings)
+        object.__setattr__(self, "backend", backend)
+        object.__setattr__(self, "ann", ann)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("StatuteIndex is immutable")
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.embeddings.nbytes)
+
+    @property
+    def ann_bytes(self) -> int:
+        return self.ann.nbytes if self.ann is not None else 0
+
+    @property
+    def is_mapped(self) -> bool:
+        return isinstance(self.embeddings, np.memmap)
+
+    def top_k(self, query_embedding: np.ndarray, k: int = 5) -> list[tuple[str, float]]:
+        """Return the *k* best ``(statute, cosine score)`` pairs, best first."""
+        return self.top_k_batch(np.asarray(query_embedding).reshape(1, -1), k)[0]
+
+    def top_k_batch(self, query_embeddings: np.ndarray, k: int = 5) -> list[list[tuple[str, float]]]:
+        """Score a batch of queries with one matrix-matrix product.
+
+        Returns one best-first ``(statute, cosine score)`` list per query row.
+        With an IVF index only the ``ANN_NPROBE`` nearest clusters are scored.
+        """
+        queries = np.asarray(query_embeddings, dtype=EMBED_DTYPE)
+        if self.ann is not None:
+            return [
+                [(self.crimes[i], float(score)) for i, score in zip(rows, scores)]
+                for rows, scores in self.ann.search(
+                    self.embeddings, queries, k, ann_index.ANN_NPROBE
+                )
+            ]
+        scores = np.dot(queries, self.embeddings.T)
+        return [
+            [(self.crimes[i], float(row_scores[i])) for i in row_top]
+            for row_scores, row_top in zip(scores, top_k_indices(scores, k))
+        ]
+
+
+class FusedStatuteIndex:
+    """Several statute lists stacked into one matrix.
+
+    Rows for each list are contiguous, so ``labels[r]`` names the list row
+    ``r`` came from and ``spans[name]`` is that list's row range. The stacked
+    matrix is built once per process; forked workers share it copy-on-write.
+    Lists with an IVF index are not stacked; they are searched through it.
+    With a *quantization* other than ``("float32", None)`` the stacked rows
+    are stored reduced (``embeddings`` is then the float16 or int8 data).
+    """
+
+    def __init__(
+        self, indexes: list[StatuteIndex], quantization: tuple[str, int | None] = ("float32", None)
+    ) -> None:
+        self.names = tuple(index.name for index in indexes)
+        self.paths = tuple(index.path for index in indexes)
+        self.approximate = {index.name: index for index in indexes if index.ann is not None}
+        indexes = [index for index in indexes if index.ann is None]
+        self.crimes = tuple(crime for index in indexes for crime in index.crimes)
+        self.quantization = quantization
+        self.matrix: QuantizedMatrix = quantize(
+            np.vstack([index.embeddings for index in indexes]) if indexes else np.zeros((0, 1), EMBED_DTYPE),
+            *quantization,
+        )
+        self.embeddings = self.matrix.data
+        self.labels = np.repeat(
+            np.arange(len(indexes), dtype=np.int16),
+            [index.embeddings.shape[0] for index in indexes],
+        )
+        self.labels.flags.writeable = False
+        self.spans: dict[str, tuple[int, int]] = {}
+        start = 0
+        for index in indexes:
+            self.spans[index.name] = (start, start + index.embeddings.shape[0])
+            start += index.embeddings.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + self.labels.nbytes)
+
+    def top_k_batch(self, query_embeddings: np.ndarray, k: int = 5) -> dict[str, list[list[tuple[str, float]]]]:
+        """Score every query against every list with one matrix product.
+
+        Returns ``{list name: [best-first (statute, score) list per query]}``.
+        """
+        queries = np.asarray(query_embeddings, dtype=EMBED_DTYPE)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        results: dict[str, list[list[tuple[str, float]]]] = {
+            name: index.top_k_batch(queries, k) for name, index in self.approximate.items()
+        }
+        if not self.spans:
+            return results
+        scores = self.matrix.scores(queries)
+        for name, (start, end) in self.spans.items():
+            block = scores[:, start:end]
+            results[name] = [
+                [(self.crimes[start + i], float(row_scores[i])) for i in row_top]
+                for row_scores, row_top in zip(block, top_k_indices(block, k))
+            ]
+        return results
+
+
+class StatuteRegistry:
+    """Load-once cache of ``StatuteIndex`` objects, safe to share across threads.
+
+    Indexes are kept per embedding backend; *backend* defaults to the one
+    this deployment uses (see ``legal_statutes.backends``).
+    """
+
+    def __init__(self) -> None:
+        self._indexes: dict[tuple[str, str], StatuteIndex] = {}
+        self._fused: dict[tuple, FusedStatuteIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str, backend: str | None = None) -> StatuteIndex:
+        key = (backend or active_backend_name(), os.path.abspath(file_path))
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        with self._lock:
+            # Another thread may have finished loading while we waited.
+            index = self._indexes.get(key)
+            if index is None:
+                suffix, dims = MATRIX_FORMATS[key[0]]
+                crimes, embeddings = load_embeddings(key[1], dims=dims, suffix=suffix)
+                ann = None
+                if len(crimes) >= ann_index.ANN_MIN_ROWS:
+                    ann = IVFIndex.load(ann_path(key[1], suffix), embeddings)
+                index = StatuteIndex(key[1], crimes, embeddings, key[0], ann)
+                self._indexes[key] = index
+            return index
+
+    def fused(self, file_paths, backend: str | None = None) -> FusedStatuteIndex:
+        """Return the fused index over *file_paths*, building it once."""
+        backend = backend or active_backend_name()
+        quantization = quantization_from_env()
+        key = (backend, tuple(os.path.abspath(path) for path in file_paths), quantization)
+        fused = self._fused.get(key)
+        if fused is not None:
+            return fused
+        indexes = [self.get(path, backend) for path in key[1]]
+        with self._lock:
+            fused = self._fused.get(key)
+            if fused is None:
+                fused = FusedStatuteIndex(indexes, quantization)
+                self._fused[key] = fused
+            return fused
+
+    def preload(self, names=STATUTE_LISTS, backend: str | None = None) -> None:
+        self.fused([statute_path(name) for name in names], backend)
+
+    def footprint(self) -> dict:
+        """Describe what is loaded and how much of it is private to this process.
+
+        Memory-mapped matrices live in the shared page cache, so only the
+        ``private_bytes`` total grows with the number of worker processes.
+        """
+        with self._lock:
+            indexes = list(self._indexes.values())
+            fused = list(self._fused.values())
+        lists = {
+            _footprint_key(index): {
+                "rows": int(index.embeddings.shape[0]),
+                "dims": int(index.embeddings.shape[1]),
+                "bytes": index.nbytes,
+                "mapped": index.is_mapped,
+                **({"ann_lists": index.ann.n_lists} if index.ann is not None else {}),
+            }
+            for index in indexes
+        }
+        ann_bytes = sum(index.ann_bytes for index in indexes)
+        fused_bytes = sum(f.nbytes for f in fused)
+        return {
+            "lists": lists,
+            "fused": [
+                {"lists": list(f.names), "rows": len(f.crimes), "bytes": f.nbytes,
+                 "quantization": f.matrix.mode, "dims": f.matrix.dims}
+                for f in fused
+            ],
+            "total_bytes": sum(index.nbytes for index in indexes) + fused_bytes + ann_bytes,
+            "mapped_bytes": sum(index.nbytes for index in indexes if index.is_mapped),
+            "private_bytes": (
+                sum(index.nbytes for index in indexes if not index.is_mapped) + fused_bytes + ann_bytes
+            ),
+        }
+
+
+def _footprint_key(index: StatuteIndex) -> str:
+    if index.backend == DEFAULT_BACKEND:
+        return index.name
+    return index.name + MATRIX_FORMATS[index.backend][0]
+
+
+STATUTE_REGISTRY = StatuteRegistry()
+
+
+def get_statute_index(file_path: str, backend: str | None = None) -> StatuteIndex:
+    return STATUTE_REGISTRY.get(file_path, backend)
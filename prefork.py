@@ -0,0 +1,226 @@
+"""Pre-fork serving: one listening socket, several worker processes.
+
+``web_server`` handles every request in one process, so PDF builds, NumPy
+scoring and JSON encoding all take turns on the GIL. With ``WEB_WORKERS``
+above 1 the master process binds the socket, loads what every worker needs
+once (``preload``) and forks the workers, which accept on the shared socket.
+Whatever the master loaded is shared copy-on-write, and the statute
+matrices are memory maps, so each extra worker adds little memory.
+
+The master only supervises:
+
+  SIGTERM / SIGINT   stop: workers stop accepting, finish their requests
+                     for up to WORKER_GRACE_SECONDS, then exit
+  SIGHUP             graceful restart: a new worker is forked for each one
+                     running, then the old ones stop as above
+  a worker dying     it is replaced
+
+  WEB_WORKERS            worker processes (default 1, serving in this
+                         process; "auto" starts one per CPU)
+  WORKER_GRACE_SECONDS   how long a stopping worker may take to finish its
+                         requests (default 25)
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable
+
+DEFAULT_GRACE_SECONDS = 25.0
+# A worker that dies sooner than this after starting is failing on start-up;
+# wait this long before replacing it.
+RESPAWN_DELAY_SECONDS = 1.0
+# Seconds between the master's checks on its workers.
+SUPERVISE_INTERVAL_SECONDS = 0.1
+_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+
+
+def workers_from_env() -> int:
+    """The WEB_WORKERS setting; 1 where processes cannot be forked."""
+    raw = os.environ.get("WEB_WORKERS", "1").strip().lower()
+    try:
+        workers = (os.cpu_count() or 1) if raw == "auto" else int(raw)
+    except ValueError:
+        print(f"Invalid WEB_WORKERS={raw!r}; serving with one process.")
+        return 1
+    if workers > 1 and not hasattr(os, "fork"):
+        print("WEB_WORKERS needs os.fork, which this platform lacks; serving with one process.")
+        return 1
+    return max(1, workers)
+
+
+def _nothing() -> None:
+    pass
+
+
+class PreforkServer:
+    """Serve *server* from *workers* forked processes sharing its socket.
+
+    *server* must be bound and listening and count the requests it is
+    handling in ``active_requests``. The hooks: *preload* runs once in the
+    master before the first fork; *post_fork* runs first in each worker;
+    *on_stop* runs in a worker once it stops accepting, to end long-lived
+    requests early; *busy* counts other work a stopping worker should wait
+    for; *on_exit* runs last in a worker.
+    """
+
+    def __init__(
+        self,
+        server: Any,
+        workers: int,
+        *,
+        preload: Callable[[], None] = _nothing,
+        post_fork: Callable[[], None] = _nothing,
+        on_stop: Callable[[], None] = _nothing,
+        busy: Callable[[], int] = lambda: 0,
+        on_exit: Callable[[], None] = _nothing,
+        grace_seconds: float | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.server = server
+        self.workers = workers
+        self.preload = preload
+        self.post_fork = post_fork
+        self.on_stop = on_stop
+        self.busy = busy
+        self.on_exit = on_exit
+        if grace_seconds is None:
+            grace_seconds = float(os.environ.get("WORKER_GRACE_SECONDS", DEFAULT_GRACE_SECONDS))
+        self.grace_seconds = grace_seconds
+        # pid -> when it started, for every worker not yet reaped.
+        self._pids: dict[int, float] = {}
+        # Workers told to stop by a restart; they are not replaced.
+        self._retiring: set[int] = set()
+        self._stop_requested = False
+        self._restart_requested = False
+        self._worker_stopping = False
+
+    # -- master ---------------------------------------------------------
+
+    def run(self) -> None:
+        """Fork the workers and supervise them until told to stop."""
+        self.preload()
+        # Everything loaded so far lives as long as the master. Keeping the
+        # collector off it stops workers dirtying the pages they share.
+        gc.freeze()
+        # Every worker is woken by a new connection and only one accepts
+        # it; the others must not block in accept().
+        self.server.socket.setblocking(False)
+        previous = {signum: signal.signal(signum, self._on_master_signal) for signum in _SIGNALS}
+        kill_at = None
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            while self._pids:
+                if self._stop_requested and kill_at is None:
+                    print("Stopping workers.")
+                    self._signal(self._pids, signal.SIGTERM)
+                    kill_at = time.monotonic() + self.grace_seconds + 5
+                elif self._restart_requested and kill_at is None:
+                    self._restart_requested = False
+                    old = [pid for pid in self._pids if pid not in self._retiring]
+                    print(f"Restarting {len(old)} workers.")
+                    for _ in old:
+                        self._spawn()
+                    self._retiring.update(old)
+                    self._signal(old, signal.SIGTERM)
+                if kill_at is not None and time.monotonic() > kill_at:
+                    self._signal(self._pids, signal.SIGKILL)
+                self._reap()
+                time.sleep(SUPERVISE_INTERVAL_SECONDS)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            self.server.server_close()
+
+    def _on_master_signal(self, signum: int, frame: Any) -> None:
+        if signum == signal.SIGHUP:
+            self._restart_requested = True
+        else:
+            self._stop_requested = True
+
+    def _spawn(self) -> None:
+        # Keep the new worker from being signalled before it has installed
+        # its own handlers.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _SIGNALS)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                self._work()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+        self._pids[pid] = time.monotonic()
+        print(f"Worker {pid} started.")
+
+    def _reap(self) -> None:
+        while self._pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._pids.clear()
+                return
+            if pid == 0:
+                return
+            started = self._pids.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self._stop_requested or pid in self._retiring:
+                self._retiring.discard(pid)
+                print(f"Worker {pid} stopped.")
+                continue
+            print(f"Worker {pid} exited with status {code}; starting another.")
+            if time.monotonic() - started < RESPAWN_DELAY_SECONDS:
+                time.sleep(RESPAWN_DELAY_SECONDS)
+            self._spawn()
+
+    @staticmethod
+    def _signal(pids, signum: int) -> None:
+        for pid in list(pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    # -- worker ---------------------------------------------------------
+
+    def _work(self) -> None:
+        """Serve until SIGTERM, finish in-flight work, and exit."""
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, self._on_worker_signal)
+            # Ctrl-C reaches the whole process group; the master decides.
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+            self.post_fork()
+            self.server.serve_forever()
+            deadline = time.monotonic() + self.grace_seconds
+            while self.server.active_requests + self.busy() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.on_exit()
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _on_worker_signal(self, signum: int, frame: Any) -> None:
+        if self._worker_stopping:
+            return
+        self._worker_stopping = True
+        # shutdown() waits for serve_forever(), which this handler interrupted.
+        threading.Thread(target=self._stop_worker, daemon=True).start()
+
+    def _stop_worker(self) -> None:
+        self.server.shutdown()
+        self.on_stop()
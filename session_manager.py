@@ -0,0 +1,147 @@
+"""Bounded store for the web server's screening sessions.
+
+A screening that is abandoned half way leaves its session behind in memory,
+along with any event stream or long-poll still waiting on it. The manager
+keeps sessions in least-recently-used order and closes them when they go
+unused for ``SESSION_TTL_SECONDS`` or when more than ``MAX_SESSIONS`` are
+open, evicting the least recently used first. Closing a session ends its
+streams and long-polls. A session kept in the session store is only
+unloaded, and is loaded again on its next use. Expired sessions are reaped
+whenever a session is created or looked up, so no background thread is
+needed.
+
+  SESSION_TTL_SECONDS   idle seconds before a session is closed (default 1800)
+  MAX_SESSIONS          sessions kept open at once (default 500)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class SessionManager:
+    """Sessions by id, least recently used first; see the module docstring.
+
+    A session is anything with an ``id`` and a ``close(reason)`` method that
+    wakes whatever is waiting on it and lets go of its state.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1800.0,
+        max_sessions: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        # id -> (session, last used); oldest use first.
+        self._sessions: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._counters = {"created": 0, "loaded": 0, "expired": 0, "evicted": 0, "closed": 0}
+
+    @classmethod
+    def from_env(cls) -> "SessionManager":
+        return cls(
+            ttl_seconds=float(os.environ.get("SESSION_TTL_SECONDS", "1800")),
+            max_sessions=int(os.environ.get("MAX_SESSIONS", "500")),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def add(self, session: Any, *, loaded: bool = False) -> Any:
+        """Store *session*, closing expired ones and evicting over the cap.
+
+        *loaded* marks a session restored from storage rather than new.
+        """
+        with self._lock:
+            now = self._clock()
+            closing = self._take_expired(now)
+            self._sessions[session.id] = (session, now)
+            self._sessions.move_to_end(session.id)
+            self._counters["loaded" if loaded else "created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                _, (evicted, _) = self._sessions.popitem(last=False)
+                self._counters["evicted"] += 1
+                closing.append((evicted, "evicted to make room for newer sessions"))
+        self._close(closing)
+        return session
+
+    def get(self, session_id: str) -> Any:
+        """The session with *session_id*, marked as just used; None if gone."""
+        with self._lock:
+            now = self._clock()
+            closing = self._take_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions[session_id] = (entry[0], now)
+                self._sessions.move_to_end(session_id)
+        self._close(closing)
+        return entry[0] if entry is not None else None
+
+    def remove(self, session_id: str, reason: str = "closed") -> bool:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._counters["closed"] += 1
+        if entry is None:
+            return False
+        self._close([(entry[0], reason)])
+        return True
+
+    def close_all(self, reason: str) -> int:
+        """Close every session, e.g. when the process stops serving."""
+        with self._lock:
+            closing = [(session, reason) for session, _ in self._sessions.values()]
+            self._sessions.clear()
+        self._close(closing)
+        return len(closing)
+
+    def reap(self) -> int:
+        """Close every session idle past the TTL; returns how many."""
+        with self._lock:
+            closing = self._take_expired(self._clock())
+        self._close(closing)
+        return len(closing)
+
+    def _take_expired(self, now: float) -> list[tuple[Any, str]]:
+        """Pop sessions idle past the TTL. Call with ``_lock`` held."""
+        expired = []
+        while self._sessions:
+            session_id, (session, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self._counters["expired"] += 1
+            expired.append((session, "expired after being idle"))
+        return expired
+
+    @staticmethod
+    def _close(closing: list[tuple[Any, str]]) -> None:
+        # Outside the lock: closing wakes threads that may look sessions up.
+        for session, reason in closing:
+            try:
+                session.close(reason)
+            except Exception as e:
+                print(f"Error closing session {session.id}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        self.reap()
+        with self._lock:
+            now = self._clock()
+            oldest = next(iter(self._sessions.values()), None)
+            return {
+                "live": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "oldest_idle_seconds": round(now - oldest[1], 1) if oldest else 0.0,
+                **self._counters,
+            }
@@ -0,0 +1,272 @@
+"""Durable storage for screening sessions.
+
+The web server keeps its live sessions in memory (see ``session_manager``),
+which loses every screening in progress, and every finished result that
+``/api/petition-prefill`` still needs, when the process restarts or a
+free-tier instance spins down. With a store configured, each session change
+is recorded as its serialized state and event log, and a session missing
+from memory is loaded back on first access, whether it went missing through
+a restart, eviction or another worker process having created it.
+
+Writes are batched: changed sessions are queued and written in one
+transaction every ``SESSION_STORE_FLUSH_SECONDS`` by a single writer
+thread, and a later change to a queued session replaces the earlier one.
+Another process sees a change once it is flushed; 0 writes every change
+through at once, and is the default when ``WEB_WORKERS`` runs several
+processes (see ``prefork``).
+
+  SESSION_STORE_PATH           SQLite file, e.g. .cache/sessions.sqlite3
+                               (default unset: sessions live in memory only,
+                               since they hold criminal-history answers)
+  SESSION_STORE_FLUSH_SECONDS  write batching interval (default 0.5)
+  SESSION_RETENTION_SECONDS    stored sessions untouched this long are
+                               deleted (default 604800, a week)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600.0
+# Queued sessions that force a flush before the interval is up.
+MAX_BATCH = 256
+# Seconds between deletions of sessions past their retention.
+PURGE_INTERVAL_SECONDS = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+"""
+
+
+class SessionStore:
+    """Stores nothing: sessions live only as long as the process.
+
+    A record is ``{"id", "version", "status", "data"}`` where ``data`` is
+    plain JSON and ``version`` only ever grows for one session;
+    ``load`` adds ``"updated"``, the time it was last saved.
+    """
+
+    persistent = False
+
+    def save(self, record: dict[str, Any]) -> None:
+        pass
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        return None
+
+    def version(self, session_id: str) -> int | None:
+        """The stored version of *session_id*, or None if it is not stored."""
+        return None
+
+    def claim_analysis(self, session_id: str, stale_seconds: float) -> bool:
+        """Take over *session_id*'s analysis if its record is "analyzing" and
+        was not saved for *stale_seconds*; only one caller of all processes
+        sharing the store gets True for the same stale record."""
+        return False
+
+    def delete(self, session_id: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {"persistent": False}
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in one SQLite table keyed by id, written in batches.
+
+    WAL mode lets several server processes read and write the same file. One
+    connection is shared by the threads of a process behind a lock, like
+    ``ClassificationCache``.
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    ) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Saved but not yet written, by id.
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer: threading.Thread | None = None
+        self._last_purge = 0.0
+        self._counters = {"saves": 0, "writes": 0, "flushes": 0, "loads": 0, "purged": 0}
+
+    def save(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._pending[record["id"]] = record
+            self._counters["saves"] += 1
+            flush_now = self.flush_seconds <= 0 or len(self._pending) >= MAX_BATCH
+            if not flush_now and self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="session-store", daemon=True)
+                self._writer.start()
+        if flush_now:
+            self.flush()
+
+    def _write_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.time() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self.purge()
+            except sqlite3.Error as e:
+                print(f"Error writing sessions to {self.path}: {e}. Retrying.")
+
+    def flush(self) -> None:
+        """Write every queued session in one transaction."""
+        with self._lock:
+            if not self._pending or self._closed:
+                return
+            now = time.time()
+            rows = [
+                (record["id"], record["version"], record["status"], json.dumps(record["data"]), now)
+                for record in self._pending.values()
+            ]
+            # A process holding an older copy must not overwrite a newer one.
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "version = excluded.version, status = excluded.status, data = excluded.data, "
+                    "updated = excluded.updated WHERE excluded.version >= sessions.version",
+                    rows,
+                )
+            self._pending.clear()
+            self._counters["writes"] += len(rows)
+            self._counters["flushes"] += 1
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending is not None:
+                return {**pending, "updated": time.time()}
+            row = self._conn.execute(
+                "SELECT version, status, data, updated FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._counters["loads"] += 1
+        version, status, data, updated = row
+        try:
+            return {"id": session_id, "version": version, "status": status,
+                    "data": json.loads(data), "updated": updated}
+        except json.JSONDecodeError as e:
+            print(f"Stored session {session_id} is unreadable: {e}. Ignoring it.")
+            return None
+
+    def version(self, session_id: str) -> int | None:
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending is not None:
+                return pending["version"]
+            row = self._conn.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def claim_analysis(self, session_id: str, stale_seconds: float) -> bool:
+        with self._lock:
+            if session_id in self._pending:
+                # Saved by this process just now, so not abandoned.
+                return False
+            row = self._conn.execute(
+                "SELECT updated FROM sessions WHERE id = ? AND status = 'analyzing'", (session_id,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[0] <= stale_seconds:
+                return False
+            # Compare-and-set on the time read: of several processes seeing
+            # the same stale record, only the first to write matches.
+            with self._conn:
+                claimed = self._conn.execute(
+                    "UPDATE sessions SET updated = ? WHERE id = ? AND status = 'analyzing' AND updated = ?",
+                    (now, session_id, row[0]),
+                ).rowcount
+            return claimed == 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._pending.pop(session_id, None)
+            with self._conn:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self) -> int:
+        """Delete sessions not saved for ``retention_seconds``."""
+        with self._lock:
+            self._last_purge = time.time()
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM sessions WHERE updated < ?", (self._last_purge - self.retention_seconds,)
+                ).rowcount
+            self._counters["purged"] += deleted
+        return deleted
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (stored,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            return {
+                "persistent": True,
+                "stored": stored,
+                "pending": len(self._pending),
+                "flush_seconds": self.flush_seconds,
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._wake.set()
+            self._conn.close()
+
+
+def session_store_from_env(flush_seconds: float = DEFAULT_FLUSH_SECONDS) -> SessionStore:
+    """Build the server's store from SESSION_STORE_* variables.
+
+    *flush_seconds* applies unless SESSION_STORE_FLUSH_SECONDS is set.
+    """
+    path = os.environ.get("SESSION_STORE_PATH", "")
+    if path.lower() in ("", "off", "none", "0"):
+        return SessionStore()
+    try:
+        return SQLiteSessionStore(
+            path,
+            flush_seconds=float(os.environ.get("SESSION_STORE_FLUSH_SECONDS", flush_seconds)),
+            retention_seconds=float(os.environ.get("SESSION_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS)),
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not open session store {path}: {e}. Keeping sessions in memory only.")
+        return SessionStore()
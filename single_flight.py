@@ -0,0 +1,99 @@
+"""Coalescing of identical classifications that are in flight at once.
+
+On an intake day many sessions classify the same charge within seconds of
+each other, usually before the first answer has reached the classification
+cache. The first request for a normalized count becomes the flight's
+leader and makes the Gemini calls; requests that arrive while it is still
+working join the flight and wait for its result instead of issuing the
+same embedding and rerank calls again.
+
+A waiter whose leader failed, or did not finish within ``wait_seconds``,
+gets None back and classifies the count itself, so coalescing can delay a
+request but never lose its answer.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+DEFAULT_WAIT_SECONDS = 120.0
+# Keys listed in the metrics, busiest first.
+REPORTED_KEYS = 20
+
+
+class Flight:
+    """One in-flight computation and the requests waiting on it.
+
+    ``waiters`` counts the requests still waiting, not every one that joined.
+    """
+
+    __slots__ = ("key", "label", "waiters", "result", "_done")
+
+    def __init__(self, key: str, label: str) -> None:
+        self.key = key
+        self.label = label
+        self.waiters = 0
+        self.result: Any = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float | None) -> Any:
+        """The leader's result, or None if it failed or took too long."""
+        if not self._done.wait(timeout):
+            return None
+        return self.result
+
+
+class SingleFlight:
+    """Maps each in-flight key to its ``Flight``; see the module docstring."""
+
+    def __init__(self, wait_seconds: float = DEFAULT_WAIT_SECONDS) -> None:
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._flights: dict[str, Flight] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "fallbacks": 0, "peak_waiters": 0}
+
+    def join(self, key: str, label: str = "") -> tuple[Flight, bool]:
+        """Return the flight for *key* and whether the caller leads it.
+
+        A leader must call ``land`` once it is done, even if it failed.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key, label or key)
+                self._counters["leaders"] += 1
+                return flight, True
+            flight.waiters += 1
+            self._counters["coalesced"] += 1
+            self._counters["peak_waiters"] = max(self._counters["peak_waiters"], flight.waiters)
+            return flight, False
+
+    def land(self, flight: Flight, result: Any = None) -> None:
+        """Publish the leader's *result* (None if it failed) to every waiter."""
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.result = result
+        flight._done.set()
+
+    def wait(self, flight: Flight) -> Any:
+        """Wait for a flight joined as a waiter; None means compute it yourself."""
+        result = flight.wait(self.wait_seconds)
+        with self._lock:
+            flight.waiters -= 1
+            if result is None:
+                self._counters["fallbacks"] += 1
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            flights = sorted(self._flights.values(), key=lambda f: f.waiters, reverse=True)
+            return {
+                **self._counters,
+                "in_flight": len(flights),
+                "waiters": sum(f.waiters for f in flights),
+                "keys": [
+                    {"count": f.label, "waiters": f.waiters} for f in flights[:REPORTED_KEYS]
+                ],
+            }
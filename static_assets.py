@@ -0,0 +1,396 @@
+"""Precompressed, fingerprinted static assets for the web server.
+
+``python -m static_assets`` hashes every file the browser downloads (web/,
+questions/*.json, and the statute lists and embeddings in legal_statutes/)
+and writes into ``STATIC_ASSETS_DIR``:
+
+  manifest.json         each asset's content hash, fingerprinted URL (e.g.
+                        ``/js/engine.<hash>.js``), size and modification time
+  <path>.gz, <path>.br  gzip and brotli copies, kept when they save at least
+                        a tenth of the bytes; brotli needs the optional
+                        ``brotli`` package
+  <page>.html           each page with its scripts and stylesheets pointed at
+                        their fingerprinted URLs, and ``window.ASSET_URLS``
+                        mapping the data files the scripts fetch to theirs
+                        (the int8 statute embeddings only when built with
+                        ``EMBED_QUANTIZATION=int8``)
+
+The server loads the manifest once. A fingerprinted URL never changes
+content, so it is sent ``Cache-Control: immutable`` and a browser does not
+ask for it again; every other asset carries a strong ETag and is
+revalidated. Responses use the best encoding the client accepts, and the
+bodies requested most are kept in memory.
+
+A file edited since the build is served from disk, uncompressed and
+revalidated, until the next build.
+
+  STATIC_ASSETS_DIR        build output (default .cache/static; "off" serves
+                           every file from disk)
+  STATIC_CACHE_MAX_BYTES   memory for hot response bodies (default 32 MiB)
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO
+
+from legal_statutes.quantize import quantization_from_env
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only gzip copies are written.
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUILD_DIR = os.path.join(BASE_DIR, ".cache", "static")
+DEFAULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Hex digits of the content hash put in a fingerprinted file name.
+FINGERPRINT_LENGTH = 12
+# A compressed copy is kept only if it is at most this fraction of the file.
+MAX_COMPRESSED_RATIO = 0.9
+# Best first, for clients that accept several encodings equally.
+ENCODINGS = ("br", "gzip")
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# (directory under BASE_DIR, URL prefix, file patterns). web/ is the site
+# root; the other two are the shared directories web_server also serves.
+SOURCES = (
+    ("web", "/", ("**/*.html", "**/*.css", "**/*.js")),
+    ("questions", "/questions/", ("*.json",)),
+    ("legal_statutes", "/legal_statutes/", ("*.txt", "*_embed.q8.bin")),
+)
+# Files the scripts fetch themselves, listed in window.ASSET_URLS.
+DATA_PREFIXES = ("/questions/", "/legal_statutes/")
+# The browser scores int8 statute embeddings only when these are listed,
+# which the build does only under EMBED_QUANTIZATION=int8, as the server.
+QUANTIZED_SUFFIX = "_embed.q8.bin"
+
+_STATUS_COUNTERS = {304: "not_modified", 206: "partial", 416: "unsatisfiable"}
+_PAGE_REF = re.compile(r'(\b(?:src|href)=")([^":?#]+)(")')
+
+
+# -- build -----------------------------------------------------------------
+
+
+def fingerprinted_url(url: str, digest: str) -> str:
+    root, ext = posixpath.splitext(url)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def source_files() -> list[tuple[str, str]]:
+    """``(URL, file path)`` for every asset, in URL order."""
+    files = []
+    for directory, prefix, patterns in SOURCES:
+        root = os.path.join(BASE_DIR, directory)
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(root, pattern), recursive=True):
+                relative = os.path.relpath(path, root).replace(os.sep, "/")
+                files.append((prefix + relative, path))
+    return sorted(set(files))
+
+
+def build(build_dir: str = DEFAULT_BUILD_DIR) -> dict[str, Any]:
+    """Write the manifest, compressed copies and rewritten pages.
+
+    Compressed copies from the previous build are reused when the content
+    has not changed. Returns the manifest.
+    """
+    previous = _read_manifest(build_dir)
+    previous_assets = previous["assets"] if previous else {}
+    assets: dict[str, dict[str, Any]] = {}
+    bodies: dict[str, bytes] = {}
+    for url, path in source_files():
+        with open(path, "rb") as file:
+            body = file.read()
+        stat = os.stat(path)
+        digest = hashlib.sha256(body).hexdigest()
+        assets[url] = {
+            "source": os.path.relpath(path, BASE_DIR).replace(os.sep, "/"),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "fingerprint": fingerprinted_url(url, digest),
+            "file": None,
+            "length": len(body),
+            "modified": stat.st_mtime,
+            "encodings": {},
+        }
+        bodies[url] = body
+
+    # Pages are rewritten to the fingerprinted URLs, so they go last and are
+    # not fingerprinted themselves: their own URLs are the ones people visit.
+    int8 = quantization_from_env()[0] == "int8"
+    data_urls = {
+        url[1:]: assets[url]["fingerprint"][1:]
+        for url in assets
+        if url.startswith(DATA_PREFIXES) and (int8 or not url.endswith(QUANTIZED_SUFFIX))
+    }
+    for url, entry in assets.items():
+        if url.endswith(".html"):
+            body = _rewrite_page(url, bodies[url], assets, data_urls)
+            _write(build_dir, url[1:], body)
+            entry.update(
+                sha256=hashlib.sha256(body).hexdigest(), fingerprint=None, file=url[1:],
+                length=len(body), modified=time.time(),
+            )
+            bodies[url] = body
+        entry["encodings"] = _compress(build_dir, url, bodies[url], entry, previous_assets.get(url))
+
+    manifest = {"version": MANIFEST_VERSION, "assets": assets}
+    _write(build_dir, MANIFEST_NAME, json.dumps(manifest, indent=1).encode("utf-8"))
+    return manifest
+
+
+def _rewrite_page(url: str, body: bytes, assets: dict[str, dict[str, Any]], data_urls: dict[str, str]) -> bytes:
+    page_dir = posixpath.dirname(url)
+
+    def fingerprint(match: re.Match) -> str:
+        target = posixpath.normpath(posixpath.join(page_dir, match.group(2)))
+        entry = assets.get(target)
+        if entry is None or entry["fingerprint"] is None or target.endswith(".html"):
+            return match.group(0)
+        return match.group(1) + posixpath.relpath(entry["fingerprint"], page_dir) + match.group(3)
+
+    text = _PAGE_REF.sub(fingerprint, body.decode("utf-8"))
+    script = "<script>window.ASSET_URLS = %s;</script>\n" % json.dumps(data_urls, sort_keys=True).replace("</", "<\\/")
+    if "</head>" in text:
+        text = text.replace("</head>", script + "  </head>", 1)
+    return text.encode("utf-8")
+
+
+def _compress(
+    build_dir: str, url: str, body: bytes, entry: dict[str, Any], previous: dict[str, Any] | None
+) -> dict[str, list]:
+    encodings = {}
+    for encoding in ENCODINGS:
+        if encoding == "br" and brotli is None:
+            continue
+        name = url[1:] + SUFFIXES[encoding]
+        reused = previous is not None and previous["sha256"] == entry["sha256"] and encoding in previous["encodings"]
+        if reused and os.path.exists(os.path.join(build_dir, name)):
+            encodings[encoding] = previous["encodings"][encoding]
+            continue
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=11)
+        else:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) > len(body) * MAX_COMPRESSED_RATIO:
+            continue
+        _write(build_dir, name, compressed)
+        encodings[encoding] = [name, len(compressed)]
+    return encodings
+
+
+def _write(build_dir: str, name: str, body: bytes) -> None:
+    path = os.path.join(build_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(body)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(build_dir: str) -> dict[str, Any] | None:
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+# -- serving ---------------------------------------------------------------
+
+
+def negotiate_encoding(accept_encoding: str | None, available) -> str:
+    """The best of *available* encodings the Accept-Encoding header allows,
+    or ``"identity"``."""
+    if not accept_encoding:
+        return "identity"
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = "identity", 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if encoding in available and weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class Asset:
+    """One built asset; see ``build`` for what each field holds."""
+
+    __slots__ = ("url", "fingerprint", "source", "size", "mtime_ns", "sha256",
+                 "body_path", "length", "modified", "encodings")
+
+    def __init__(self, url: str, entry: dict[str, Any], build_dir: str) -> None:
+        self.url = url
+        self.fingerprint = entry["fingerprint"]
+        self.source = os.path.join(BASE_DIR, entry["source"])
+        self.size = entry["size"]
+        self.mtime_ns = entry["mtime_ns"]
+        self.sha256 = entry["sha256"]
+        self.body_path = os.path.join(build_dir, entry["file"]) if entry["file"] else self.source
+        self.length = entry["length"]
+        self.modified = entry["modified"]
+        self.encodings = {
+            encoding: (os.path.join(build_dir, name), length)
+            for encoding, (name, length) in entry["encodings"].items()
+        }
+
+    def etag(self, encoding: str) -> str:
+        """A strong ETag; each encoding is a different representation."""
+        tag = self.sha256[:16]
+        return f'"{tag}"' if encoding == "identity" else f'"{tag}-{encoding}"'
+
+
+class StaticAssets:
+    """The built assets by URL, plus a byte-bounded LRU of response bodies."""
+
+    def __init__(self, build_dir: str = DEFAULT_BUILD_DIR, *, max_cache_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        manifest = _read_manifest(build_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"no static asset build in {build_dir}")
+        self.build_dir = build_dir
+        self.max_cache_bytes = max_cache_bytes
+        self._by_url: dict[str, Asset] = {}
+        self._by_fingerprint: dict[str, Asset] = {}
+        for url, entry in manifest["assets"].items():
+            asset = Asset(url, entry, build_dir)
+            self._by_url[url] = asset
+            if asset.fingerprint:
+                self._by_fingerprint[asset.fingerprint] = asset
+        self._lock = threading.Lock()
+        # (url, encoding) -> body; least recently used first.
+        self._cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0, "partial": 0,
+                          "unsatisfiable": 0, "stale": 0, "identity": 0, "gzip": 0, "br": 0}
+
+    def find(self, url_path: str) -> tuple[Asset, bool] | None:
+        """The asset at *url_path*, and whether the URL was fingerprinted."""
+        asset = self._by_fingerprint.get(url_path)
+        if asset is not None:
+            return asset, True
+        asset = self._by_url.get(url_path)
+        return (asset, False) if asset is not None else None
+
+    def is_fresh(self, asset: Asset) -> bool:
+        """Whether the source file is unchanged since the build."""
+        try:
+            stat = os.stat(asset.source)
+        except OSError:
+            fresh = False
+        else:
+            fresh = stat.st_size == asset.size and stat.st_mtime_ns == asset.mtime_ns
+        if not fresh:
+            with self._lock:
+                self._counters["stale"] += 1
+        return fresh
+
+    def open_body(self, asset: Asset, encoding: str) -> tuple[BinaryIO, int]:
+        """A readable body for *asset* in *encoding* and its length.
+
+        Bodies up to a quarter of the cache budget are kept in memory.
+        """
+        path, length = asset.encodings.get(encoding, (asset.body_path, asset.length))
+        key = (asset.url, encoding)
+        with self._lock:
+            self._counters[encoding] += 1
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                self._counters["hits"] += 1
+                return io.BytesIO(body), len(body)
+            self._counters["misses"] += 1
+        if length > self.max_cache_bytes // 4:
+            return open(path, "rb"), length
+        with open(path, "rb") as file:
+            body = file.read()
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = body
+                self._cache_bytes += len(body)
+                while self._cache_bytes > self.max_cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        return io.BytesIO(body), len(body)
+
+    def count_status(self, status: int) -> None:
+        """Count the 304, 206 and 416 responses sent for assets."""
+        name = _STATUS_COUNTERS.get(status)
+        if name is not None:
+            with self._lock:
+                self._counters[name] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "assets": len(self._by_url),
+                "cached_bodies": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "max_cache_bytes": self.max_cache_bytes,
+                **self._counters,
+            }
+
+
+def static_assets_from_env() -> StaticAssets | None:
+    """Load the build named by STATIC_ASSETS_DIR; None serves from disk."""
+    build_dir = os.environ.get("STATIC_ASSETS_DIR", DEFAULT_BUILD_DIR)
+    if build_dir.lower() in ("", "off", "none", "0"):
+        return None
+    try:
+        return StaticAssets(
+            build_dir,
+            max_cache_bytes=int(os.environ.get("STATIC_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+        )
+    except FileNotFoundError:
+        print(f"No static asset build in {build_dir}; serving files from disk. Run python -m static_assets")
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompress and fingerprint the web assets.")
+    parser.add_argument("--out", default=os.environ.get("STATIC_ASSETS_DIR", DEFAULT_BUILD_DIR),
+                        help="build directory (default: STATIC_ASSETS_DIR or .cache/static)")
+    args = parser.parse_args(argv)
+    if brotli is None:
+        print("brotli is not installed; writing gzip copies only.")
+    assets = build(args.out)["assets"]
+    total = sum(entry["length"] for entry in assets.values())
+    print(f"wrote {len(assets)} assets ({total} bytes) to {args.out}")
+    for encoding in ENCODINGS:
+        sizes = [entry["encodings"][encoding][1] if encoding in entry["encodings"] else entry["length"]
+                 for entry in assets.values()]
+        if any(encoding in entry["encodings"] for entry in assets.values()):
+            print(f"  {encoding}: {sum(sizes)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Stand-ins for the Gemini-backed InputManager methods, so the classifier
+can be driven from tests without network access or an API key."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from input_manager import InputManager
+
+
+class FakeInputManager(InputManager):
+    """Answers statute checks from a fixed map of count -> matching files.
+
+    ``rerank_delay`` makes every rerank call take that many seconds, which is
+    how the concurrency tests tell parallel calls from sequential ones.
+    ``scores`` sets the best cosine score of a count per file (default 1.0).
+    """
+
+    def __init__(
+        self,
+        matches: dict[str, set[str]],
+        rerank_delay: float = 0.0,
+        scores: dict[str, dict[str, float]] | None = None,
+    ) -> None:
+        super().__init__()
+        self.matches = matches
+        self.rerank_delay = rerank_delay
+        self.scores = scores or {}
+        self.embed_calls: list[list[str]] = []
+        self.checks: list[tuple[tuple[str, ...], list[str], list]] = []
+        self.reranks: list[tuple[str, str]] = []
+        self.rerank_batches: list[list[tuple[str, str]]] = []
+        self._lock = threading.Lock()
+
+    def embed_queries(self, queries):
+        self.embed_calls.append(list(queries))
+        return [f"vector:{query}" for query in queries]
+
+    def statute_top_k_all(self, filenames, queries, query_embeddings=None, k=5):
+        self.checks.append((tuple(filenames), list(queries), query_embeddings))
+        return {
+            filename: [[(filename, self.scores.get(query, {}).get(filename, 1.0))] for query in queries]
+            for filename in filenames
+        }
+
+    def rerank(self, filename, query, top_k):
+        if self.rerank_delay:
+            time.sleep(self.rerank_delay)
+        with self._lock:
+            self.reranks.append((filename, query))
+        return filename in self.matches.get(query, set())
+
+    def rerank_batch(self, items):
+        if self.rerank_delay:
+            time.sleep(self.rerank_delay)
+        with self._lock:
+            self.rerank_batches.append([(filename, query) for filename, query, _ in items])
+        return [filename in self.matches.get(query, set()) for filename, query, _ in items]
@@ -0,0 +1,34 @@
+"""Keep the suite's screening sessions out of the developer's session store,
+and give web tests a live server with sessions of their own.
+
+Sessions hold criminal-history answers, and ``web_server`` opens its store
+when imported, so the store is turned off before anything imports it.
+"""
+
+from __future__ import annotations
+
+import os
+
+os.environ["SESSION_STORE_PATH"] = "off"
+
+import pytest
+
+import web_server
+from session_manager import SessionManager
+from session_store import SessionStore
+from web_harness import serve
+
+
+@pytest.fixture
+def live_server(monkeypatch):
+    """A running ``web_server.ThreadedHTTPServer`` whose sessions live in a
+    fresh in-memory store and manager."""
+    monkeypatch.setattr(web_server, "SESSION_STORE", SessionStore())
+    monkeypatch.setattr(web_server, "SESSIONS", SessionManager())
+    with serve() as server:
+        yield server
+
+
+@pytest.fixture
+def base_url(live_server):
+    return f"http://127.0.0.1:{live_server.server_address[1]}"
@@ -0,0 +1,85 @@
+"""Large statute lists are searched through an IVF index whose recall is
+tuned with n_probe; small lists keep exact search."""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+from legal_statutes import ann_index
+from legal_statutes.ann_index import IVFIndex, ann_path, synthetic_corpus
+from legal_statutes.backends import HashedNgramBackend
+from legal_statutes.build_embeddings import build_list
+from legal_statutes.embedding_store import statute_path
+from legal_statutes.statute_index import StatuteRegistry
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    matrix = synthetic_corpus(4000, 64, seed=3)
+    rng = np.random.default_rng(4)
+    queries = matrix[rng.integers(0, 4000, 50)] + 0.05 * rng.standard_normal((50, 64))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return matrix, queries.astype(np.float32)
+
+
+def recall(index, matrix, queries, n_probe, k=5):
+    exact = np.argsort(-(queries @ matrix.T), axis=1)[:, :k]
+    found = index.search(matrix, queries, k, n_probe)
+    return np.mean([len(set(rows) & set(truth)) / k for (rows, _), truth in zip(found, exact)])
+
+
+def test_recall_rises_with_n_probe_and_full_probe_is_exact(corpus):
+    matrix, queries = corpus
+    index = IVFIndex.build(matrix)
+    assert index.n_lists == 63
+    assert np.diff(index.offsets).sum() == 4000
+    assert recall(index, matrix, queries, 8) >= 0.9
+    assert recall(index, matrix, queries, 1) <= recall(index, matrix, queries, 8)
+
+    rows, scores = index.search(matrix, queries[:1], 5, n_probe=index.n_lists)[0]
+    exact = matrix @ queries[0]
+    np.testing.assert_array_equal(rows, np.argsort(-exact)[:5])
+    np.testing.assert_allclose(scores, np.sort(exact)[::-1][:5], rtol=1e-5)
+
+
+def test_stale_index_is_ignored(corpus, tmp_path):
+    matrix, _ = corpus
+    path = str(tmp_path / "list_embed.ivf.npz")
+    IVFIndex.build(matrix[:500]).save(path)
+    assert IVFIndex.load(path, matrix[:500]).rows == 500
+    edited = matrix[:500].copy()
+    edited[0] = matrix[600]
+    assert IVFIndex.load(path, edited) is None
+    assert IVFIndex.load(str(tmp_path / "missing.npz")) is None
+
+
+def test_build_step_writes_index_and_registry_uses_it(tmp_path, monkeypatch):
+    lines = [f"offense {i} of type theft {chr(97 + i % 26)}{chr(97 + i // 26)}" for i in range(300)]
+    path = tmp_path / "large.txt"
+    path.write_text("\n".join(lines))
+    backend = HashedNgramBackend.load()
+
+    report = build_list(str(path), backend, ann_min_rows=100)
+    assert report["ann_lists"] == 17
+    assert os.path.exists(ann_path(str(path), backend.suffix))
+
+    monkeypatch.setattr(ann_index, "ANN_MIN_ROWS", 100)
+    monkeypatch.setattr(ann_index, "ANN_NPROBE", 17)
+    registry = StatuteRegistry()
+    index = registry.get(str(path), "local")
+    assert index.ann is not None and registry.footprint()["lists"]["large_local"]["ann_lists"] == 17
+
+    fused = registry.fused([str(path), statute_path("section13")], "local")
+    assert set(fused.approximate) == {"large"} and fused.embeddings.shape[0] == 22
+    queries = backend.embed(["offense 42 of type theft", "first degree arson"])
+    by_list = fused.top_k_batch(queries, k=3)
+    assert by_list["large"][0][0][0] == lines[42]
+    assert by_list["section13"][1][0][0].startswith("First degree arson")
+
+    # Shrinking the list below the threshold removes the index.
+    path.write_text("\n".join(lines[:50]))
+    assert build_list(str(path), backend, ann_min_rows=100)["ann_lists"] is None
+    assert not os.path.exists(ann_path(str(path), backend.suffix))
@@ -0,0 +1,85 @@
+"""The local n-gram backend classifies without network access or an API key,
+using its own precomputed matrix for every statute list."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from input_manager import InputManager
+from legal_statutes.backends import (
+    BACKENDS,
+    EmbeddingBackend,
+    HashedNgramBackend,
+    get_backend,
+)
+from legal_statutes.embedding_store import STATUTE_LISTS, load_embeddings, statute_path
+from legal_statutes.statute_index import StatuteRegistry
+
+
+@pytest.fixture
+def local(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "local")
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    return get_backend()
+
+
+def test_vectors_are_normalized_and_deterministic():
+    backend = HashedNgramBackend(dims=256)
+    first = backend.embed(["Robbery with a dangerous weapon", ""])
+    second = backend.embed(["Robbery with a dangerous weapon"])
+    assert first.dtype == np.float32 and first.shape == (2, 256)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+    np.testing.assert_array_equal(first[0], second[0])
+
+
+def test_citation_boilerplate_is_ignored():
+    backend = HashedNgramBackend(dims=1024)
+    cited, bare = backend.embed([
+        "robbery, as provided for in Section 791 of Title 21 of the Oklahoma Statutes,",
+        "robbery",
+    ])
+    assert float(cited @ bare) == pytest.approx(1.0)
+
+
+def test_each_list_has_a_committed_local_matrix():
+    backend = HashedNgramBackend.load()
+    for name in STATUTE_LISTS:
+        lines, matrix = load_embeddings(statute_path(name), dims=backend.dims, suffix=backend.suffix)
+        assert matrix.shape == (len(lines), backend.dims)
+        np.testing.assert_allclose(matrix, backend.embed(lines), atol=1e-6)
+
+
+def test_registry_keeps_backends_apart(local):
+    registry = StatuteRegistry()
+    gemini = registry.get(statute_path("section13"), "gemini")
+    offline = registry.get(statute_path("section13"))
+    assert (gemini.backend, offline.backend) == ("gemini", "local")
+    assert gemini.embeddings.shape[1] != offline.embeddings.shape[1]
+    assert set(registry.footprint()["lists"]) == {"section13", "section13_local"}
+
+
+def test_offline_classification_end_to_end(local):
+    manager = InputManager()
+    counts = ["Kidnapping", "Embezzlement"]
+    found = manager.statute_top_k_all([statute_path(name) for name in STATUTE_LISTS], counts, k=1)
+    assert found[statute_path("section571")][0][0][0].startswith("kidnapping")
+    assert manager.rerank(statute_path("reclassified"), "Embezzlement", found[statute_path("reclassified")][1])
+    assert not manager.rerank(statute_path("reclassified"), "Kidnapping", found[statute_path("reclassified")][0])
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "word2vec")
+    with pytest.raises(ValueError, match="word2vec"):
+        get_backend()
+    assert set(BACKENDS) == {"gemini", "local"}
+
+
+def test_a_backend_without_rerank_cannot_be_created():
+    class EmbedOnly(EmbeddingBackend):
+        def embed(self, texts):
+            return np.zeros((len(texts), 4), dtype=np.float32)
+
+    with pytest.raises(TypeError, match="rerank"):
+        EmbedOnly()
@@ -0,0 +1,124 @@
+"""Batched reranking resolves many counts with one generation call, and falls
+back to one call per count when the structured answer cannot be used."""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import classifier
+from classifier import RECLASSIFIED_FILE, SECTION_13_FILE, SECTION_571_FILE, SORA_FILE, classify_counts
+from classifier_harness import FakeInputManager
+from input_manager import InputManager
+from legal_statutes.backends import UNANSWERED, GeminiBackend, batch_rerank_prompt, parse_batch_answer
+
+ITEMS = [
+    ("Armed robbery", [("robbery with dangerous weapon", 0.9), ("robbery", 0.8)]),
+    ("Trespass", [("rioting", 0.3)]),
+    ("Kidnapping", [("kidnapping", 0.95)]),
+]
+
+MATCHES = {
+    "Bogus check": {RECLASSIFIED_FILE},
+    "Trespass": set(),
+    "Robbery": {SECTION_571_FILE},
+    "Rape": {SECTION_571_FILE, SECTION_13_FILE},
+    "Kidnapping": {SECTION_571_FILE, SORA_FILE},
+    "Arson": {SECTION_571_FILE, SECTION_13_FILE},
+    "DUI": set(),
+    "Larceny": {RECLASSIFIED_FILE},
+    "Assault": {SECTION_571_FILE},
+    "Murder": {SECTION_571_FILE, SECTION_13_FILE},
+}
+
+
+def test_prompt_numbers_every_charge_and_candidate():
+    prompt = batch_rerank_prompt(ITEMS)
+    assert "Charge 1: Armed robbery\n  1. robbery with dangerous weapon\n  2. robbery" in prompt
+    assert "Charge 3: Kidnapping\n  1. kidnapping" in prompt
+
+
+def test_answer_is_mapped_back_to_candidates():
+    answer = '```json\n[{"charge": 1, "match": 1}, {"charge": 2, "match": 0}, {"charge": 3, "match": 7}]\n```'
+    assert parse_batch_answer(answer, ITEMS) == ["robbery with dangerous weapon", None, UNANSWERED]
+
+
+def test_unparseable_answer_leaves_everything_unanswered():
+    assert parse_batch_answer("Charge 1 matches.", ITEMS) == [UNANSWERED] * 3
+
+
+class FakeClient:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return type("Completion", (), {"text": self.answers.pop(0)})()
+
+
+def test_gemini_backend_batches_into_one_call(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    client = FakeClient(['[{"charge": 1, "match": 2}, {"charge": 2, "match": 0}]'])
+    backend = GeminiBackend(client)
+    assert backend.rerank_batch(ITEMS) == ["robbery", None, UNANSWERED]
+    assert len(client.prompts) == 1
+
+
+def test_classifier_batches_each_stage():
+    counts = list(MATCHES)
+    sequential = FakeInputManager(MATCHES)
+    expected = [r["class"] for r in classify_counts(sequential, counts)]
+
+    batched = FakeInputManager(MATCHES)
+    results = classify_counts(batched, counts, batch_rerank=True)
+
+    assert [r["class"] for r in results] == expected
+    assert batched.reranks == []
+    # One prompt per precedence stage instead of one per count and list.
+    assert len(sequential.reranks) == 27
+    assert len(batched.rerank_batches) == 4
+
+
+def test_batches_respect_the_batch_size(monkeypatch):
+    monkeypatch.setattr(classifier, "RERANK_BATCH_SIZE", 3)
+    manager = FakeInputManager(MATCHES)
+    classify_counts(manager, list(MATCHES), batch_rerank=True)
+    assert max(len(batch) for batch in manager.rerank_batches) == 3
+    assert len(manager.rerank_batches[0]) == 3
+
+
+def test_speculative_batching_makes_one_round_trip():
+    counts = list(MATCHES)
+    expected = [r["class"] for r in classify_counts(FakeInputManager(MATCHES), counts)]
+    manager = FakeInputManager(MATCHES, rerank_delay=0.05)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        started = time.perf_counter()
+        results = classify_counts(manager, counts, executor=executor, batch_rerank=True)
+        elapsed = time.perf_counter() - started
+
+    assert [r["class"] for r in results] == expected
+    assert len(manager.rerank_batches) == 2  # 40 checks at 20 per prompt
+    assert elapsed < 0.15
+
+
+def test_unanswered_pairs_are_reranked_on_their_own(monkeypatch):
+    import legal_statutes.embeddings as embeddings
+
+    class Backend:
+        def rerank_batch(self, items):
+            return ["robbery", UNANSWERED]
+
+    class Engine:
+        backend = Backend()
+
+    class Manager(InputManager):
+        def rerank(self, filename, query, top_k):
+            single.append(query)
+            return False
+
+    single: list[str] = []
+    monkeypatch.setattr(embeddings, "get_similarity_engine", lambda file_path=None: Engine())
+    items = [(SECTION_571_FILE, "Robbery", []), (SECTION_571_FILE, "Trespass", [])]
+    assert Manager().rerank_batch(items) == [True, False]
+    assert single == ["Trespass"]
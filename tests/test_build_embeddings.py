@@ -0,0 +1,84 @@
+"""The embedding builder only embeds new or edited statute lines and resumes
+an interrupted build from its checkpoint."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from legal_statutes.backends import EmbeddingBackend
+from legal_statutes.build_embeddings import build_list, checkpoint_path, update_manifest
+from legal_statutes.embedding_store import load_embeddings
+
+
+class CountingBackend(EmbeddingBackend):
+    name = "counting"
+    suffix = "_counting"
+    dims = 4
+
+    def __init__(self, fail_after: int | None = None) -> None:
+        self.batches: list[list[str]] = []
+        self.fail_after = fail_after
+
+    def embed(self, texts):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("quota exhausted")
+        self.batches.append(list(texts))
+        return np.array([[len(text), 1.0, 0.0, 0.0] for text in texts], dtype=np.float32)
+
+    def rerank(self, query, top_k):
+        return None
+
+
+@pytest.fixture
+def statute(tmp_path):
+    path = tmp_path / "list.txt"
+    path.write_text("robbery\nrape\nkidnapping\narson\n")
+    return str(path)
+
+
+def test_first_build_embeds_every_line_in_batches(statute):
+    backend = CountingBackend()
+    report = build_list(statute, backend, batch_size=3)
+    assert backend.batches == [["robbery", "rape", "kidnapping"], ["arson"]]
+    assert (report["embedded"], report["reused"], report["calls"]) == (4, 0, 2)
+    lines, matrix = load_embeddings(statute, dims=4, suffix="_counting")
+    assert lines == ["robbery", "rape", "kidnapping", "arson"]
+    assert matrix[:, 0].tolist() == [7, 4, 10, 5]
+
+
+def test_rebuild_embeds_only_changed_lines(statute, tmp_path):
+    build_list(statute, CountingBackend())
+    (tmp_path / "list.txt").write_text("robbery\nmaiming\nkidnapping\narson\nextortion\n")
+
+    backend = CountingBackend()
+    report = build_list(statute, backend)
+    assert backend.batches == [["maiming", "extortion"]]
+    assert (report["embedded"], report["reused"]) == (2, 3)
+    _, matrix = load_embeddings(statute, dims=4, suffix="_counting")
+    assert matrix[:, 0].tolist() == [7, 7, 10, 5, 9]
+
+
+def test_interrupted_build_resumes_from_checkpoint(statute):
+    with pytest.raises(RuntimeError):
+        build_list(statute, CountingBackend(fail_after=1), batch_size=2)
+    assert np.load(checkpoint_path(statute, "_counting"))["vectors"].shape == (2, 4)
+
+    backend = CountingBackend()
+    report = build_list(statute, backend, batch_size=2)
+    assert backend.batches == [["kidnapping", "arson"]]
+    assert report["resumed"] == 2
+    assert not os.path.exists(checkpoint_path(statute, "_counting"))
+
+
+def test_manifest_records_each_backend(statute, tmp_path):
+    manifest = tmp_path / "manifest.json"
+    update_manifest("counting", {"list": build_list(statute, CountingBackend())}, str(manifest))
+    update_manifest("other", {"list": build_list(statute, CountingBackend())}, str(manifest))
+    entry = json.loads(manifest.read_text())["counting"]["list"]
+    assert entry["rows"] == 4 and entry["dims"] == 4
+    assert len(entry["line_hashes"]) == 4
+    assert set(json.loads(manifest.read_text())) == {"counting", "other"}
@@ -0,0 +1,102 @@
+"""Repeat charges are answered from a persistent cache without any Gemini
+calls, and a statute file change invalidates what was learned from it."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from classification_cache import ClassificationCache, normalize_count, statute_hash
+from classifier import SECTION_571_FILE, classify_counts, scoring_settings
+from legal_statutes import backends
+from classifier_harness import FakeInputManager
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_normalization_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_count("  Possession of   CDS. ") == normalize_count("possession of cds")
+
+
+def test_hits_misses_and_lru_eviction(cache):
+    assert cache.get("class", "DUI", "h") is None
+    for text in ("a", "b", "c"):
+        cache.put("class", text, "h", "none")
+    time.sleep(0.01)
+    assert cache.get("class", "a", "h") == "none"  # a is now most recently used
+    cache.put("class", "d", "h", "571")
+
+    assert cache.get("class", "b", "h") is None
+    assert cache.get("class", "a", "h") == "none"
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "ttl.sqlite3"), ttl_seconds=0.01)
+    cache.put("class", "DUI", "h", "none")
+    time.sleep(0.02)
+    assert cache.get("class", "DUI", "h") is None
+    assert cache.stats()["expired"] == 1
+    cache.close()
+
+
+def test_statute_file_change_invalidates_entries(tmp_path, cache):
+    statute = tmp_path / "list.txt"
+    statute.write_text("Robbery\n")
+    before = statute_hash(str(statute))
+    cache.put_match(str(statute), "robbery", before, True)
+
+    statute.write_text("Robbery\nBurglary\n")
+    after = statute_hash(str(statute))
+    assert after != before
+    assert cache.get_match(str(statute), "robbery", after) is None
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_rebuilt_matrices_and_changed_settings_invalidate_entries(tmp_path, monkeypatch):
+    statute = tmp_path / "list.txt"
+    statute.write_text("Robbery\n")
+    monkeypatch.setattr(backends, "LOCAL_IDF_PATH", str(tmp_path / "local_idf.npy"))
+    hashes = [statute_hash(str(statute), backend="local")]
+    (tmp_path / "list_local.npy").write_bytes(b"matrix")
+    hashes.append(statute_hash(str(statute), backend="local"))
+    (tmp_path / "local_idf.npy").write_bytes(b"weights")
+    hashes.append(statute_hash(str(statute), backend="local"))
+    assert len(set(hashes)) == 3
+
+    settings = {scoring_settings(batch_rerank=True), scoring_settings(batch_rerank=False)}
+    monkeypatch.setenv("EMBED_QUANTIZATION", "int8")
+    settings.add(scoring_settings(batch_rerank=True))
+    monkeypatch.setenv("EMBED_TRUNCATE_DIMS", "768")
+    settings.add(scoring_settings(batch_rerank=True))
+    monkeypatch.setattr("legal_statutes.ann_index.ANN_NPROBE", 32)
+    settings.add(scoring_settings(batch_rerank=True))
+    assert len(settings) == 5
+
+
+def test_repeat_counts_make_no_api_calls(cache):
+    manager = FakeInputManager({"Robbery": {SECTION_571_FILE}})
+    first = classify_counts(manager, ["Robbery"], cache=cache)
+    calls = (len(manager.embed_calls), len(manager.reranks))
+
+    second = classify_counts(manager, ["  robbery "], cache=cache)
+    assert [r["class"] for r in first] == [r["class"] for r in second] == ["571"]
+    assert (len(manager.embed_calls), len(manager.reranks)) == calls
+
+
+def test_failed_checks_are_not_cached(cache):
+    class Outage(FakeInputManager):
+        def rerank(self, filename, query, top_k):
+            return None
+
+    classify_counts(Outage({}), ["Robbery"], cache=cache)
+    assert cache.stats()["entries"] == 0
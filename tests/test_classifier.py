@@ -0,0 +1,130 @@
+"""classify_counts embeds every charge in one batch and scores the batch
+against every statute list with one fused product, reusing the vectors for
+every list it checks."""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from classifier import (
+    RECLASSIFIED_FILE,
+    SECTION_13_FILE,
+    SECTION_571_FILE,
+    SORA_FILE,
+    STATUTE_FILES,
+    classify_count,
+    classify_count_detailed,
+    classify_counts,
+)
+from classifier_harness import FakeInputManager
+
+
+@pytest.mark.parametrize(
+    ("matches", "expected"),
+    [
+        ({RECLASSIFIED_FILE, SECTION_571_FILE}, "reclassified"),
+        (set(), "none"),
+        ({SECTION_571_FILE, SECTION_13_FILE}, "13-sora"),
+        ({SECTION_571_FILE, SORA_FILE}, "13-sora"),
+        ({SECTION_571_FILE}, "571"),
+    ],
+)
+def test_precedence_is_unchanged(matches, expected):
+    # No statute list entry is worded like this, so every list is reranked.
+    assert classify_count(FakeInputManager({"Robbery (count 1)": matches}), "Robbery (count 1)") == expected
+
+
+def test_single_counts_consult_the_statute_text_first():
+    manager = FakeInputManager({})
+    assert classify_count(manager, "Larceny worth less than $1000") == "reclassified"
+    assert manager.embed_calls == [] and manager.reranks == []
+
+
+def test_every_check_reuses_one_embedding():
+    manager = FakeInputManager({"Assault and battery": {SECTION_571_FILE}})
+    result = classify_count_detailed(manager, "Assault and battery")
+
+    assert result == {"class": "571", "embedding": "vector:Assault and battery", "needs_review": False}
+    assert manager.embed_calls == [["Assault and battery"]]
+    assert manager.checks == [(STATUTE_FILES, ["Assault and battery"], ["vector:Assault and battery"])]
+    assert [filename for filename, _ in manager.reranks] == [
+        RECLASSIFIED_FILE, SECTION_571_FILE, SECTION_13_FILE, SORA_FILE,
+    ]
+
+
+def test_a_returned_embedding_can_be_passed_back_in():
+    manager = FakeInputManager({})
+    classify_count_detailed(manager, "DUI", query_embedding="cached")
+    assert manager.embed_calls == []
+    assert [embeddings for _, _, embeddings in manager.checks] == [["cached"]]
+    assert manager.reranks == [(RECLASSIFIED_FILE, "DUI"), (SECTION_571_FILE, "DUI")]
+
+
+def test_a_request_embeds_and_scores_once_and_reranks_only_what_it_needs():
+    manager = FakeInputManager({
+        "Bogus check": {RECLASSIFIED_FILE},
+        "Trespass": set(),
+        "Robbery": {SECTION_571_FILE},
+        "Rape": {SECTION_571_FILE, SECTION_13_FILE},
+        "Kidnapping": {SECTION_571_FILE, SORA_FILE},
+    })
+    counts = ["Bogus check", "Trespass", "Robbery", "Rape", "Kidnapping"]
+    results = classify_counts(manager, counts)
+
+    assert [r["class"] for r in results] == ["reclassified", "none", "571", "13-sora", "13-sora"]
+    assert manager.embed_calls == [counts]
+    assert [queries for _, queries, _ in manager.checks] == [counts]
+    reranked: dict[str, list[str]] = {}
+    for filename, query in manager.reranks:
+        reranked.setdefault(filename, []).append(query)
+    assert reranked == {
+        RECLASSIFIED_FILE: counts,
+        SECTION_571_FILE: ["Trespass", "Robbery", "Rape", "Kidnapping"],
+        SECTION_13_FILE: ["Robbery", "Rape", "Kidnapping"],
+        SORA_FILE: ["Robbery", "Kidnapping"],
+    }
+
+
+def test_failed_embedding_still_classifies():
+    class NoEmbeddings(FakeInputManager):
+        def embed_queries(self, queries):
+            return None
+
+    results = classify_counts(NoEmbeddings({"DUI": {SECTION_571_FILE}}), ["DUI"])
+    assert results == [{"class": "571", "embedding": None, "needs_review": False}]
+
+
+MIXED_MATCHES = {
+    "Bogus check": {RECLASSIFIED_FILE, SECTION_571_FILE},
+    "Trespass": set(),
+    "Robbery": {SECTION_571_FILE},
+    "Rape": {SECTION_571_FILE, SECTION_13_FILE, SORA_FILE},
+    "Kidnapping": {SECTION_571_FILE, SORA_FILE},
+}
+
+
+def test_speculative_execution_matches_the_sequential_path():
+    counts = list(MIXED_MATCHES)
+    sequential = classify_counts(FakeInputManager(MIXED_MATCHES), counts)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        concurrent = classify_counts(FakeInputManager(MIXED_MATCHES), counts, executor=executor)
+    assert [r["class"] for r in concurrent] == [r["class"] for r in sequential]
+
+
+def test_speculative_execution_overlaps_rerank_calls():
+    counts = list(MIXED_MATCHES)
+    sequential_manager = FakeInputManager(MIXED_MATCHES, rerank_delay=0.05)
+    started = time.perf_counter()
+    classify_counts(sequential_manager, counts)
+    sequential_seconds = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        started = time.perf_counter()
+        classify_counts(FakeInputManager(MIXED_MATCHES, rerank_delay=0.05), counts, executor=executor)
+        concurrent_seconds = time.perf_counter() - started
+
+    assert len(sequential_manager.reranks) == 14
+    assert concurrent_seconds < sequential_seconds / 3
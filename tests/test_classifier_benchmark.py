@@ -0,0 +1,66 @@
+"""The classifier benchmark runs offline on the labeled charges and flags
+regressions against an earlier report."""
+
+from __future__ import annotations
+
+import pytest
+
+from classifier_benchmark import (
+    CLASSES,
+    compare,
+    confusion_matrix,
+    load_corpus,
+    run_benchmark,
+)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return load_corpus()
+
+
+def test_labeled_corpus_covers_every_class(corpus):
+    assert {cls for _, cls in corpus} == set(CLASSES)
+    # A SORA-only charge is still "none": 571 comes first in the chain.
+    assert dict(corpus)["Incest, 21 O.S. 885"] == "none"
+
+
+def test_local_backend_benchmark(corpus):
+    cold = run_benchmark(corpus, "local", "cold", workers=4)
+    warm = run_benchmark(corpus, "local", "warm", workers=4)
+
+    assert sum(sum(row.values()) for row in cold["confusion"].values()) == len(corpus)
+    # Guardrail for the offline model; raise it when matching improves.
+    assert cold["accuracy"] >= 0.6
+    assert 0 < cold["embed_calls_per_count"] <= 1
+    assert cold["p50_ms"] <= cold["p95_ms"]
+    assert warm["accuracy"] == cold["accuracy"]
+    assert warm["embed_calls_per_count"] == warm["rerank_calls_per_count"] == 0
+
+
+def test_counts_resolved_from_the_statute_text_match_their_labels(corpus):
+    report = run_benchmark(corpus, "local", "off", workers=1)
+    assert report["local_misclassified"] == []
+    for want, row in report["local_confusion"].items():
+        assert all(n == 0 for got, n in row.items() if got != want), want
+    # The fast path only ever settles a count as reclassified.
+    assert report["local_confusion"]["reclassified"]["reclassified"] == report["local_resolved"] > 0
+
+
+def test_confusion_matrix_rows_are_expected_classes():
+    matrix = confusion_matrix(["571", "571", "none"], ["571", "13-sora", "none"])
+    assert matrix["571"] == {"reclassified": 0, "none": 0, "571": 1, "13-sora": 1}
+    assert matrix["none"]["none"] == 1
+
+
+def test_compare_reports_regressions():
+    before = {"backend": "local", "cache": "off", "accuracy": 0.9, "p95_ms": 10.0,
+              "embed_calls_per_count": 1.0, "rerank_calls_per_count": 0.5, "local_misclassified": []}
+    assert compare([dict(before, p95_ms=12.0)], [before]) == []
+    regressions = compare(
+        [dict(before, accuracy=0.8, p95_ms=20.0, rerank_calls_per_count=0.75)], [before]
+    )
+    assert len(regressions) == 3
+    assert compare([dict(before, cache="warm", accuracy=0.1)], [before]) == []
+    miss = {"count": "Kidnapping", "expected": "571", "predicted": "13-sora"}
+    assert len(compare([dict(before, local_misclassified=[miss])], [before])) == 1
@@ -0,0 +1,67 @@
+"""The server loads statute embeddings from memory-mapped float32 matrices
+instead of parsing megabytes of text on every cold start."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from legal_statutes.embedding_store import (
+    EMBED_DTYPE,
+    STATUTE_LISTS,
+    EmbeddingStoreError,
+    binary_paths,
+    convert_text_embeddings,
+    load_embeddings,
+    statute_path,
+)
+
+
+def write_statutes(tmp_path, lines, matrix):
+    file_path = tmp_path / "statutes.txt"
+    file_path.write_text("".join(f"{line}\n" for line in lines))
+    np.savetxt(tmp_path / "statutes_embed.txt", matrix)
+    return str(file_path)
+
+
+@pytest.mark.parametrize("name", STATUTE_LISTS)
+def test_checked_in_binaries_match_the_text_embeddings(name):
+    lines, matrix = load_embeddings(statute_path(name))
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == EMBED_DTYPE
+    assert not matrix.flags.writeable
+    text = np.loadtxt(statute_path(name)[:-4] + "_embed.txt", ndmin=2)
+    assert len(lines) == text.shape[0]
+    np.testing.assert_allclose(matrix, text, atol=1e-7)
+
+
+def test_convert_round_trips_and_checks_row_alignment(tmp_path):
+    matrix = np.random.default_rng(0).normal(size=(3, 8))
+    file_path = write_statutes(tmp_path, ["a", "b", "c"], matrix)
+
+    convert_text_embeddings(file_path, dims=8)
+    lines, loaded = load_embeddings(file_path, dims=8)
+    assert lines == ["a", "b", "c"]
+    np.testing.assert_allclose(loaded, matrix.astype(EMBED_DTYPE))
+
+    (tmp_path / "statutes.txt").write_text("a\nchanged\nc\n")
+    with pytest.raises(EmbeddingStoreError, match="changed since"):
+        load_embeddings(file_path, dims=8)
+
+
+def test_rejects_wrong_dimensions_and_row_counts(tmp_path):
+    file_path = write_statutes(tmp_path, ["a", "b"], np.ones((2, 4)))
+    with pytest.raises(EmbeddingStoreError, match="4-dim"):
+        convert_text_embeddings(file_path)
+
+    file_path = write_statutes(tmp_path, ["a", "b", "c"], np.ones((2, 4)))
+    with pytest.raises(EmbeddingStoreError, match="misaligned"):
+        load_embeddings(file_path, dims=4)
+
+
+def test_missing_binary_falls_back_to_text(tmp_path):
+    file_path = write_statutes(tmp_path, ["a", "b"], np.eye(2))
+    lines, matrix = load_embeddings(file_path, dims=2)
+    assert lines == ["a", "b"]
+    assert matrix.dtype == EMBED_DTYPE
+    assert not any(map(lambda p: (tmp_path / p).exists(), binary_paths(file_path)))
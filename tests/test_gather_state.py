@@ -0,0 +1,73 @@
+"""The gathering flow is a serializable state machine: each answered batch
+advances it, and it survives a JSON round trip between any two steps."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from gather_info import CASE_TYPE_QUESTIONS, EARLY_EXIT_MESSAGES, PRELIM_QUESTIONS, GatherState, InformationGatherer
+from output_manager import OutputManager
+
+SHARED = ["CF-2019-7", "Tulsa PD", datetime(2019, 3, 1), [(datetime(2018, 5, 2), "OCPD")], "Tulsa County",
+          True, 1, False, datetime(2019, 6, 1), True, True]
+SCRIPT = [
+    (PRELIM_QUESTIONS, [False, False, False, 3]),
+    (CASE_TYPE_QUESTIONS, [0]),
+    (["questions/shared_questions.json", "questions/felony_questions.json"], SHARED + [[("Larceny", "571")]]),
+    (CASE_TYPE_QUESTIONS, [1]),
+    (["questions/shared_questions.json", "questions/misdo_questions.json"], SHARED + [250.0, False]),
+    (CASE_TYPE_QUESTIONS, [2]),
+    (["questions/arrest_questions.json"], ["CF-2020-1", "OCPD", datetime(2020, 1, 2), True]),
+]
+
+
+def test_state_machine_survives_json_between_every_step():
+    state = GatherState()
+    for filenames, answers in SCRIPT:
+        assert state.filenames() == filenames
+        saved = json.dumps(state.to_dict())
+        assert len(saved) < 4096
+        state = GatherState.from_dict(json.loads(saved))
+        state.advance(answers)
+    state = GatherState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert state.done and state.filenames() is None
+
+    misdos, felons, arrests = state.build_cases()
+    assert felons[0].counts == [["Larceny", "571"]]
+    assert felons[0].addl_arrests == [[datetime(2018, 5, 2), "OCPD"]]
+    assert felons[0].sentencing_date == datetime(2019, 6, 1)
+    assert misdos[0].fine_amount == 250.0 and misdos[0].imprisoned is False
+    assert arrests[0].arrest_date == datetime(2020, 1, 2) and arrests[0].resolved
+
+
+def test_prelim_answers_can_end_the_screening_early():
+    state = GatherState()
+    state.advance([True, False, True, 2])
+    assert state.done
+    assert state.messages == [EARLY_EXIT_MESSAGES["pending"], EARLY_EXIT_MESSAGES["serving"]]
+    assert state.build_cases() == ([], [], [])
+
+
+class ScriptedInputManager:
+    """Answers ask_questions the way InputManager does: one value or a tuple."""
+
+    def __init__(self, script):
+        self.script = list(script)
+
+    def ask_questions(self, filenames):
+        expected, answers = self.script.pop(0)
+        assert filenames == expected
+        return answers[0] if len(answers) == 1 else tuple(answers)
+
+
+def test_command_line_gatherer_drives_the_same_state_machine():
+    output = OutputManager()
+    misdos, felons, arrests = InformationGatherer(ScriptedInputManager(SCRIPT), output).gatherInfo()
+    assert (len(misdos), len(felons), len(arrests)) == (1, 1, 1)
+    assert output.drain_results() == []
+
+    output = OutputManager()
+    early = [(PRELIM_QUESTIONS, [False, True, False, 0])]
+    assert InformationGatherer(ScriptedInputManager(early), output).gatherInfo() == ([], [], [])
+    assert output.drain_results() == [EARLY_EXIT_MESSAGES["out_of_state"]]
@@ -0,0 +1,118 @@
+"""Connections stay open across requests, static files go out through
+os.sendfile, and a byte range of a statute file can be fetched on its own."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import time
+
+import pytest
+
+import web_server
+
+EMBED = "/legal_statutes/section571_embed.txt"
+
+
+@pytest.fixture
+def connection(live_server, monkeypatch):
+    monkeypatch.setattr(web_server, "STATIC_ASSETS", None)
+    conn = http.client.HTTPConnection("127.0.0.1", live_server.server_address[1], timeout=10)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: dict | None = None, **headers: str):
+    headers = {k.replace("_", "-"): v for k, v in headers.items()}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=data, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read(), response.headers
+
+
+def source(path: str) -> bytes:
+    with open(os.path.join(web_server.BASE_DIR, path.lstrip("/")), "rb") as file:
+        return file.read()
+
+
+def test_one_connection_serves_api_calls_and_files(connection):
+    status, body, _ = request(connection, "POST", "/api/start", {"ignored": True})
+    assert status == 200
+    sock = connection.sock
+    session_id = json.loads(body)["session_id"]
+    status, body, _ = request(connection, "GET", f"/api/questions?session_id={session_id}&wait=0")
+    assert status == 200 and json.loads(body)["questions"] is None, "the batch went out with /api/start"
+    status, body, headers = request(connection, "GET", "/questions/prelim_questions.json")
+    assert status == 200 and json.loads(body) and int(headers["Content-Length"]) == len(body)
+    assert request(connection, "GET", "/api/nope")[0] == 404
+    assert connection.sock is sock, "every response kept the connection open"
+
+
+def test_static_files_are_sent_with_sendfile(connection, monkeypatch):
+    calls = []
+    real_sendfile = os.sendfile
+
+    def counting_sendfile(*args):
+        calls.append(args)
+        return real_sendfile(*args)
+
+    monkeypatch.setattr(os, "sendfile", counting_sendfile)
+    status, body, _ = request(connection, "GET", EMBED)
+    assert status == 200 and body == source(EMBED)
+    assert calls, "the body was copied through Python"
+
+
+def test_a_byte_range_resumes_an_interrupted_download(connection):
+    full = source(EMBED)
+    status, body, headers = request(connection, "GET", EMBED)
+    etag = headers["ETag"]
+    assert headers["Accept-Ranges"] == "bytes"
+
+    status, body, headers = request(connection, "GET", EMBED, Range="bytes=1000-", If_Range=etag)
+    assert status == 206 and body == full[1000:]
+    assert headers["Content-Range"] == f"bytes 1000-{len(full) - 1}/{len(full)}"
+    assert request(connection, "GET", EMBED, Range="bytes=10-19")[1] == full[10:20]
+    assert request(connection, "GET", EMBED, Range="bytes=-5")[1] == full[-5:]
+
+    status, _, headers = request(connection, "GET", EMBED, Range=f"bytes={len(full)}-")
+    assert status == 416 and headers["Content-Range"] == f"bytes */{len(full)}"
+    status, body, _ = request(connection, "GET", EMBED, Range="bytes=0-9", If_Range='"changed"')
+    assert status == 200 and body == full, "a range of an older copy gets the whole file"
+    status, body, _ = request(connection, "GET", EMBED, Range="bytes=0-1,5-6")
+    assert status == 200 and body == full
+
+
+def test_a_stopping_worker_closes_idle_connections(live_server, connection):
+    assert request(connection, "GET", EMBED)[0] == 200
+    deadline = time.monotonic() + 5
+    while not live_server.idle_connections and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live_server.active_requests == 1, "the connection waits for another request"
+    live_server.close_idle_connections()
+    while live_server.active_requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live_server.active_requests == 0 and not live_server.idle_connections
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1e3", "\xb2"])
+def test_a_malformed_content_length_is_refused_and_closes_the_connection(connection, length):
+    connection.putrequest("POST", "/api/start")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400 and response.headers["Connection"] == "close"
+    response.read()
+
+
+def test_a_body_that_is_not_utf8_is_refused(connection):
+    connection.request("POST", "/api/answers", body=b"\xff\xfe", headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    assert response.status == 400
+    response.read()
+    assert request(connection, "GET", "/api/nope")[0] == 404, "the connection is still usable"
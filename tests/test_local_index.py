@@ -0,0 +1,135 @@
+"""Counts that cite a statute section or quote a list entry are put on the
+lists whose own entries match, without asking Gemini about those lists."""
+
+from __future__ import annotations
+
+import pytest
+
+import classifier
+
+from classifier import (
+    RECLASSIFIED_FILE,
+    SECTION_13_FILE,
+    SECTION_571_FILE,
+    SORA_FILE,
+    classify_counts,
+    local_statute_index,
+    resolve_known,
+)
+from classifier_benchmark import LABELED_CHARGES
+from classifier_harness import FakeInputManager
+from legal_statutes.calibrate_thresholds import load_labeled
+from legal_statutes.local_index import LocalStatuteIndex, parse_citations
+from legal_statutes.score_thresholds import list_name
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["21 O.S. § 801", "21 OS 801", "21 O.S. Sec. 801", "Title 21, Section 801", "Section 801 of Title 21"],
+)
+def test_citation_forms(text):
+    assert parse_citations(text) == {("21", "801")}
+
+
+def lists(answers: dict[str, bool]) -> set[str]:
+    return {list_name(filename) for filename, answer in answers.items() if answer}
+
+
+@pytest.mark.parametrize(
+    ("count", "expected"),
+    [
+        ("ROBBERY WITH A DANGEROUS WEAPON, 21 O.S. 801", {"section571", "section13"}),
+        ("Assault with a dangerous weapon 21 O.S. § 645", {"section571"}),
+        ("Burglary second degree, 21 O.S. 1435", set()),
+        ("First degree murder", {"section13"}),  # section 571 words it differently
+        ("larceny worth less than $1000", {"reclassified"}),
+    ],
+)
+def test_real_statute_lists(count, expected):
+    answers = local_statute_index().lookup(count)
+    assert lists(answers) == expected
+    assert all(answers.values()), "the statute text never rules a list out"
+
+
+def labels(count: str) -> set[str]:
+    return dict(load_labeled(LABELED_CHARGES))[count]
+
+
+@pytest.mark.parametrize(
+    ("count", "labeled_as"),
+    [
+        # 797 is cited by section 13's first degree robbery too.
+        ("Robbery in the second degree", "Robbery in the second degree"),
+        # Section 571 cites burglary in the first degree as 1431, section 13 as 1436.
+        ("First degree burglary", "First degree burglary"),
+        ("21 O.S. 1436", "First degree burglary"),
+        # SORA lists kidnapping only if it involved sexual abuse.
+        ("Kidnapping", "Kidnapping"),
+    ],
+)
+def test_lists_cited_under_other_sections_are_left_to_gemini(count, labeled_as):
+    answers = local_statute_index().lookup(count)
+    assert answers and lists(answers) <= labels(labeled_as)
+    assert resolve_known(answers) is None
+
+
+def test_no_local_answer_contradicts_the_labeled_charges():
+    index = local_statute_index()
+    for count, matches in load_labeled(LABELED_CHARGES):
+        assert lists(index.lookup(count)) <= matches, count
+
+
+def test_qualified_and_inchoate_counts_are_left_to_gemini():
+    index = local_statute_index()
+    # SORA lists 21 O.S. 681 only "if the offense involved sexual assault".
+    assert SORA_FILE not in index.lookup("21 O.S. 681")
+    assert index.lookup("Attempted robbery with a dangerous weapon, 21 O.S. 801") == {}
+    # Only an exact name counts: "robbery" is not section 13's "first degree robbery".
+    assert SECTION_13_FILE not in index.lookup("Robbery")
+
+
+def test_only_the_sections_a_list_cites_are_answered():
+    index = LocalStatuteIndex(
+        {"list": ["terrorism, as provided in Section 1268 et seq. of Title 21,"]}, cited=["list"]
+    )
+    assert index.lookup("21 O.S. 1268") == {"list": True}
+    assert index.lookup("21 O.S. 1268.3") == {}
+    assert index.lookup("21 O.S. 1500") == {}
+    assert index.lookup("21 O.S. 1268, 21 O.S. 1500") == {}
+
+
+def test_short_circuited_counts_make_no_api_calls():
+    index = LocalStatuteIndex(
+        {
+            RECLASSIFIED_FILE: ["larceny worth less than $1000"],
+            SECTION_571_FILE: ["robbery, as provided for in Section 791 of Title 21,"],
+            SECTION_13_FILE: ["Conjoint robbery as defined by Section 800 of this title;"],
+            SORA_FILE: ["21 O.S. § 885., Incest;"],
+        },
+        cited=(SECTION_571_FILE, SECTION_13_FILE, SORA_FILE),
+    )
+    manager = FakeInputManager({"21 O.S. 791": {SECTION_571_FILE}, "Trespass": set()})
+    counts = ["21 O.S. 791", "Larceny worth less than $1000.", "Trespass"]
+    results = classify_counts(manager, counts, local_index=index)
+
+    assert [r["class"] for r in results] == ["571", "reclassified", "none"]
+    assert manager.embed_calls == [["21 O.S. 791", "Trespass"]]
+    assert (SECTION_571_FILE, "21 O.S. 791") not in manager.reranks
+    assert {query for _, query in manager.reranks} == {"21 O.S. 791", "Trespass"}
+    stats = index.stats()
+    assert (stats["lookups"], stats["short_circuited"], stats["partial"]) == (3, 1, 1)
+    assert stats["short_circuit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_partial_answers_skip_only_the_settled_lists():
+    manager = FakeInputManager({"21 O.S. 801": {SECTION_571_FILE, SECTION_13_FILE}})
+    results = classify_counts(manager, ["21 O.S. 801"], local_index=local_statute_index())
+
+    assert results[0]["class"] == "13-sora"
+    assert manager.reranks == [(RECLASSIFIED_FILE, "21 O.S. 801")]
+
+
+def test_statute_lists_are_found_from_any_working_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(classifier, "_LOCAL_INDEX", None)
+    monkeypatch.chdir(tmp_path)
+    assert lists(local_statute_index().lookup("21 O.S. 801")) == {"section571", "section13"}
@@ -0,0 +1,104 @@
+"""WEB_WORKERS serves from pre-forked processes that share sessions through
+the store, are replaced on SIGHUP and stop gracefully on SIGTERM."""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork serving needs os.fork")
+
+
+class Master:
+    """``web_server.py`` running as a pre-fork master; collects its output."""
+
+    def __init__(self, tmp_path) -> None:
+        env = dict(
+            os.environ, WEB_WORKERS="2", HOST="127.0.0.1", PORT="0", PYTHONUNBUFFERED="1",
+            SESSION_STORE_PATH=str(tmp_path / "sessions.sqlite3"), CLASSIFICATION_CACHE_PATH="off",
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "web_server.py"], cwd=ROOT, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        self.lines: queue.Queue[str] = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        self.url = "http://127.0.0.1:" + self.wait_for(r"Serving on http://[\d.]+:(\d+)")[0]
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip("\n"))
+
+    def wait_for(self, pattern: str, count: int = 1, timeout: float = 30) -> list[str]:
+        """The first group of the next *count* output lines matching *pattern*."""
+        found, deadline = [], time.monotonic() + timeout
+        while len(found) < count:
+            line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            match = re.search(pattern, line)
+            if match:
+                found.append(match.group(1))
+        return found
+
+    def get(self, path: str) -> dict:
+        with urllib.request.urlopen(self.url + path, timeout=10) as response:
+            return json.load(response)
+
+    def post(self, path: str, payload: dict) -> dict:
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode(), method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)
+
+
+@pytest.fixture
+def master(tmp_path):
+    master = Master(tmp_path)
+    try:
+        yield master
+    finally:
+        if master.process.poll() is None:
+            master.process.kill()
+        master.process.wait(timeout=10)
+
+
+def test_workers_share_sessions_restart_and_stop_gracefully(master):
+    workers = set(master.wait_for(r"Worker (\d+) started", count=2))
+    process = master.get("/api/metrics")["process"]
+    assert process["workers"] == 2 and str(process["pid"]) in workers
+
+    # Each request may reach either worker.
+    session_id = master.post("/api/start", {})["session_id"]
+    assert master.post("/api/answers", {"session_id": session_id, "answers": ["no", "no", "no", "0"]})["ok"]
+    assert master.get(f"/api/status?session_id={session_id}")["status"] == "data_collected"
+
+    master.process.send_signal(signal.SIGHUP)
+    replacements = set(master.wait_for(r"Worker (\d+) started", count=2))
+    assert set(master.wait_for(r"Worker (\d+) stopped", count=2)) == workers
+    assert str(master.get("/api/metrics")["process"]["pid"]) in replacements
+    assert master.get(f"/api/status?session_id={session_id}")["status"] == "data_collected"
+
+    # A stopping worker ends open event streams so clients reconnect elsewhere.
+    waiting = master.post("/api/start", {})["session_id"]
+    stream = urllib.request.urlopen(f"{master.url}/api/events?session_id={waiting}", timeout=10)
+    for line in stream:
+        if line == b"event: questions\n":
+            break
+    master.process.send_signal(signal.SIGTERM)
+    assert master.process.wait(timeout=15) == 0
+    # The rest of the questions frame, then the end of the stream.
+    assert stream.read().endswith(b"\n\n")
+    assert set(master.wait_for(r"Worker (\d+) stopped", count=2)) == replacements
@@ -0,0 +1,75 @@
+"""Reduced-precision and truncated statute matrices keep the full-precision
+ranking closely enough to be worth their size."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from legal_statutes.embedding_store import STATUTE_LISTS, statute_path
+from legal_statutes.quantize import (
+    quantization_from_env,
+    quantize,
+    read_browser_file,
+    statute_matrix,
+    truncate,
+    write_browser_file,
+)
+from legal_statutes.statute_index import StatuteRegistry
+
+
+@pytest.fixture(scope="module")
+def statutes():
+    matrix, owners = statute_matrix()
+    return matrix, np.array(owners)
+
+
+def test_quantized_modes_keep_the_ranking(statutes):
+    matrix, owners = statutes
+    corpus, queries = matrix[owners != "section571"], matrix[owners == "section571"]
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :5]
+    for mode, floor, size in (("float16", 1.0, 2), ("int8", 0.95, 4)):
+        quantized = quantize(corpus, mode)
+        assert corpus.nbytes / quantized.nbytes == pytest.approx(size, rel=0.01)
+        scores = quantized.scores(queries)
+        assert np.abs(scores - queries @ corpus.T).max() < 0.01
+        top = np.argsort(-scores, axis=1)[:, :5]
+        assert np.mean(top[:, 0] == exact[:, 0]) >= floor
+
+
+def test_truncation_renormalizes_rows_and_queries(statutes):
+    matrix, _ = statutes
+    short = truncate(matrix, 256)
+    assert short.shape == (matrix.shape[0], 256)
+    np.testing.assert_allclose(np.linalg.norm(short, axis=1), 1.0, rtol=1e-5)
+    quantized = quantize(matrix, "float32", 256)
+    scores = quantized.scores(matrix[:3])
+    np.testing.assert_allclose(np.diag(scores[:, :3]), 1.0, rtol=1e-5)
+
+
+def test_browser_file_round_trips(statutes, tmp_path):
+    matrix, _ = statutes
+    path = write_browser_file(str(tmp_path / "list.txt"), matrix[:10])
+    assert path.endswith("list_embed.q8.bin")
+    loaded = read_browser_file(path)
+    assert (loaded.rows, loaded.dims) == (10, matrix.shape[1])
+    np.testing.assert_allclose(loaded.dequantize(), matrix[:10], atol=2e-3)
+
+
+def test_fused_index_honors_embed_quantization(monkeypatch):
+    paths = [statute_path(name) for name in STATUTE_LISTS]
+    registry = StatuteRegistry()
+    exact = registry.fused(paths)
+    monkeypatch.setenv("EMBED_QUANTIZATION", "int8")
+    assert quantization_from_env() == ("int8", None)
+    reduced = registry.fused(paths)
+    assert reduced is not exact and reduced.embeddings.dtype == np.int8
+    assert reduced.nbytes < exact.nbytes / 3
+
+    queries = np.array(registry.get(paths[1]).embeddings[[3, 40]])
+    for name, rows in exact.top_k_batch(queries, 3).items():
+        assert [row[0][0] for row in reduced.top_k_batch(queries, 3)[name]] == [row[0][0] for row in rows]
+
+    monkeypatch.setenv("EMBED_QUANTIZATION", "float8")
+    monkeypatch.setenv("EMBED_TRUNCATE_DIMS", "half")
+    assert quantization_from_env() == ("float32", None)
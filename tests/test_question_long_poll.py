@@ -0,0 +1,58 @@
+"""/api/start and /api/questions wait for the next question batch instead of
+sleeping a fixed 300 ms and hoping it is there."""
+
+from __future__ import annotations
+
+import json
+import time
+import urllib.request
+
+import web_server
+from web_harness import post
+
+PRELIM = "questions/prelim_questions.json"
+CASE_TYPE = "questions/case_questions.json"
+ONE_CASE = ["no", "no", "no", "1"]
+
+
+def timed(call):
+    started = time.monotonic()
+    result = call()
+    return result, time.monotonic() - started
+
+
+def test_each_batch_is_ready_as_soon_as_the_last_is_answered():
+    session = web_server.Session()
+    session.start_gathering()
+    batch, elapsed = timed(lambda: session.get_questions(5))
+    assert batch["filenames"] == [PRELIM] and elapsed < 0.5
+
+    # The batch is out awaiting answers, so there is nothing to wait for.
+    assert timed(lambda: session.get_questions(5)) < (None, 0.1)
+
+    assert session.submit_answers(ONE_CASE)
+    assert session.get_questions(5)["filenames"] == [CASE_TYPE]
+    assert session.submit_answers(["2"])
+    assert session.get_questions(5)["filenames"] == ["questions/arrest_questions.json"]
+    assert session.submit_answers(["CF-2020-1", "OCPD", "01-02-2020", "yes"])
+
+    # Gathering is over: waiters are answered at once.
+    result, elapsed = timed(lambda: session.get_questions(5))
+    assert result is None and elapsed < 0.5
+    assert session.get_status() == "data_collected"
+    assert [arrest.case_name for arrest in session.arrests] == ["CF-2020-1"]
+
+
+def test_wait_is_bounded():
+    session = web_server.Session()
+    result, elapsed = timed(lambda: session.get_questions(0.2))
+    assert result is None and 0.15 <= elapsed < 1
+
+
+def test_start_and_questions_over_http(base_url):
+    started = post(base_url + "/api/start", {})
+    assert started["filenames"] == [PRELIM], "the first batch must come back with /api/start"
+
+    assert post(base_url + "/api/answers", {"session_id": started["session_id"], "answers": ONE_CASE})["ok"]
+    with urllib.request.urlopen(f"{base_url}/api/questions?session_id={started['session_id']}") as response:
+        assert json.load(response)["filenames"] == [CASE_TYPE]
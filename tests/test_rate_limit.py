@@ -0,0 +1,31 @@
+"""Every Gemini call in the process draws from one token bucket."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from legal_statutes.rate_limit import RateLimitTimeout, TokenBucket
+
+
+def test_burst_is_immediate_then_calls_are_spaced_at_the_rate():
+    bucket = TokenBucket(rate_per_second=50, burst=3)
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.02
+
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+    stats = bucket.stats()
+    assert stats["acquired"] == 8
+    assert stats["throttled"] >= 4
+
+
+def test_acquire_gives_up_at_the_deadline():
+    bucket = TokenBucket(rate_per_second=0.5, burst=1)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.05)
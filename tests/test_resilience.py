@@ -0,0 +1,145 @@
+"""Gemini calls are bounded by deadlines and budgeted retries, and a circuit
+breaker turns an outage into fast, flagged results."""
+
+from __future__ import annotations
+
+import pytest
+
+from classifier import classify_counts
+from input_manager import InputManager
+from legal_statutes import backends, embeddings, resilience
+from legal_statutes.rate_limit import TokenBucket
+from legal_statutes.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    guarded_call,
+    is_retryable,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+class BadRequest(Exception):
+    code = 400
+
+
+def flaky(errors):
+    """A call that raises each of *errors* in turn, then returns "ok"."""
+    timeouts = []
+
+    def call(timeout):
+        timeouts.append(timeout)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    call.timeouts = timeouts
+    return call
+
+
+def guarded(call, breaker=None, budget=None, attempts=3, sleeps=None):
+    return guarded_call(
+        call,
+        policy=RetryPolicy(timeout=2.0, budget=30.0, attempts=attempts),
+        breaker=breaker or CircuitBreaker(5, 30.0),
+        budget=budget or RetryBudget(ratio=0.2, reserve=10),
+        limiter=TokenBucket(1000, 100),
+        sleep=(sleeps.append if sleeps is not None else lambda delay: None),
+    )
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record_failure(TimeoutError("slow"))
+    breaker.before_call()
+    breaker.record_failure(TimeoutError("slow"))
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    breaker.before_call()  # the one trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure(TimeoutError("still slow"))
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    stats = breaker.stats()
+    assert (stats["state"], stats["opened"], stats["rejected"]) == ("closed", 2, 2)
+    assert stats["last_error"] == "TimeoutError: still slow"
+
+
+def test_transient_errors_are_retried_with_jittered_backoff():
+    sleeps = []
+    call = flaky([Unavailable(), TimeoutError()])
+    assert guarded(call, sleeps=sleeps) == "ok"
+    assert len(call.timeouts) == 3 and max(call.timeouts) <= 2.0
+    assert len(sleeps) == 2 and all(0 <= delay <= 1.0 for delay in sleeps)
+
+
+def test_client_errors_and_exhausted_attempts_are_raised():
+    breaker = CircuitBreaker(5, 30.0)
+    call = flaky([BadRequest()])
+    with pytest.raises(BadRequest):
+        guarded(call, breaker=breaker)
+    assert len(call.timeouts) == 1
+    assert breaker.stats()["failures"] == 0
+
+    call = flaky([Unavailable()] * 5)
+    with pytest.raises(Unavailable):
+        guarded(call, breaker=breaker, attempts=2)
+    assert len(call.timeouts) == 2
+
+
+def test_retry_budget_stops_retry_storms():
+    budget = RetryBudget(ratio=0.5, reserve=1)
+    call = flaky([Unavailable(), Unavailable()])
+    with pytest.raises(Unavailable):
+        guarded(call, budget=budget)
+    assert len(call.timeouts) == 2
+    assert budget.stats()["denied"] == 1
+
+
+def test_retryable_errors():
+    assert is_retryable(TimeoutError()) and is_retryable(Unavailable())
+    assert not is_retryable(BadRequest()) and not is_retryable(ValueError())
+
+
+def test_open_breaker_flags_counts_for_review_without_calling_gemini(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.delenv("EMBEDDING_BACKEND", raising=False)
+    monkeypatch.setattr(resilience, "GEMINI_BREAKER", CircuitBreaker(2, 60.0))
+    monkeypatch.setattr(resilience, "GEMINI_RETRY_POLICY", RetryPolicy(timeout=1.0, budget=5.0, attempts=1))
+    monkeypatch.setattr(embeddings, "_ENGINES", {})
+
+    calls = []
+
+    class HungGenai:
+        def embed_content(self, **kwargs):
+            calls.append(kwargs["request_options"]["timeout"])
+            raise TimeoutError("embed_content timed out")
+
+    backend = backends.GeminiBackend(client=object())
+    backend._genai = HungGenai()
+    monkeypatch.setattr(backends, "_BACKENDS", {"gemini": backend})
+
+    for _ in range(3):
+        results = classify_counts(InputManager(), ["Trespassing after being forbidden"])
+        assert results == [{"class": "none", "embedding": None, "needs_review": True}]
+    assert calls == [1.0, 1.0]
+    assert resilience.resilience_stats()["breaker"]["state"] == "open"
@@ -0,0 +1,73 @@
+"""Decisive cosine scores settle a statute check without a rerank call, and
+the calibration fits marks that meet the requested precision."""
+
+from __future__ import annotations
+
+from classifier import RECLASSIFIED_FILE, SECTION_13_FILE, SECTION_571_FILE, SORA_FILE, classify_counts
+from classifier_harness import FakeInputManager
+from legal_statutes.calibrate_thresholds import calibrate
+from legal_statutes.score_thresholds import ScoreThresholds, evaluate_band, fit_band
+
+BANDS = {
+    "reclassified": {"accept": 0.95, "reject": 0.5},
+    "section571": {"accept": 0.9, "reject": 0.6},
+    "section13": {"accept": None, "reject": 0.6},
+}
+
+
+def test_only_the_band_between_the_marks_is_reranked():
+    thresholds = ScoreThresholds(BANDS)
+    assert thresholds.decide(SECTION_571_FILE, 0.93) is True
+    assert thresholds.decide(SECTION_571_FILE, 0.4) is False
+    assert thresholds.decide(SECTION_571_FILE, 0.75) is None
+    assert thresholds.decide(SECTION_13_FILE, 0.99) is None  # no accept mark
+    assert thresholds.decide(SORA_FILE, 0.99) is None  # not calibrated
+    stats = thresholds.stats()
+    assert (stats["accepted"], stats["rejected"], stats["reranked"]) == (1, 1, 3)
+
+
+def test_classifier_skips_decided_reranks():
+    scores = {"Robbery": {RECLASSIFIED_FILE: 0.3, SECTION_571_FILE: 0.97, SECTION_13_FILE: 0.7, SORA_FILE: 0.2}}
+    manager = FakeInputManager({"Robbery": {SECTION_571_FILE, SECTION_13_FILE}}, scores=scores)
+    results = classify_counts(manager, ["Robbery"], thresholds=ScoreThresholds(BANDS))
+
+    assert results[0]["class"] == "13-sora"
+    assert manager.reranks == [(SECTION_13_FILE, "Robbery")]
+
+
+def test_without_thresholds_every_check_is_reranked():
+    manager = FakeInputManager({"Robbery": {SECTION_571_FILE}}, scores={"Robbery": {SECTION_571_FILE: 0.99}})
+    classify_counts(manager, ["Robbery"])
+    assert len(manager.reranks) == 4
+
+
+def test_fit_meets_the_target_precision():
+    scores = [0.95, 0.93, 0.92, 0.91, 0.9, 0.85, 0.8, 0.7, 0.5, 0.45, 0.4, 0.35, 0.3]
+    labels = [True, True, True, True, True, False, True, False, False, False, False, False, False]
+    accept, reject = fit_band(scores, labels, target_precision=1.0, min_support=3)
+    assert (accept, reject) == (0.9, 0.7)
+
+    report = evaluate_band(scores, labels, accept, reject)
+    assert report["accept_precision"] == 1.0
+    assert report["accept_recall"] == round(5 / 6, 4)
+    assert report["missed"] == 0
+    assert report["reranks_avoided"] == round(11 / 13, 4)
+
+
+def test_too_few_samples_leaves_a_side_uncalibrated():
+    assert fit_band([0.9, 0.2], [True, False], min_support=5) == (None, None)
+
+
+def test_calibrate_writes_loadable_marks(tmp_path):
+    examples = [("a", {"section571"}), ("b", set()), ("c", {"section571"})]
+    scores = {"section571": [0.9, 0.2, 0.8]}
+    thresholds, report = calibrate(scores, examples, target_precision=1.0, min_support=1)
+    assert thresholds.bands == {"section571": {"accept": 0.8, "reject": 0.2}}
+    assert report["section571"]["reranks_avoided"] == 1.0
+
+    path = tmp_path / "thresholds.json"
+    thresholds.save(str(path))
+    loaded = ScoreThresholds.load(str(path))
+    assert loaded.bands == thresholds.bands
+    assert loaded.fingerprint == thresholds.fingerprint != ""
+    assert ScoreThresholds.load(str(tmp_path / "missing.json")).bands == {}
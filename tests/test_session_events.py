@@ -0,0 +1,82 @@
+"""GET /api/events streams a session's question batches, status changes and
+results over one connection, and resumes from Last-Event-ID."""
+
+from __future__ import annotations
+
+import json
+import time
+import urllib.request
+
+import pytest
+
+import screening
+import web_server
+from web_harness import post
+
+QUESTIONS = "questions/prelim_questions.json"
+ANSWERS = ["no", "no", "no", "0"]
+
+
+def fake_analyze(misdos, felons, arrests, output_manager):
+    time.sleep(0.1)
+    output_manager.print_out("Not eligible for expungement.")
+
+
+@pytest.fixture(autouse=True)
+def quick_analysis(monkeypatch):
+    monkeypatch.setattr(screening, "analyze", fake_analyze)
+
+
+def read_events(response, until: str):
+    """Parse SSE frames from *response* until an event of kind *until*."""
+    events, frame = [], {}
+    for raw in response:
+        line = raw.decode("utf-8").rstrip("\n")
+        if not line:
+            if "event" in frame:
+                events.append((int(frame["id"]), frame["event"], json.loads(frame["data"])))
+                if frame["event"] == until:
+                    return events
+            frame = {}
+            continue
+        if not line.startswith(":"):
+            field, _, value = line.partition(": ")
+            frame[field] = value
+    return events
+
+
+def test_events_follow_the_screening_and_resume(base_url):
+    session_id = post(base_url + "/api/start", {})["session_id"]
+    stream = urllib.request.urlopen(f"{base_url}/api/events?session_id={session_id}", timeout=10)
+    assert stream.headers["Content-Type"] == "text/event-stream"
+    events = read_events(stream, until="questions")
+    assert [kind for _, kind, _ in events] == ["status", "questions"]
+    assert events[0][2] == {"status": "collecting"}
+    assert events[1][2]["filenames"] == [QUESTIONS]
+
+    assert post(base_url + "/api/answers", {"session_id": session_id, "answers": ANSWERS})["ok"]
+    events += read_events(stream, until="status")
+    assert events[-1][2] == {"status": "data_collected"}
+    stream.close()
+
+    # Resume from the last event seen: only what happened since is sent.
+    post(base_url + "/api/analyze", {"session_id": session_id})
+    request = urllib.request.Request(
+        f"{base_url}/api/events?session_id={session_id}",
+        headers={"Last-Event-ID": str(events[-1][0])},
+    )
+    with urllib.request.urlopen(request, timeout=10) as stream:
+        resumed = read_events(stream, until="results")
+        assert stream.read() == b"", "the stream ends once the session is done"
+    assert [event_id for event_id, _, _ in resumed] == list(range(events[-1][0] + 1, events[-1][0] + 4))
+    assert [data for _, _, data in resumed] == [
+        {"status": "analyzing"},
+        {"status": "done"},
+        {"results": [{"type": "message", "data": "Not eligible for expungement."}]},
+    ]
+
+
+def test_unknown_last_event_id_replays_everything():
+    session = web_server.Session()
+    events, finished = session.events_after(99, timeout=0)
+    assert [kind for _, kind, _ in events] == ["status"] and not finished
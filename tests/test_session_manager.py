@@ -0,0 +1,77 @@
+"""Abandoned screenings are closed after an idle TTL or when the session cap
+is reached, and closing one ends the streams waiting on it."""
+
+from __future__ import annotations
+
+import threading
+
+import web_server
+from session_manager import SessionManager
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSession:
+    def __init__(self, session_id: str) -> None:
+        self.id = session_id
+        self.closed: str | None = None
+
+    def close(self, reason: str) -> None:
+        self.closed = reason
+
+
+def test_idle_sessions_expire_and_use_keeps_them_alive():
+    clock = FakeClock()
+    manager = SessionManager(ttl_seconds=60, max_sessions=10, clock=clock)
+    a, b = manager.add(FakeSession("a")), manager.add(FakeSession("b"))
+    clock.now = 50
+    assert manager.get("a") is a
+    clock.now = 70
+    assert manager.get("b") is None
+    assert "expired" in b.closed and a.closed is None
+    assert manager.get("a") is a
+    clock.now = 200
+    assert manager.reap() == 1 and a.closed
+    assert manager.stats() == {
+        "live": 0, "max_sessions": 10, "ttl_seconds": 60, "oldest_idle_seconds": 0.0,
+        "created": 2, "loaded": 0, "expired": 2, "evicted": 0, "closed": 0,
+    }
+
+
+def test_least_recently_used_session_is_evicted_over_the_cap():
+    clock = FakeClock()
+    manager = SessionManager(ttl_seconds=60, max_sessions=2, clock=clock)
+    a, b = manager.add(FakeSession("a")), manager.add(FakeSession("b"))
+    manager.get("a")
+    c = manager.add(FakeSession("c"))
+    assert b.closed and "evicted" in b.closed
+    assert manager.get("a") is a and manager.get("c") is c and manager.get("b") is None
+    assert manager.remove("a") and a.closed == "closed"
+    assert not manager.remove("a")
+    assert manager.stats()["evicted"] == 1 and len(manager) == 1
+
+
+def test_evicted_session_ends_its_streams_and_holds_no_thread(monkeypatch):
+    monkeypatch.setattr(web_server, "SESSIONS", SessionManager(max_sessions=1))
+    monkeypatch.setattr(web_server, "SESSION_STORE", SessionStore())
+    threads = threading.active_count()
+    first = web_server.create_session()
+    first.start_gathering()
+    assert first.get_questions()["filenames"] == ["questions/prelim_questions.json"]
+    assert threading.active_count() == threads, "a waiting screening must not park a thread"
+
+    web_server.create_session()
+    assert web_server.get_session(first.id) is None
+    assert first.get_status() == "error"
+    assert "evicted" in first.get_error()
+    events, finished = first.events_after(0, timeout=0)
+    assert finished and events[-1][2]["status"] == "error"
+    assert not first.submit_answers(["no", "no", "no", "0"])
+    assert first.get_status() == "error"
@@ -0,0 +1,137 @@
+"""Sessions are saved to SQLite and loaded back after a restart, an eviction,
+or by another worker process sharing the file."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+import web_server
+from session_manager import SessionManager
+from session_store import SQLiteSessionStore
+
+ONE_ARREST = [["no", "no", "no", "1"], ["2"], ["CF-2020-1", "OCPD", "01-02-2020", "yes"]]
+
+
+def record(session_id: str, version: int, status: str = "collecting") -> dict:
+    return {"id": session_id, "version": version, "status": status, "data": {"n": version}}
+
+
+def test_saves_are_batched_and_older_copies_never_win(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path, flush_seconds=60)
+    for version in range(1, 6):
+        store.save(record("a", version))
+    assert store.version("a") == 5 and store.load("a")["data"] == {"n": 5}
+    other = SQLiteSessionStore(path, flush_seconds=0)
+    assert other.version("a") is None, "nothing is written before a flush"
+    store.flush()
+    assert store.stats()["writes"] == 1 and store.stats()["saves"] == 5
+    assert other.load("a")["data"] == {"n": 5}
+
+    other.save(record("a", 3))
+    assert store.version("a") == 5
+    other.save(record("a", 6, "done"))
+    assert store.load("a")["status"] == "done"
+
+    store.retention_seconds = -1
+    assert store.purge() == 1 and other.version("a") is None
+    store.close()
+    other.close()
+
+
+@pytest.fixture
+def process(tmp_path, monkeypatch):
+    """Point the server at a fresh store file; calling it simulates a restart."""
+    path = str(tmp_path / "sessions.sqlite3")
+
+    def restart():
+        store = SQLiteSessionStore(path, flush_seconds=0)
+        monkeypatch.setattr(web_server, "SESSION_STORE", store)
+        monkeypatch.setattr(web_server, "SESSIONS", SessionManager())
+        return store
+
+    return restart
+
+
+def test_screening_survives_restarts(process):
+    process()
+    session = web_server.create_session()
+    session.start_gathering()
+    assert session.get_questions()["filenames"] == ["questions/prelim_questions.json"]
+    assert session.submit_answers(ONE_ARREST[0])
+
+    process()
+    restored = web_server.get_session(session.id)
+    assert restored is not session and restored.get_status() == "collecting"
+    assert restored.get_questions()["filenames"] == ["questions/case_questions.json"]
+    assert [event_id for event_id, _, _ in restored.events_after(0, 0)[0]] == [1, 2, 3]
+    assert restored.submit_answers(ONE_ARREST[1]) and restored.submit_answers(ONE_ARREST[2])
+    assert restored.start_analysis()
+    deadline = time.monotonic() + 5
+    while restored.get_status() != "done" and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    process()
+    finished = web_server.get_session(session.id)
+    assert finished.get_status() == "done"
+    assert "CF-2020-1" in finished.get_results()[0]
+    assert [arrest.case_name for arrest in finished.arrests] == ["CF-2020-1"]
+    events, done = finished.events_after(0, 0)
+    assert done and [kind for _, kind, _ in events][-2:] == ["status", "results"]
+
+
+def test_processes_sharing_a_store_follow_each_other(process, monkeypatch):
+    store_a = process()
+    sessions_a = web_server.SESSIONS
+    session = web_server.create_session()
+    session.start_gathering()
+
+    process()  # a second worker process on the same file
+    in_b = web_server.get_session(session.id)
+    assert in_b.get_questions()["filenames"] == ["questions/prelim_questions.json"]
+    assert in_b.submit_answers(ONE_ARREST[0])
+
+    monkeypatch.setattr(web_server, "SESSION_STORE", store_a)
+    monkeypatch.setattr(web_server, "SESSIONS", sessions_a)
+    back_in_a = web_server.get_session(session.id)
+    assert back_in_a is not session, "the stale copy is replaced by the newer one"
+    assert back_in_a.version == in_b.version
+    assert back_in_a.get_questions()["filenames"] == ["questions/case_questions.json"]
+    # Streams on the replaced copy stop waiting and reconnect to the new one.
+    started = time.monotonic()
+    assert session.events_after(session.version, 5)[0] == []
+    assert time.monotonic() - started < 1
+
+
+def test_an_abandoned_analysis_is_rerun_once(process, monkeypatch):
+    hang = threading.Event()
+    monkeypatch.setattr(web_server.screening, "analyze", lambda *args: hang.wait())
+    process()
+    session = web_server.create_session()
+    session.start_gathering()
+    for answers in ONE_ARREST:
+        assert session.get_questions() and session.submit_answers(answers)
+    assert session.start_analysis()  # then this process "dies" mid-way
+
+    store_b = process()
+    in_b = web_server.get_session(session.id)
+    assert in_b.get_status() == "analyzing"
+    assert web_server.get_session(session.id) is in_b
+    assert not store_b.claim_analysis(session.id, web_server.STALE_ANALYSIS_SECONDS), "saved just now"
+
+    store_b._conn.execute("UPDATE sessions SET updated = updated - 60")
+    store_b._conn.commit()
+    store_c = SQLiteSessionStore(store_b.path, flush_seconds=0)
+    monkeypatch.setattr(web_server.screening, "analyze", lambda *args: None)
+    # Same version as the stored copy, yet the check runs on this access too.
+    assert web_server.get_session(session.id) is in_b
+    assert not store_c.claim_analysis(session.id, web_server.STALE_ANALYSIS_SECONDS), "claimed by b"
+    deadline = time.monotonic() + 5
+    while in_b.get_status() != "done" and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert in_b.get_status() == "done"
+    hang.set()
+    store_c.close()
@@ -0,0 +1,92 @@
+"""Concurrent classifications of the same count share one set of Gemini
+calls."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from classifier import SECTION_571_FILE, classify_counts
+from classifier_harness import FakeInputManager
+from single_flight import SingleFlight
+
+
+def classify_concurrently(managers, count, single_flight):
+    barrier = threading.Barrier(len(managers))
+    results = [None] * len(managers)
+
+    def worker(n):
+        barrier.wait()
+        results[n] = classify_counts(managers[n], [count], single_flight=single_flight)[0]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(len(managers))]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_identical_counts_in_flight_are_classified_once():
+    single_flight = SingleFlight()
+    managers = [
+        FakeInputManager({"Kidnapping": {SECTION_571_FILE}}, rerank_delay=0.2) for _ in range(5)
+    ]
+    threads, results = classify_concurrently(managers, "Kidnapping", single_flight)
+    time.sleep(0.1)
+    stats = single_flight.stats()
+    assert stats["in_flight"] == 1
+    assert stats["keys"] == [{"count": "kidnapping", "waiters": 4}]
+    for thread in threads:
+        thread.join()
+
+    assert [r["class"] for r in results] == ["571"] * 5
+    assert sum(len(m.embed_calls) for m in managers) == 1
+    assert sum(len(m.reranks) for m in managers) == 4
+    stats = single_flight.stats()
+    assert (stats["leaders"], stats["coalesced"], stats["in_flight"]) == (1, 4, 0)
+    assert stats["peak_waiters"] == 4
+
+
+def test_duplicates_within_one_request_share_the_answer():
+    manager = FakeInputManager({"DUI": set()})
+    results = classify_counts(manager, ["DUI", "dui.", "DUI"], single_flight=SingleFlight())
+    assert [r["class"] for r in results] == ["none"] * 3
+    assert manager.embed_calls == [["DUI"]]
+
+
+def test_waiters_classify_for_themselves_when_the_leader_fails():
+    class Failing(FakeInputManager):
+        def embed_queries(self, queries):
+            time.sleep(0.2)
+            raise RuntimeError("leader crashed")
+
+    single_flight = SingleFlight()
+    errors = []
+
+    def lead():
+        try:
+            classify_counts(Failing({}), ["Arson"], single_flight=single_flight)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    time.sleep(0.05)
+    waiter = FakeInputManager({"Arson": set()})
+    result = classify_counts(waiter, ["Arson"], single_flight=single_flight)[0]
+    leader.join()
+
+    assert len(errors) == 1
+    assert result["class"] == "none"
+    assert waiter.embed_calls == [["Arson"]]
+    assert single_flight.stats()["fallbacks"] == 1
+
+
+def test_a_waiter_that_gave_up_is_no_longer_counted():
+    single_flight = SingleFlight(wait_seconds=0.01)
+    flight, leader = single_flight.join("dui")
+    assert leader and single_flight.join("dui") == (flight, False)
+    assert single_flight.stats()["waiters"] == 1
+    assert single_flight.wait(flight) is None
+    stats = single_flight.stats()
+    assert (stats["in_flight"], stats["waiters"], stats["fallbacks"]) == (1, 0, 1)
+    single_flight.land(flight)
@@ -0,0 +1,106 @@
+"""Built static assets are served precompressed, fingerprinted URLs are cached
+for good, and everything else revalidates with a strong ETag."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+
+import pytest
+
+import static_assets
+import web_server
+from static_assets import IMMUTABLE, StaticAssets, negotiate_encoding
+from web_harness import get
+
+
+@pytest.fixture(scope="module")
+def built(tmp_path_factory):
+    build_dir = str(tmp_path_factory.mktemp("static"))
+    static_assets.build(build_dir)
+    return build_dir
+
+
+@pytest.fixture(autouse=True)
+def assets(built, monkeypatch):
+    monkeypatch.setattr(web_server, "STATIC_ASSETS", StaticAssets(built))
+
+
+def source(path: str) -> bytes:
+    with open(os.path.join(static_assets.BASE_DIR, path), "rb") as file:
+        return file.read()
+
+
+def test_pages_point_at_fingerprinted_assets_served_compressed_and_immutable(base_url):
+    status, page, headers = get(base_url + "/")
+    assert status == 200 and headers["Cache-Control"] == "no-cache"
+    script = re.search(rb'src="(js/engine\.[0-9a-f]{12}\.js)"', page).group(1).decode()
+    urls = json.loads(re.search(rb"window\.ASSET_URLS = (\{.*?\});", page).group(1))
+    assert re.fullmatch(r"questions/prelim_questions\.[0-9a-f]{12}\.json", urls["questions/prelim_questions.json"])
+
+    status, body, headers = get(f"{base_url}/{script}", Accept_Encoding="gzip, deflate")
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == source("web/js/engine.js")
+    assert headers["Cache-Control"] == IMMUTABLE and headers["Vary"] == "Accept-Encoding"
+    assert headers["ETag"].endswith('-gzip"') and not headers["ETag"].startswith("W/")
+    assert headers["Content-Type"] == "text/javascript"
+
+    status, body, headers = get(f"{base_url}/{urls['questions/prelim_questions.json']}")
+    assert status == 200 and "Content-Encoding" not in headers
+    assert body == source("questions/prelim_questions.json")
+
+
+def test_plain_urls_revalidate_with_the_etag_of_their_encoding(base_url):
+    url = base_url + "/legal_statutes/section571_embed.txt"
+    status, body, headers = get(url, Accept_Encoding="gzip")
+    plain = source("legal_statutes/section571_embed.txt")
+    assert status == 200 and len(body) < len(plain) / 2 and gzip.decompress(body) == plain
+    assert headers["Cache-Control"] == "no-cache"
+    etag = headers["ETag"]
+
+    assert get(url, Accept_Encoding="gzip", If_None_Match=etag)[0] == 304
+    assert get(url, If_None_Match=etag)[0] == 200, "identity is a different representation"
+    assert get(url, If_Modified_Since=headers["Last-Modified"])[0] == 304
+    assert web_server.STATIC_ASSETS.stats()["not_modified"] == 2
+
+
+def test_files_edited_since_the_build_are_served_from_disk(base_url):
+    asset, _ = web_server.STATIC_ASSETS.find("/js/engine.js")
+    asset.mtime_ns -= 1
+    status, body, headers = get(base_url + asset.fingerprint, Accept_Encoding="gzip")
+    assert status == 200 and body == source("web/js/engine.js")
+    assert "Content-Encoding" not in headers and headers.get("Cache-Control") != IMMUTABLE
+
+
+def test_encoding_negotiation():
+    available = {"gzip": None, "br": None}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert negotiate_encoding("*", {"gzip": None}) == "gzip"
+    assert negotiate_encoding("gzip;q=0", available) == "identity"
+    assert negotiate_encoding(None, available) == "identity"
+
+
+def test_ranges_apply_to_the_negotiated_representation(base_url):
+    url = base_url + "/legal_statutes/SORA_embed.txt"
+    _, compressed, headers = get(url, Accept_Encoding="gzip")
+    status, body, partial = get(url, Accept_Encoding="gzip", Range="bytes=100-", If_Range=headers["ETag"])
+    assert status == 206 and body == compressed[100:]
+    assert partial["Content-Encoding"] == "gzip"
+    assert web_server.STATIC_ASSETS.stats()["partial"] == 1
+
+
+def asset_urls(build_dir: str) -> dict[str, str]:
+    with open(os.path.join(build_dir, "index.html"), "rb") as file:
+        return json.loads(re.search(rb"window\.ASSET_URLS = (\{.*?\});", file.read()).group(1))
+
+
+def test_int8_embeddings_reach_the_browser_only_when_the_server_uses_them(built, tmp_path, monkeypatch):
+    urls = asset_urls(built)
+    assert "legal_statutes/SORA_embed.txt" in urls and "legal_statutes/SORA_embed.q8.bin" not in urls
+
+    monkeypatch.setenv("EMBED_QUANTIZATION", "int8")
+    static_assets.build(str(tmp_path))
+    assert "legal_statutes/SORA_embed.q8.bin" in asset_urls(str(tmp_path))
@@ -0,0 +1,95 @@
+"""Statute matrices are loaded once per process and shared by every session."""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pytest
+
+from legal_statutes.embedding_store import statute_path
+from legal_statutes.statute_index import StatuteIndex, StatuteRegistry, top_k_indices
+
+
+def test_concurrent_loads_share_one_index():
+    registry = StatuteRegistry()
+    path = statute_path("section13")
+    seen = []
+
+    def load():
+        seen.append(registry.get(path))
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(seen) == 8
+    assert all(index is seen[0] for index in seen)
+    assert list(registry.footprint()["lists"]) == ["section13"]
+
+
+def test_index_cannot_be_modified():
+    index = StatuteIndex("/tmp/example.txt", ["a", "b"], np.eye(2, dtype=np.float32))
+    with pytest.raises(AttributeError):
+        index.crimes = ("c",)
+    with pytest.raises(ValueError):
+        index.embeddings[0, 0] = 5.0
+
+
+def test_top_k_returns_best_matches_first():
+    embeddings = np.array([[1, 0], [0, 1], [0.6, 0.8]], dtype=np.float32)
+    index = StatuteIndex("/tmp/example.txt", ["x", "y", "diag"], embeddings)
+    top = index.top_k(np.array([0.0, 1.0]), k=2)
+    assert [crime for crime, _ in top] == ["y", "diag"]
+    assert top[0][1] == pytest.approx(1.0)
+
+
+def test_batch_scoring_matches_one_query_at_a_time():
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(20, 6)).astype(np.float32)
+    index = StatuteIndex("/tmp/example.txt", [f"s{i}" for i in range(20)], embeddings)
+    queries = rng.normal(size=(4, 6)).astype(np.float32)
+    batch = index.top_k_batch(queries, k=3)
+    for query, expected in zip(queries, batch):
+        single = index.top_k(query, k=3)
+        assert [crime for crime, _ in single] == [crime for crime, _ in expected]
+        assert [s for _, s in single] == pytest.approx([s for _, s in expected], rel=1e-5)
+
+
+def test_fused_index_matches_each_list_scored_alone():
+    registry = StatuteRegistry()
+    paths = [statute_path(name) for name in ("reclassified", "section571", "section13", "SORA")]
+    fused = registry.fused(paths)
+    assert fused.embeddings.shape == (14 + 50 + 22 + 26, 3072)
+    assert fused.embeddings.flags.c_contiguous and not fused.embeddings.flags.writeable
+    assert list(np.unique(fused.labels, return_counts=True)[1]) == [14, 50, 22, 26]
+
+    queries = np.array(registry.get(paths[1]).embeddings[[3, 40]])
+    by_list = fused.top_k_batch(queries, k=5)
+    for path in paths:
+        index = registry.get(path)
+        expected = index.top_k_batch(queries, k=5)
+        assert [[c for c, _ in row] for row in by_list[index.name]] == [[c for c, _ in row] for row in expected]
+    assert by_list["section571"][0][0] == (registry.get(paths[1]).crimes[3], pytest.approx(1.0, abs=1e-5))
+
+
+def test_top_k_indices_agrees_with_a_full_sort():
+    scores = np.random.default_rng(2).normal(size=(6, 200))
+    top = top_k_indices(scores, 7)
+    np.testing.assert_array_equal(top, np.argsort(-scores, axis=1)[:, :7])
+    assert top_k_indices(scores[:, :3], 7).shape == (6, 3)
+
+
+def test_footprint_reports_mapped_and_private_bytes():
+    registry = StatuteRegistry()
+    registry.preload()
+    footprint = registry.footprint()
+    assert set(footprint["lists"]) == {"reclassified", "section571", "section13", "SORA"}
+    assert footprint["lists"]["section571"] == {
+        "rows": 50, "dims": 3072, "bytes": 50 * 3072 * 4, "mapped": True,
+    }
+    assert footprint["mapped_bytes"] == sum(entry["bytes"] for entry in footprint["lists"].values())
+    # Only the fused copy is private to the process.
+    assert footprint["private_bytes"] == footprint["fused"][0]["bytes"]
@@ -9,35 +9,10 @@ publishing. Nothing did that when this process served the site, so those URLs
 from __future__ import annotations
 
 import json
-import threading
-import urllib.error
-import urllib.request
-from http.server import ThreadingHTTPServer
 
 import pytest
 
-import web_server
-
-
-@pytest.fixture(scope="module")
-def base_url():
-    server = ThreadingHTTPServer(("127.0.0.1", 0), web_server.AppHandler)
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    try:
-        yield f"http://127.0.0.1:{server.server_address[1]}"
-    finally:
-        server.shutdown()
-        server.server_close()
-        thread.join(timeout=5)
-
-
-def get(url: str):
-    try:
-        with urllib.request.urlopen(url) as response:
-            return response.status, response.read(), dict(response.headers)
-    except urllib.error.HTTPError as exc:
-        return exc.code, exc.read(), dict(exc.headers)
+from web_harness import get
 
 
 @pytest.mark.parametrize(
@@ -108,11 +83,5 @@ def test_large_statute_files_may_be_revalidated_rather_than_refetched(base_url):
     last_modified = headers.get("Last-Modified")
     assert last_modified, "no Last-Modified, so the browser cannot revalidate"
 
-    request = urllib.request.Request(
-        base_url + path, headers={"If-Modified-Since": last_modified}
-    )
-    try:
-        with urllib.request.urlopen(request) as response:
-            assert response.status == 304, f"expected 304, got {response.status}"
-    except urllib.error.HTTPError as exc:
-        assert exc.code == 304, f"expected 304, got {exc.code}"
+    status, _, _ = get(base_url + path, If_Modified_Since=last_modified)
+    assert status == 304, f"expected 304, got {status}"
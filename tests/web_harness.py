@@ -0,0 +1,47 @@
+"""A live ``web_server`` for tests, and the HTTP calls they make to it."""
+
+from __future__ import annotations
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from typing import Iterator
+
+import web_server
+
+
+@contextmanager
+def serve() -> Iterator[web_server.ThreadedHTTPServer]:
+    """Serve ``AppHandler`` on a free local port until the block ends."""
+    server = web_server.ThreadedHTTPServer(("127.0.0.1", 0), web_server.AppHandler)
+    # A short poll interval keeps shutdown() from adding half a second per test.
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+
+
+def get(url: str, **headers: str):
+    """``(status, body, headers)`` of a GET; ``If_None_Match=`` sends If-None-Match."""
+    request = urllib.request.Request(url, headers={k.replace("_", "-"): v for k, v in headers.items()})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read(), exc.headers
+
+
+def post(url: str, payload: dict) -> dict:
+    """POST *payload* as JSON and return the decoded JSON answer."""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
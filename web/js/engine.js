@@ -99,12 +99,19 @@
   /*  Question loading                                                   */
   /* ------------------------------------------------------------------ */
 
+  /* The server's pages carry window.ASSET_URLS (see static_assets.py), the
+     fingerprinted URLs browsers may cache for good. Elsewhere, e.g. on
+     GitHub Pages, the plain path is used. */
+  function assetUrl(path) {
+    return (window.ASSET_URLS && window.ASSET_URLS[path]) || path;
+  }
+
   async function loadQuestions(filenames) {
     if (typeof filenames === 'string') filenames = [filenames];
     const questions = [];
     for (const fn of filenames) {
       const basename = fn.replace(/^.*\//, '');
-      const resp = await fetch('questions/' + basename);
+      const resp = await fetch(assetUrl('questions/' + basename));
       const data = await resp.json();
       const offset = questions.length;
       const keys = Object.keys(data).sort((a, b) => parseInt(a.slice(1), 10) - parseInt(b.slice(1), 10));
@@ -638,7 +645,7 @@
   }
 
   /* ------------------------------------------------------------------ */
-  /*  Early-exit messages (mirrors gather_info.py prelim_questions)     */
+  /*  Early-exit messages (mirrors gather_info.py EARLY_EXIT_MESSAGES)  */
   /* ------------------------------------------------------------------ */
 
   const EARLY_EXIT_MSGS = {
@@ -98,23 +98,80 @@
 
   /* ---- Statute data loading ------------------------------------------ */
 
-  async function _loadStatuteData(name) {
-    if (_statuteCache[name]) return _statuteCache[name];
+  /* Fingerprinted URL of a data file where the page lists one; see
+     assetUrl in engine.js. */
+  function _assetUrl(path) {
+    return (window.ASSET_URLS && window.ASSET_URLS[path]) || path;
+  }
 
-    const [textResp, embedResp] = await Promise.all([
-      fetch(`legal_statutes/${name}.txt`),
-      fetch(`legal_statutes/${name}_embed.txt`),
-    ]);
-    if (!textResp.ok || !embedResp.ok) {
-      throw new Error(`Could not load statute data for ${name}`);
+  /* <name>_embed.q8.bin (written by `python -m legal_statutes.quantize
+     --write-browser`) is the same matrix as <name>_embed.txt stored as int8
+     with one float32 scale per row, about 1/25 of the download. Layout,
+     little-endian: "Q8E1", uint32 rows, uint32 dims, float32 scales[rows],
+     int8 data[rows * dims]. It changes the top-1 statute for about 2% of
+     queries, so like EMBED_QUANTIZATION on the server it is opt-in: only
+     used when the asset build, run with EMBED_QUANTIZATION=int8, lists it in
+     window.ASSET_URLS. Returns null otherwise, or if the file is unusable,
+     and the text file is used instead. */
+  async function _loadQuantizedEmbeddings(name) {
+    const path = `legal_statutes/${name}_embed.q8.bin`;
+    if (!(window.ASSET_URLS && window.ASSET_URLS[path])) return null;
+    let resp;
+    try {
+      resp = await fetch(window.ASSET_URLS[path]);
+    } catch (e) {
+      return null;
     }
-    const [textContent, embedContent] = await Promise.all([textResp.text(), embedResp.text()]);
+    if (!resp.ok) return null;
+    const buffer = await resp.arrayBuffer();
+    const header = new DataView(buffer, 0, Math.min(12, buffer.byteLength));
+    if (buffer.byteLength < 12 ||
+        String.fromCharCode(...new Uint8Array(buffer, 0, 4)) !== 'Q8E1') {
+      console.warn(`gemini_classify: ${name}_embed.q8.bin is not a quantized embedding file`);
+      return null;
+    }
+    const rows = header.getUint32(4, true);
+    const dims = header.getUint32(8, true);
+    if (dims !== EMBED_DIMS || buffer.byteLength !== 12 + rows * 4 + rows * dims) {
+      console.warn(`gemini_classify: ${name}_embed.q8.bin has an unexpected shape`);
+      return null;
+    }
+    const scales = new DataView(buffer, 12, rows * 4);
+    const data = new Int8Array(buffer, 12 + rows * 4, rows * dims);
+    const embeddings = [];
+    for (let r = 0; r < rows; r++) {
+      const scale = scales.getFloat32(r * 4, true);
+      const row = new Float32Array(dims);
+      for (let d = 0; d < dims; d++) row[d] = data[r * dims + d] * scale;
+      embeddings.push(row);
+    }
+    return embeddings;
+  }
 
-    const crimes = textContent.split('\n').map(l => l.trim()).filter(Boolean);
-    const embeddings = embedContent.split('\n')
+  async function _loadTextEmbeddings(name) {
+    const resp = await fetch(_assetUrl(`legal_statutes/${name}_embed.txt`));
+    if (!resp.ok) throw new Error(`Could not load statute data for ${name}`);
+    return (await resp.text()).split('\n')
       .map(l => l.trim())
       .filter(Boolean)
       .map(line => line.split(/\s+/).map(Number));
+  }
+
+  async function _loadStatuteData(name) {
+    if (_statuteCache[name]) return _statuteCache[name];
+
+    const [textResp, quantized] = await Promise.all([
+      fetch(_assetUrl(`legal_statutes/${name}.txt`)),
+      _loadQuantizedEmbeddings(name),
+    ]);
+    if (!textResp.ok) {
+      throw new Error(`Could not load statute data for ${name}`);
+    }
+    const crimes = (await textResp.text()).split('\n').map(l => l.trim()).filter(Boolean);
+    let embeddings = quantized;
+    if (!embeddings || embeddings.length !== crimes.length) {
+      embeddings = await _loadTextEmbeddings(name);
+    }
 
     /* crimes[i] must line up with embeddings[i]; a mismatch would silently
        return the wrong statute, so fail loudly instead. */
@@ -143,6 +200,15 @@
 
   /* ---- Gemini REST calls ---------------------------------------------- */
 
+  function _normalizeEmbedding(vec) {
+    if (!Array.isArray(vec)) throw new Error('Embedding response had no values');
+    if (vec.length !== EMBED_DIMS) {
+      throw new Error(`Embedding dimension ${vec.length} does not match precomputed ${EMBED_DIMS}`);
+    }
+    const norm = Math.sqrt(_dot(vec, vec));
+    return norm > 0 ? vec.map(v => v / norm) : vec;
+  }
+
   async function _embedQuery(text) {
     const url = `${API_BASE}/models/${EMBED_MODEL}:embedContent?key=${encodeURIComponent(_apiKey())}`;
     const resp = await fetch(url, {
@@ -157,13 +223,39 @@
       throw new Error(`Embedding request failed (HTTP ${resp.status}): ${await resp.text()}`);
     }
     const data = await resp.json();
-    const vec = data.embedding && data.embedding.values;
-    if (!Array.isArray(vec)) throw new Error('Embedding response had no values');
-    if (vec.length !== EMBED_DIMS) {
-      throw new Error(`Embedding dimension ${vec.length} does not match precomputed ${EMBED_DIMS}`);
+    return _normalizeEmbedding(data.embedding && data.embedding.values);
+  }
+
+  /* batchEmbedContents takes at most 100 texts, so a request of any size
+     costs ceil(n / 100) round-trips instead of n. */
+  const EMBED_BATCH_SIZE = 100;
+
+  async function _embedQueries(texts) {
+    const url = `${API_BASE}/models/${EMBED_MODEL}:batchEmbedContents?key=${encodeURIComponent(_apiKey())}`;
+    const vectors = [];
+    for (let start = 0; start < texts.length; start += EMBED_BATCH_SIZE) {
+      const chunk = texts.slice(start, start + EMBED_BATCH_SIZE);
+      const resp = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          requests: chunk.map(text => ({
+            model: `models/${EMBED_MODEL}`,
+            content: { parts: [{ text }] },
+          })),
+        }),
+      });
+      if (!resp.ok) {
+        throw new Error(`Embedding request failed (HTTP ${resp.status}): ${await resp.text()}`);
+      }
+      const data = await resp.json();
+      const embeddings = data.embeddings || [];
+      if (embeddings.length !== chunk.length) {
+        throw new Error(`Embedding response had ${embeddings.length} vectors for ${chunk.length} texts`);
+      }
+      for (const e of embeddings) vectors.push(_normalizeEmbedding(e && e.values));
     }
-    const norm = Math.sqrt(_dot(vec, vec));
-    return norm > 0 ? vec.map(v => v / norm) : vec;
+    return vectors;
   }
 
   const SAFETY_SETTINGS = [
@@ -206,29 +298,31 @@
 
   /* ---- Statute check --------------------------------------------------- */
 
-  async function _checkStatute(name, query) {
+  async function _checkStatute(name, query, queryVec) {
     const { crimes, embeddings } = await _loadStatuteData(name);
-    const queryVec = await _embedQuery(query);
     const top = _topK(queryVec, embeddings, 5);
     return (await _llmMatch(top, crimes, query)) !== null;
   }
 
   /* ---- Public API ------------------------------------------------------ */
 
-  /* Precedence mirrors web_server.py classify_count:
-       reclassified → none (not in 571) → 13-sora → 571            */
-  async function classifyCount(count) {
-    if (await _checkStatute('reclassified', count)) return 'reclassified';
-    if (!(await _checkStatute('section571', count))) return 'none';
-    if (await _checkStatute('section13', count)) return '13-sora';
-    if (await _checkStatute('SORA', count)) return '13-sora';
+  /* Precedence mirrors classifier.py classify_count:
+       reclassified → none (not in 571) → 13-sora → 571
+     The count is embedded once and that vector is scored against every list. */
+  async function classifyCount(count, queryVec) {
+    if (!queryVec) queryVec = await _embedQuery(count);
+    if (await _checkStatute('reclassified', count, queryVec)) return 'reclassified';
+    if (!(await _checkStatute('section571', count, queryVec))) return 'none';
+    if (await _checkStatute('section13', count, queryVec)) return '13-sora';
+    if (await _checkStatute('SORA', count, queryVec)) return '13-sora';
     return '571';
   }
 
   async function classifyCounts(counts) {
     const classifications = [];
-    for (const count of counts) {
-      classifications.push({ count, class: await classifyCount(count) });
+    const vectors = counts.length ? await _embedQueries(counts.map(String)) : [];
+    for (let i = 0; i < counts.length; i++) {
+      classifications.push({ count: counts[i], class: await classifyCount(counts[i], vectors[i]) });
     }
     return { classifications };
   }
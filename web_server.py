@@ -6,6 +6,24 @@ Run:
 
 Then open:
   http://127.0.0.1:8000
+
+``POST /api/start`` and ``GET /api/questions`` long-poll: they return as soon
+as the screening has a question batch ready (or has stopped asking), and
+otherwise after ``QUESTION_WAIT_SECONDS`` (default 25) with ``questions:
+null``. ``/api/questions?wait=0`` answers at once.
+
+``GET /api/events`` streams the same batches, every status change and the
+results as Server-Sent Events, resuming from ``Last-Event-ID``.
+
+Static files built by ``python -m static_assets`` are served precompressed,
+with strong ETags, and fingerprinted URLs are cached by browsers for good.
+Static bodies go out through ``os.sendfile`` and honour a single byte range.
+Connections are kept open between requests (HTTP/1.1) for up to
+``KEEPALIVE_SECONDS`` (default 15) of idleness.
+
+``WEB_WORKERS`` serves from several pre-forked processes (see ``prefork``).
+They share sessions through the session store, so ``SESSION_STORE_PATH``
+must be set.
 """
 
 from __future__ import annotations
@@ -13,16 +31,32 @@ from __future__ import annotations
 import json
 import os
 import posixpath
+import re
+import socket
 import threading
 import time
 import uuid
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from socketserver import ThreadingMixIn
 from typing import Any
 from urllib.parse import urlparse, parse_qs
 
-from input_manager import InputManager
+from classification_cache import default_cache
+from classifier import (
+    IN_FLIGHT,
+    batch_rerank_enabled,
+    classification_executor,
+    classify_counts,
+    local_statute_index,
+)
+from gather_info import GatherState
+from input_manager import InputManager, load_questions
+from legal_statutes.rate_limit import GEMINI_RATE_LIMITER
+from legal_statutes.resilience import resilience_stats
+from legal_statutes.score_thresholds import default_thresholds
+from legal_statutes.statute_index import STATUTE_REGISTRY
 from output_manager import OutputManager
 from petition_generator import (
     PetitionValidationError,
@@ -30,30 +64,13 @@ from petition_generator import (
     petition_filename,
 )
 from petition_prefill import build_petition_prefill
+from prefork import PreforkServer, workers_from_env
+from session_manager import SessionManager
+from session_store import SessionStore, session_store_from_env
+from static_assets import IMMUTABLE, REVALIDATE, negotiate_encoding, static_assets_from_env
 import screening
 
 
-# ---------------------------------------------------------------------------
-# Count classification (short-circuit AI checks)
-# ---------------------------------------------------------------------------
-
-def classify_count(input_manager: InputManager, count: str) -> str:
-    """Run the short-circuit legal-statute classification for a single charge.
-
-    Order of precedence:
-      reclassified → none → 571 → 13-sora / sora → 571 (violent but not 13/SORA)
-    """
-    if input_manager.check_file_contents("legal_statutes/reclassified.txt", count):
-        return "reclassified"
-    if not input_manager.check_file_contents("legal_statutes/section571.txt", count):
-        return "none"
-    # Violent under 571 — check the two worst-case lists
-    if input_manager.check_file_contents("legal_statutes/section13.txt", count):
-        return "13-sora"
-    if input_manager.check_file_contents("legal_statutes/SORA.txt", count):
-        return "13-sora"
-    return "571"
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 WEB_DIR = os.path.join(BASE_DIR, "web")
 
@@ -62,6 +79,26 @@ WEB_DIR = os.path.join(BASE_DIR, "web")
 # when this process serves the site they stay where they are in the repository.
 SHARED_ASSET_DIRS = frozenset({"questions", "legal_statutes"})
 
+# Longest a request waits for the next question batch. Kept under the 30 s
+# idle timeout common to reverse proxies.
+QUESTION_WAIT_SECONDS = float(os.environ.get("QUESTION_WAIT_SECONDS", "25"))
+# An idle event stream sends a comment this often so proxies keep it open.
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+# Milliseconds a browser EventSource waits before reconnecting.
+SSE_RETRY_MS = 2000
+# Seconds an idle keep-alive connection is held open for its next request.
+KEEPALIVE_SECONDS = float(os.environ.get("KEEPALIVE_SECONDS", "15"))
+# How often an event stream re-reads its session from the store, to pick up
+# changes made by other worker processes. 0 when this process is the only one.
+SESSION_SYNC_SECONDS = 0.0
+# Worker processes serving the app; set in each worker by main().
+WORKERS = 1
+# Set when this process stops serving; open event streams end so their
+# clients reconnect to a process that is still serving.
+SHUTTING_DOWN = threading.Event()
+# Name of the threads running screening.analyze().
+ANALYSIS_THREAD = "session-analysis"
+
 
 # ---------------------------------------------------------------------------
 # Type decoding: raw string answers -> Python types
@@ -135,24 +172,47 @@ def decode_answers(questions: list[dict], raw_answers: list) -> list:
     return decoded
 
 
+def serialise_results(results: list | None) -> list[dict[str, Any]]:
+    """Results as the API returns them.
+
+    Each item is either a dict (case results) or a string (early-exit
+    message); both become ``{"type": ..., "data": ...}``.
+    """
+    serialised: list[dict[str, Any]] = []
+    for item in results or ():
+        if isinstance(item, dict):
+            serialised.append({"type": "cases", "data": item})
+        else:
+            serialised.append({"type": "message", "data": str(item)})
+    return serialised
+
+
 # ---------------------------------------------------------------------------
 # Session
 # ---------------------------------------------------------------------------
 
+# Statuses after which a session publishes nothing more.
+FINISHED = frozenset({"done", "error"})
+
 class Session:
     """Manages one screening run.
 
-    Phase 1 (``start_gathering``): runs ``screening.gather()`` in a background
-    thread.  The thread blocks inside ``InputManager.ask_questions()`` until
-    the web API feeds decoded answers back.
+    Phase 1 (``start_gathering``): steps a ``GatherState`` through the
+    question batches. Each ``submit_answers`` call advances it and publishes
+    the next batch on the request's own thread, so a screening waiting on
+    the user holds only that small state, not a parked thread.
 
     Phase 2 (``start_analysis``): triggered by the user clicking
     "Start Analysis".  Runs ``screening.analyze()`` in a second background
     thread and collects results via ``OutputManager``.
+
+    Every published event also saves the session to its *store*;
+    ``from_record`` rebuilds it there or in another process.
     """
 
-    def __init__(self) -> None:
-        self.id: str = str(uuid.uuid4())
+    def __init__(self, store: SessionStore | None = None, session_id: str | None = None) -> None:
+        self.id: str = session_id or str(uuid.uuid4())
+        self.store = store or SessionStore()
         self.input_manager = InputManager()
         self.output_manager = OutputManager()
 
@@ -165,30 +225,130 @@ class Session:
 
         self._current_questions: list[dict] | None = None
         self._current_filenames: list[str] | None = None
+        self._delivered = False
+        self.gather_state = GatherState()
         self._lock = threading.Lock()
+        # Notified whenever an event is published.
+        self._changed = threading.Condition(self._lock)
+        # Everything a client needs to follow the screening, in order: the
+        # event with id n is self._events[n - 1]. See events_after().
+        self._events: list[tuple[int, str, dict[str, Any]]] = []
+        # Set once the session manager lets go of this copy.
+        self._closed = False
+        # True while this process runs the analysis.
+        self._analyzing_here = False
+        if session_id is None:
+            with self._lock:
+                self._publish_status()
+
+    @property
+    def version(self) -> int:
+        """Grows with every change: the number of events published."""
+        return len(self._events)
+
+    # -- persistence ----------------------------------------------------
+
+    def to_record(self) -> dict[str, Any]:
+        """The session as a ``SessionStore`` record. Call with ``_lock`` held."""
+        return {
+            "id": self.id,
+            "version": self.version,
+            "status": self.status,
+            "data": {
+                "gather": self.gather_state.to_dict(),
+                "pending": self._current_filenames if self._current_questions is not None else None,
+                "error": self.error_message,
+                "results": self.results,
+                # Question batches are stored by file name and re-read on load.
+                "events": [
+                    [event_id, kind, {"filenames": data["filenames"]} if kind == "questions" else data]
+                    for event_id, kind, data in self._events
+                ],
+            },
+        }
+
+    @classmethod
+    def from_record(cls, record: dict[str, Any], store: SessionStore | None = None) -> "Session":
+        """Rebuild a session saved by ``to_record``.
+
+        An analysis it was running is not restarted here; see
+        ``resume_abandoned_analysis``.
+        """
+        session = cls(store, record["id"])
+        data = record["data"]
+        session.status = record["status"]
+        session.gather_state = GatherState.from_dict(data["gather"])
+        session.error_message = data["error"]
+        session.results = data["results"]
+        for event_id, kind, event in data["events"]:
+            if kind == "questions":
+                event = {"filenames": event["filenames"], "questions": load_questions(event["filenames"])}
+            session._events.append((event_id, kind, event))
+        if data["pending"] is not None:
+            session._current_filenames = data["pending"]
+            session._current_questions = load_questions(data["pending"])
+        if session.gather_state.done:
+            session.misdos, session.felons, session.arrests = session.gather_state.build_cases()
+        return session
+
+    # -- events ---------------------------------------------------------
+
+    def _publish(self, kind: str, data: dict[str, Any]) -> None:
+        """Append an event and wake its waiters. Call with ``_lock`` held."""
+        self._events.append((len(self._events) + 1, kind, data))
+        self._changed.notify_all()
+        if self.store.persistent:
+            self.store.save(self.to_record())
+
+    def _publish_status(self) -> None:
+        data: dict[str, Any] = {"status": self.status}
+        if self.error_message:
+            data["error"] = self.error_message
+        self._publish("status", data)
+        if self.status == "done":
+            self._publish("results", {"results": serialise_results(self.results)})
+
+    def events_after(self, last_id: int, timeout: float) -> tuple[list[tuple[int, str, dict[str, Any]]], bool]:
+        """Events published after id *last_id*, waiting up to *timeout* for one.
+
+        Also returns whether the session is finished, after which no more
+        events will be published.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            if last_id > len(self._events):
+                # An id this session never issued (e.g. from before a
+                # restart): replay everything.
+                last_id = 0
+            while len(self._events) <= last_id and self.status not in FINISHED and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return self._events[max(0, last_id):], self.status in FINISHED
 
     # -- phase 1 --------------------------------------------------------
 
     def start_gathering(self) -> None:
-        threading.Thread(target=self._gather_worker, daemon=True).start()
+        with self._lock:
+            self._offer_questions()
 
-    def _gather_worker(self) -> None:
-        try:
-            misdos, felons, arrests = screening.gather(
-                input_manager=self.input_manager,
-                output_manager=self.output_manager,
-            )
-            with self._lock:
-                self.misdos = misdos
-                self.felons = felons   
-                self.arrests = arrests
-                self.status = "data_collected"
-        except Exception as exc:
-            import traceback
-            traceback.print_exc()
-            with self._lock:
-                self.status = "error"
-                self.error_message = str(exc)
+    def _offer_questions(self) -> None:
+        """Publish the state machine's next batch, or finish gathering.
+
+        Call with ``_lock`` held.
+        """
+        filenames = self.gather_state.filenames()
+        if filenames is None:
+            self.misdos, self.felons, self.arrests = self.gather_state.build_cases()
+            self.status = "data_collected"
+            self._publish_status()
+            return
+        batch = {"filenames": filenames, "questions": load_questions(filenames)}
+        self._current_questions = batch["questions"]
+        self._current_filenames = batch["filenames"]
+        self._delivered = False
+        self._publish("questions", batch)
 
     # -- phase 2 --------------------------------------------------------
 
@@ -197,40 +357,120 @@ class Session:
             if self.status != "data_collected":
                 return False
             self.status = "analyzing"
-        threading.Thread(target=self._analyze_worker, daemon=True).start()
+            self._publish_status()
+        self._run_analysis()
+        return True
+
+    def resume_abandoned_analysis(self) -> bool:
+        """Rerun an analysis no process is running any more.
+
+        The record of a running analysis is re-saved every third of
+        ``STALE_ANALYSIS_SECONDS``. One "analyzing" for longer than that was
+        left by a process that died; the store hands the rerun to exactly
+        one of the processes that notice.
+        """
+        with self._lock:
+            if self.status != "analyzing" or self._analyzing_here:
+                return False
+        if not self.store.claim_analysis(self.id, STALE_ANALYSIS_SECONDS):
+            return False
+        self._run_analysis()
         return True
 
+    def _run_analysis(self) -> None:
+        self._analyzing_here = True
+        threading.Thread(target=self._analyze_worker, name=ANALYSIS_THREAD, daemon=True).start()
+        if self.store.persistent:
+            threading.Thread(target=self._keep_analysis_fresh, daemon=True).start()
+
+    def _keep_analysis_fresh(self) -> None:
+        """Re-save the record while the analysis runs, so a process loading
+        it does not take it for one abandoned by a dead process."""
+        with self._changed:
+            while self.status == "analyzing":
+                if not self._changed.wait(STALE_ANALYSIS_SECONDS / 3):
+                    self.store.save(self.to_record())
+
     def _analyze_worker(self) -> None:
         try:
+            # Early-exit messages from the preliminary questions come first.
+            for message in self.gather_state.messages:
+                self.output_manager.print_out(message)
             screening.analyze(self.misdos, self.felons, self.arrests, self.output_manager)
             results = self.output_manager.drain_results()
             with self._lock:
                 self.results = results
                 self.status = "done"
+                self._publish_status()
         except Exception as exc:
             import traceback
             traceback.print_exc()
             with self._lock:
                 self.status = "error"
                 self.error_message = str(exc)
+                self._publish_status()
+        finally:
+            self._analyzing_here = False
+
+    def close(self, reason: str) -> None:
+        """Release the session and end its event streams and long-polls.
+
+        A stored session is only let go of: it is loaded again on next use,
+        and streams reconnect to that copy. An unstored one ends in error.
+        An analysis already running is left to finish.
+        """
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+            if self.store.persistent:
+                return
+            self._current_questions = None
+            if self.status not in FINISHED:
+                self.status = "error"
+                self.error_message = f"Session {reason}"
+                self._publish_status()
 
     # -- question / answer helpers --------------------------------------
 
-    def get_questions(self) -> dict | None:
-        """Return ``{"questions": [...], "filenames": [...]}`` or *None*."""
-        batch = self.input_manager.get_pending_questions()
-        if batch is not None:
-            self._current_questions = batch["questions"]
-            self._current_filenames = batch["filenames"]
-            return batch
-        return None
+    def get_questions(self, timeout: float = 0.0) -> dict | None:
+        """Return ``{"questions": [...], "filenames": [...]}`` or *None*.
+
+        Waits up to *timeout* seconds for a batch to be ready. Returns None at
+        once if a batch is already out awaiting its answers or the screening
+        has stopped asking questions.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                if self._current_questions is not None:
+                    if self._delivered:
+                        return None
+                    self._delivered = True
+                    return {"filenames": self._current_filenames, "questions": self._current_questions}
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.status != "collecting" or self._closed:
+                    return None
+                self._changed.wait(remaining)
 
     def submit_answers(self, raw_answers: list) -> bool:
-        if self._current_questions is None:
+        with self._lock:
+            questions = self._current_questions
+        if questions is None:
             return False
-        decoded = decode_answers(self._current_questions, raw_answers)
-        self.input_manager.provide_answers(decoded)
-        self._current_questions = None
+        decoded = decode_answers(questions, raw_answers)
+        with self._lock:
+            if self._current_questions is not questions or self._closed:
+                return False
+            self._current_questions = None
+            try:
+                self.gather_state.advance(decoded)
+                self._offer_questions()
+            except Exception as exc:
+                import traceback
+                traceback.print_exc()
+                self.status = "error"
+                self.error_message = str(exc)
+                self._publish_status()
         return True
 
     # -- accessors -------------------------------------------------------
@@ -252,20 +492,46 @@ class Session:
 # Session store
 # ---------------------------------------------------------------------------
 
-SESSIONS: dict[str, Session] = {}
-SESSIONS_LOCK = threading.Lock()
+SESSIONS = SessionManager.from_env()
+SESSION_STORE = session_store_from_env()
+STATIC_ASSETS = static_assets_from_env()
+# An "analyzing" record this old was left by a process that died mid-way.
+STALE_ANALYSIS_SECONDS = 30.0
 
 
 def create_session() -> Session:
-    session = Session()
-    with SESSIONS_LOCK:
-        SESSIONS[session.id] = session
-    return session
+    return SESSIONS.add(Session(SESSION_STORE))
 
 
 def get_session(session_id: str) -> Session | None:
-    with SESSIONS_LOCK:
-        return SESSIONS.get(session_id)
+    """The live session, loaded from the store if this process lacks it or
+    holds an older copy than another process saved.
+
+    Every access also reruns an analysis whose process has died, whatever
+    the version of the copy held here.
+    """
+    session = SESSIONS.get(session_id)
+    stored = SESSION_STORE.version(session_id)
+    if stored is not None and (session is None or session.version < stored):
+        session = _load_session(session_id, session)
+    if session is not None:
+        session.resume_abandoned_analysis()
+    return session
+
+
+def _load_session(session_id: str, session: Session | None) -> Session | None:
+    """Load *session_id* from the store in place of *session*, if readable."""
+    record = SESSION_STORE.load(session_id)
+    if record is None:
+        return session
+    try:
+        loaded = Session.from_record(record, SESSION_STORE)
+    except (KeyError, TypeError, ValueError, OSError) as e:
+        print(f"Could not restore session {session_id}: {e}")
+        return session
+    if session is not None:
+        session.close("replaced by a newer copy")
+    return SESSIONS.add(loaded, loaded=True)
 
 
 # ---------------------------------------------------------------------------
@@ -273,9 +539,64 @@ def get_session(session_id: str) -> Session | None:
 # ---------------------------------------------------------------------------
 
 class AppHandler(SimpleHTTPRequestHandler):
+    # Persistent connections: every response states its length, or closes
+    # the connection (event streams, errors) to mark its end.
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_SECONDS
+    # Headers and body are separate writes; with Nagle's algorithm the body
+    # waits for the client's delayed ACK of the headers, ~40 ms per request.
+    disable_nagle_algorithm = True
+    # The POST body, read before dispatch; see do_POST.
+    _body: bytes | None = None
+    _parsed = False
+    _error_keeps_connection = False
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, directory=WEB_DIR, **kwargs)
 
+    def handle_one_request(self) -> None:
+        # Between requests the connection only waits; a stopping worker may
+        # close it rather than wait out ``timeout``.
+        idle = getattr(self.server, "idle_connections", None)
+        if idle is not None:
+            idle.add(self.connection)
+        try:
+            super().handle_one_request()
+        finally:
+            if idle is not None:
+                idle.discard(self.connection)
+
+    def parse_request(self) -> bool:
+        getattr(self.server, "idle_connections", set()).discard(self.connection)
+        self._body = None
+        self._parsed = False
+        self._parsed = super().parse_request()
+        return self._parsed
+
+    def send_error(self, code: int, message: str | None = None, explain: str | None = None) -> None:
+        """Send the base handler's error page, closing the connection only
+        if the request was malformed or left part of its body unread."""
+        self._error_keeps_connection = self._parsed and self._request_consumed()
+        try:
+            super().send_error(code, message, explain)
+        finally:
+            self._error_keeps_connection = False
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if self._error_keeps_connection and keyword.lower() == "connection":
+            return
+        super().send_header(keyword, value)
+
+    def _request_consumed(self) -> bool:
+        if self.command == "POST":
+            return self._body is not None
+        return "Transfer-Encoding" not in self.headers and self.headers.get("Content-Length", "0") == "0"
+
+    def log_error(self, format: str, *args: Any) -> None:
+        # An idle keep-alive connection reaching ``timeout`` is routine.
+        if not format.startswith("Request timed out"):
+            super().log_error(format, *args)
+
     def translate_path(self, path: str) -> str:
         """Serve web/, plus the shared question and statute directories.
 
@@ -294,17 +615,174 @@ class AppHandler(SimpleHTTPRequestHandler):
                 self.directory = original
         return super().translate_path(path)
 
+    def send_head(self):
+        """Answer a GET or HEAD for a static file up to its body.
+
+        Built assets (see ``static_assets``) are sent in the best encoding
+        the client accepts; a fingerprinted URL is cached for good. Every
+        file carries a strong ETag and is revalidated with If-None-Match, or
+        If-Modified-Since from clients that only kept Last-Modified. A
+        single byte range is honoured, so an interrupted download resumes.
+        """
+        self._body_span = None
+        found = STATIC_ASSETS.find(urlparse(self.path).path) if STATIC_ASSETS is not None else None
+        if found is not None and STATIC_ASSETS.is_fresh(found[0]):
+            asset, fingerprinted = found
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"), asset.encodings)
+            length = asset.encodings[encoding][1] if encoding in asset.encodings else asset.length
+            etag = asset.etag(encoding)
+            status, span = self._static_status(length, asset.modified, etag)
+            STATIC_ASSETS.count_status(status)
+            self._send_static_headers(
+                status, span, length, asset.modified, etag,
+                content_type=self.guess_type(asset.url),
+                cache_control=IMMUTABLE if fingerprinted else REVALIDATE,
+                encoding=encoding,
+                vary=bool(asset.encodings),
+            )
+            return STATIC_ASSETS.open_body(asset, encoding)[0] if status in (200, 206) else None
+        if found is not None:
+            # Edited since the build: serve the file itself until the next one.
+            self.path = found[0].url
+        path = self.translate_path(self.path)
+        if urlparse(self.path).path.endswith("/") or not os.path.isfile(path):
+            # Directories, and the base handler's 404s.
+            return super().send_head()
+        try:
+            body = open(path, "rb")
+        except OSError:
+            return super().send_head()
+        stat = os.fstat(body.fileno())
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        status, span = self._static_status(stat.st_size, stat.st_mtime, etag)
+        self._send_static_headers(
+            status, span, stat.st_size, stat.st_mtime, etag,
+            content_type=self.guess_type(path),
+            cache_control=REVALIDATE,
+        )
+        if status in (200, 206):
+            return body
+        body.close()
+        return None
+
+    def _static_status(self, length: int, modified: float, etag: str) -> tuple[int, tuple[int, int] | None]:
+        """The status for a static body of *length* bytes, and its range.
+
+        304 if the client's copy is current, 206 for a satisfiable range,
+        416 for one past the end, otherwise 200.
+        """
+        if self._not_modified(etag, modified):
+            return 304, None
+        span = self._requested_range(length, etag, modified)
+        if span is None:
+            return 200, None
+        return (206 if span[1] > span[0] else 416), span
+
+    def _send_static_headers(
+        self,
+        status: int,
+        span: tuple[int, int] | None,
+        length: int,
+        modified: float,
+        etag: str,
+        *,
+        content_type: str,
+        cache_control: str,
+        encoding: str = "identity",
+        vary: bool = False,
+    ) -> None:
+        """Send the headers of a ``_static_status`` answer. For a 206,
+        ``copyfile`` then sends only *span* of the body."""
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(modified))
+        self.send_header("Cache-Control", cache_control)
+        if vary:
+            self.send_header("Vary", "Accept-Encoding")
+        if status in (200, 206):
+            self.send_header("Content-Type", content_type)
+            self.send_header("Accept-Ranges", "bytes")
+            if encoding != "identity":
+                self.send_header("Content-Encoding", encoding)
+            if status == 206:
+                start, end = span
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{length}")
+                self._body_span = (start, end - start)
+                length = end - start
+            self.send_header("Content-Length", str(length))
+        elif status == 416:
+            self.send_header("Content-Range", f"bytes */{length}")
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _requested_range(self, length: int, etag: str, modified: float) -> tuple[int, int] | None:
+        """The ``[start, end)`` bytes asked for by a single-range Range header.
+
+        None means send the whole body: no Range, one this server does not
+        serve (several ranges), or an If-Range naming an older copy. An
+        empty span means the range starts past the end.
+        """
+        header = self.headers.get("Range")
+        if not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.strip() not in (etag, self.date_time_string(modified)):
+            return None
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+        if match is None or not any(match.groups()):
+            return None
+        first, last = match.groups()
+        if not first:
+            # A suffix: the last *last* bytes.
+            start, end = max(0, length - int(last)), length
+        else:
+            start = int(first)
+            end = min(length, int(last) + 1) if last else length
+            if last and int(last) < start:
+                return None
+        if start >= length or start >= end:
+            return (0, 0)
+        return start, end
+
+    def copyfile(self, source, outputfile) -> None:
+        """Send a static body, or only the range ``send_head`` chose.
+
+        ``socket.sendfile`` hands a file on disk to ``os.sendfile``, so the
+        bytes never pass through Python; bodies held in memory fall back to
+        ordinary sends.
+        """
+        offset, count = self._body_span or (0, None)
+        self.connection.sendfile(source, offset, count)
+
+    def _not_modified(self, etag: str, modified: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(modified) <= since
+        return False
+
     def end_headers(self) -> None:
         """Keep API answers uncached, but let static files revalidate.
 
         The statute embeddings are several megabytes, so re-sending them on
-        every screening is wasteful. The base handler already sends
-        Last-Modified and answers If-Modified-Since with 304, which keeps the
+        every screening is wasteful. Built assets get their caching headers
+        in ``send_head``; other static files get the base handler's
+        Last-Modified and If-Modified-Since handling, which keeps the
         browser from using a stale file without re-downloading a fresh one.
         """
         if urlparse(self.path).path.startswith("/api/"):
             self.send_header("Cache-Control", "no-store, no-cache, must-revalidate")
             self.send_header("Pragma", "no-cache")
+        if SHUTTING_DOWN.is_set() and not self.close_connection:
+            # Reconnect to a process that is still serving.
+            self.send_header("Connection", "close")
         super().end_headers()
 
     # -- routing ---------------------------------------------------------
@@ -317,12 +795,18 @@ class AppHandler(SimpleHTTPRequestHandler):
         if parsed.path == "/api/status":
             self._handle_get_status(parsed)
             return
+        if parsed.path == "/api/events":
+            self._handle_get_events(parsed)
+            return
         if parsed.path == "/api/results":
             self._handle_get_results(parsed)
             return
         if parsed.path == "/api/petition-prefill":
             self._handle_get_petition_prefill(parsed)
             return
+        if parsed.path == "/api/metrics":
+            self._handle_get_metrics()
+            return
         if parsed.path.startswith("/api/"):
             self.send_error(404, "Unknown API endpoint")
             return
@@ -331,6 +815,17 @@ class AppHandler(SimpleHTTPRequestHandler):
         return super().do_GET()
 
     def do_POST(self) -> None:
+        # Read the body before anything else: one left unread would be
+        # taken for the next request on a kept-alive connection.
+        if "Transfer-Encoding" in self.headers:
+            self.send_error(411, "Send the body with a Content-Length")
+            return
+        length = self.headers.get("Content-Length", "0").strip()
+        if not (length.isascii() and length.isdigit()):
+            # Where the body ends is unknown, so the connection closes too.
+            self.send_error(400, "Invalid Content-Length")
+            return
+        self._body = self.rfile.read(int(length))
         parsed = urlparse(self.path)
         if parsed.path == "/api/start":
             self._handle_start()
@@ -354,9 +849,7 @@ class AppHandler(SimpleHTTPRequestHandler):
     def _handle_start(self) -> None:
         session = create_session()
         session.start_gathering()
-        # Give the gather thread a moment to enqueue the first question batch
-        time.sleep(0.3)
-        batch = session.get_questions()
+        batch = session.get_questions(QUESTION_WAIT_SECONDS)
         payload: dict[str, Any] = {
             "session_id": session.id,
             "status": session.get_status(),
@@ -374,7 +867,11 @@ class AppHandler(SimpleHTTPRequestHandler):
         session = self._session_from_qs(parsed)
         if session is None:
             return
-        batch = session.get_questions()
+        try:
+            wait = float(parse_qs(parsed.query).get("wait", [QUESTION_WAIT_SECONDS])[0])
+        except ValueError:
+            wait = QUESTION_WAIT_SECONDS
+        batch = session.get_questions(min(max(wait, 0.0), QUESTION_WAIT_SECONDS))
         status = session.get_status()
         payload: dict[str, Any] = {
             "status": status,
@@ -438,10 +935,24 @@ class AppHandler(SimpleHTTPRequestHandler):
         if not session:
             self.send_error(404, "Session not found")
             return
-        results = []
-        for count in counts:
-            cls = classify_count(session.input_manager, str(count))
-            results.append({"count": count, "class": cls})
+        # One batched embedding call and one matrix product per statute list
+        # for the whole request, rather than a round-trip chain per count.
+        classified = classify_counts(
+            session.input_manager,
+            [str(count) for count in counts],
+            cache=default_cache(),
+            executor=classification_executor(),
+            local_index=local_statute_index(),
+            thresholds=default_thresholds(),
+            batch_rerank=batch_rerank_enabled(),
+            single_flight=IN_FLIGHT,
+        )
+        # A count flagged needs_review was classified without a Gemini answer
+        # it needed (timeout, retries spent, or breaker open).
+        results = [
+            {"count": count, "class": result["class"], "needs_review": result["needs_review"]}
+            for count, result in zip(counts, classified)
+        ]
         self._send_json({"classifications": results})
 
     # -- POST /api/generate_petition -----------------------------------
@@ -480,25 +991,64 @@ class AppHandler(SimpleHTTPRequestHandler):
             payload["error"] = session.get_error()
         self._send_json(payload)
 
+    # -- GET /api/events ------------------------------------------------
+
+    def _handle_get_events(self, parsed) -> None:
+        """Stream the session's events as Server-Sent Events.
+
+        Every event carries its id. A client that reconnects with
+        ``Last-Event-ID`` (or ``?last_event_id=``) is sent only what it
+        missed. The stream ends once the session is done or failed.
+        """
+        session = self._session_from_qs(parsed)
+        if session is None:
+            return
+        raw_id = self.headers.get("Last-Event-ID") or parse_qs(parsed.query).get("last_event_id", ["0"])[0]
+        try:
+            last_id = max(0, int(raw_id))
+        except ValueError:
+            last_id = 0
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("X-Accel-Buffering", "no")
+        # The stream has no length; closing the connection ends it.
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            self.wfile.write(f"retry: {SSE_RETRY_MS}\n\n".encode("utf-8"))
+            last_write = time.monotonic()
+            while True:
+                events, finished = session.events_after(last_id, SESSION_SYNC_SECONDS or SSE_KEEPALIVE_SECONDS)
+                chunk = "".join(
+                    f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+                    for event_id, kind, data in events
+                )
+                if not chunk and time.monotonic() - last_write >= SSE_KEEPALIVE_SECONDS:
+                    chunk = ": keepalive\n\n"
+                if chunk:
+                    self.wfile.write(chunk.encode("utf-8"))
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                if events:
+                    last_id = events[-1][0]
+                if finished or SHUTTING_DOWN.is_set():
+                    return
+                # An open stream counts as use, so it is not expired. If
+                # this copy was let go of, follow the one now in use.
+                session = get_session(session.id) or session
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; it resumes from Last-Event-ID.
+            return
+
     # -- GET /api/results -----------------------------------------------
 
     def _handle_get_results(self, parsed) -> None:
         session = self._session_from_qs(parsed)
         if session is None:
             return
-        results = session.get_results()
-        # Serialise results: each item is either a dict (case results) or a
-        # string (early-exit message).  Convert to a uniform structure.
-        serialised: list[dict[str, Any]] = []
-        if results:
-            for item in results:
-                if isinstance(item, dict):
-                    serialised.append({"type": "cases", "data": item})
-                else:
-                    serialised.append({"type": "message", "data": str(item)})
         self._send_json({
             "status": session.get_status(),
-            "results": serialised,
+            "results": serialise_results(session.get_results()),
         })
 
     # -- GET /api/petition-prefill -------------------------------------
@@ -521,6 +1071,27 @@ class AppHandler(SimpleHTTPRequestHandler):
         )
         self._send_json(prefill)
 
+    # -- GET /api/metrics ----------------------------------------------
+
+    def _handle_get_metrics(self) -> None:
+        """Report process-wide resource use for monitoring."""
+        cache = default_cache()
+        thresholds = default_thresholds()
+        self._send_json({
+            "statute_index": STATUTE_REGISTRY.footprint(),
+            "classification_cache": cache.stats() if cache is not None else None,
+            "local_fast_path": local_statute_index().stats(),
+            "score_thresholds": thresholds.stats() if thresholds is not None else None,
+            "gemini_rate_limit": GEMINI_RATE_LIMITER.stats(),
+            "gemini_resilience": resilience_stats(),
+            "single_flight": IN_FLIGHT.stats(),
+            "sessions": SESSIONS.stats(),
+            "session_store": SESSION_STORE.stats(),
+            "static_assets": STATIC_ASSETS.stats() if STATIC_ASSETS is not None else None,
+            "threads": threading.active_count(),
+            "process": {"pid": os.getpid(), "workers": WORKERS},
+        })
+
     # -- helpers --------------------------------------------------------
 
     def _session_from_qs(self, parsed) -> Session | None:
@@ -536,11 +1107,10 @@ class AppHandler(SimpleHTTPRequestHandler):
         return session
 
     def _read_json(self) -> dict | None:
-        length = int(self.headers.get("Content-Length", "0"))
-        raw = self.rfile.read(length).decode("utf-8")
         try:
+            raw = self._body.decode("utf-8")
             return json.loads(raw) if raw else {}
-        except json.JSONDecodeError:
+        except (UnicodeDecodeError, json.JSONDecodeError):
             self.send_error(400, "Invalid JSON")
             return None
 
@@ -572,15 +1142,104 @@ class AppHandler(SimpleHTTPRequestHandler):
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     daemon_threads = True
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Requests being handled, so a stopping worker can wait for them.
+        self.active_requests = 0
+        self._active_lock = threading.Lock()
+        # Kept-alive connections waiting for their next request. They count
+        # in active_requests, so a stopping worker closes them.
+        self.idle_connections: set[socket.socket] = set()
+
+    def close_idle_connections(self) -> None:
+        for connection in list(self.idle_connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def process_request(self, request, client_address) -> None:
+        with self._active_lock:
+            self.active_requests += 1
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._request_done()
+            raise
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._request_done()
+
+    def _request_done(self) -> None:
+        with self._active_lock:
+            self.active_requests -= 1
+
+
+def _preload_for_workers() -> None:
+    """Load in the master what every worker would otherwise load itself."""
+    global SESSION_STORE
+    try:
+        STATUTE_REGISTRY.preload()
+        local_statute_index()
+    except Exception as e:
+        print(f"Could not preload statute indexes: {e}. Workers will load them on first use.")
+    # SQLite connections must not cross a fork; each worker opens its own.
+    SESSION_STORE.close()
+    SESSION_STORE = SessionStore()
+
+
+def _start_worker(workers: int) -> None:
+    global SESSION_STORE, SESSION_SYNC_SECONDS, WORKERS
+    WORKERS = workers
+    # Write every change through so the next request sees it in any worker.
+    SESSION_STORE = session_store_from_env(flush_seconds=0.0)
+    SESSION_SYNC_SECONDS = 1.0
+    GEMINI_RATE_LIMITER.split(workers)
+
+
+def _stop_worker(server: ThreadedHTTPServer) -> None:
+    SHUTTING_DOWN.set()
+    # Wakes long-polls and event streams; stored sessions are only let go of.
+    SESSIONS.close_all("moved to another worker")
+    # Responses from now on close their connection; idle ones close now.
+    server.close_idle_connections()
+
+
+def _running_analyses() -> int:
+    return sum(thread.name == ANALYSIS_THREAD for thread in threading.enumerate())
+
 
 def main() -> None:
     if not os.path.isdir(WEB_DIR):
         raise RuntimeError(f"Missing web directory at {WEB_DIR}")
     host = os.environ.get("HOST", "0.0.0.0")
     port = int(os.environ.get("PORT", "5000"))
+    workers = workers_from_env()
+    if workers > 1 and not SESSION_STORE.persistent:
+        print("WEB_WORKERS needs the session store (SESSION_STORE_PATH) to share sessions; "
+              "serving with one process.")
+        workers = 1
     server = ThreadedHTTPServer((host, port), AppHandler)
-    print(f"Serving on http://{host}:{port}")
-    server.serve_forever()
+    print(f"Serving on http://{host}:{server.server_address[1]}")
+    if workers > 1:
+        PreforkServer(
+            server,
+            workers,
+            preload=_preload_for_workers,
+            post_fork=lambda: _start_worker(workers),
+            on_stop=lambda: _stop_worker(server),
+            busy=_running_analyses,
+            on_exit=lambda: SESSION_STORE.close(),
+        ).run()
+        return
+    try:
+        server.serve_forever()
+    finally:
+        # Write the sessions still queued for the store.
+        SESSION_STORE.close()
 
 
 if __name__ == "__main__":